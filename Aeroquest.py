@@ -1,9 +1,11 @@
 import os
-import glob
 import sys
-import json
 from time import sleep
 import time
+import itertools
+
+# Every other module (including contextlib, glob, the result cache, checkpoints and profiling) is imported by the
+# functions that use it, so quick commands and importing this file stay fast (see tests/test_startup.py)
 
 #############################################
 ##            GLOBAL VARIABLES             ##
@@ -16,6 +18,16 @@ DEFAULT_PARAMS = {"Sref": "45.0", "Cref": "2.5", "Bref": "18", "X_cg": "0.",
                   "Symmetry": "N", "FarDist": "-1", "NumWakeNodes": "-1", 
                   "WakeIters": "3", "NumberOfRotors": "0", "GMRESReductionFactor": "0.001"}
 
+SOLVER_PROFILES = {"default": [{}],
+                   "loose": [{},
+                             {"GMRESReductionFactor": "0.01"},
+                             {"GMRESReductionFactor": "0.01", "WakeIters": "2"}]} # Solver parameters of each grid level over DEFAULT_PARAMS, finest first (coarser levels use the last), picked with -solverprofile
+DEFAULT_SOLVER_PROFILE = "default" # Every level keeps DEFAULT_PARAMS unless a run picks a profile or -calibrate
+SOLVER_CANDIDATES = [{"GMRESReductionFactor": "0.1", "WakeIters": "1"},
+                     {"GMRESReductionFactor": "0.05", "WakeIters": "2"},
+                     {"GMRESReductionFactor": "0.01", "WakeIters": "2"},
+                     {"GMRESReductionFactor": "0.01", "WakeIters": "3"}] # Settings -calibrate tries on coarse levels, against the finest level's
+
 ## READ File Paths ##
 databasePath = "./database" # Path to database
 
@@ -29,8 +41,15 @@ geomDataPathMed = "./TestCase.Fine/wingmed"
 # geomDataPathCoarse = "./TestCase.Thick/Coarse/wing"
 # geomDataPathMed = "./TestCase.Thick/Med/wing"
 
+geometrySets = {"thick": ["./TestCase.Fine/wing", "./TestCase.Fine/wingmed", "./TestCase.Fine/wingcoarse"],
+                "thin": ["./TestCase.Thick/Fine/wing", "./TestCase.Thick/Med/wing", "./TestCase.Thick/Coarse/wing"]} # Geometry sets a study manifest can name, finest first
+
 outputFile = "VSPAero" # Json filename header
+bundlePath = f"./QuestpostInputData/{outputFile}.bundle.json" # Path to Quest-post json bundle
+archivePath = f"./QuestpostInputData/{outputFile}.archive" # Path to columnar archive of the results (see archive.py)
 vspAeroPath = "/home/wbui/VSPAERO-QUEST/bin/vspaero" # Path to VSPAero solver
+vspAeroMgFlag = "-mglevel" # VSPAero flag selecting one of its internal mesh levels (used by aeroquest_mg())
+sweepCases = True # Writes the cases of each .vspaero file along a short path through Mach, Beta and AoA, so each solve starts near the last (disable with -nosweep)
 questLauncherPath = "/home/wbui/questlaunchers/QuestLauncher.jar" # Path to quest launcher
 slicerPath = "./Adb2Load/adb2loads" # Path to ADB slicer
 
@@ -39,96 +58,80 @@ questScriptMeasurePath = "./configjsonmeasurement" # Path to quest script measur
 
 mainDir = "/home/wbui/Quest-VSP" # Path to Aeroquest
 
+cachePath = "./ResultCache" # Path to solver result cache (disable with -nocache)
+checkpointPath = "./aeroquest.checkpoint.json" # Path to stage checkpoint manifest (used by -resume)
+profilePath = "./aeroquest.profile.jsonl" # Path to per-stage profile (written with -profile)
+tracePath = "./aeroquest.trace.json" # Path to Chrome trace of the stages (written with -trace)
+studyDir = "./QuestpostInputData" # Bundle of each manifest study is written to <studyDir>/<study name>/
+postRecordPath = "./aeroquest.post.json" # Path to fingerprints of the bundles Quest-post last ran on (unchanged bundles are not post-processed again)
+scalingPath = "./aeroquest.scaling.json" # Path to observed solver, slicer and parse timings of every mesh (used by -shards auto, to split cores and balance shards, and to estimate run time)
+calibrationPath = "./aeroquest.calibration.json" # Path to the solver settings -calibrate picked for every mesh
+logDir = "./AeroquestLogs" # Solver, slicer and Quest-post output is logged here, one directory per run
+timeoutStages = {"solve": "solver", "slice": "slicer", "post": "post"} # -timeout stage name -> process runner stage
+interpChunk = 64 # Slice cases interpolated onto the finest mesh per batch (see slicedata.interpolateLevel())
+
 
 #############################################
 ##           PARSE DATABASE DATA           ##
 #############################################
 
-def genZeros(total_len, original_str):
-    """Formats strings with 0's
-    
-    Args:
-        total_len (int): Total length of formatted string
-        original_str (str): Original string
-
-    Returns:
-        Formatted string with 0's
-    
-    """
-    for i in range(total_len - len(original_str)):
-        original_str = "0" + original_str
-
-    return original_str
-
-def parseDatabase(filePath, outputFileName, num_levels):
+def parseDatabase(filePath, outputFileName, num_levels=None):
     """Parses Quest-prep database file
-    
+
     Args:
         filePath (str): Path to database file
         outputFileName (str): Header for quest post json filename
-        num_levels (int): Number of meshes
+        num_levels (int): Number of meshes, None for every level in the database
 
     Returns:
-        2D list of dictionaries containing uncertainty parameters and filename for each case from each mesh
+        List of LevelViews (coarsest mesh first), each indexing to dictionaries containing
+        uncertainty parameters and filename for each case from that mesh
     """
-    
-    database = open(filePath)
+    from database import QuestDatabase
 
-    with database as file:
-        databaseLines = [line.rstrip() for line in file]
-    database.close()
+    return QuestDatabase.fromFile(filePath, outputFileName).levels(num_levels)
 
-    vspAero_runs = int(databaseLines[2].split(" ")[0])
-    vspAero_runs_total = int(databaseLines[2].split(" ")[1])
-    vsp_param_data = databaseLines[4:4 + int(vspAero_runs_total)]
-    vsp_params = databaseLines[3].split()
 
-    parsed_vsp_param_data = []
-    parsed_vsp_param_data_all = []
-
-    increment_value = vspAero_runs_total // vspAero_runs
+#############################################
+##                 VSPAERO                 ##
+#############################################
 
-    for i in range(increment_value):
-        parsed_vsp_param_data = []
-        for j in range(i, vspAero_runs_total, num_levels):
-            param = vsp_param_data[j]
-            parsed_vsp_param_data.append(parseLineData(param, vsp_params, outputFileName))
+def resolveParams(vspCase):
+    """Resolves the full set of solver parameters for a case
 
-        parsed_vsp_param_data_all.append(parsed_vsp_param_data)
+    Args:
+        vspCase (dict): Case from parsed database
 
-    return parsed_vsp_param_data_all
+    Returns:
+        Dictionary containing every parameter written to the .vspaero file: the database's
+        value, else the case's solver settings (see levelSolverSettings()), else DEFAULT_PARAMS
+    """
+    settings = vspCase.get('settings', {})
+    return {param: f"{vspCase['data'][param]}" if param in vspCase['data'] else settings.get(param, DEFAULT_PARAMS[param])
+            for param in DEFAULT_PARAMS.keys()}
 
-def parseLineData(param_string, uncertainty_param_names, outputFileName):
-    """Parses an individual line from the Quest-prep database file
+def levelSolverSettings(vspCases, profile=None):
+    """Gives the cases of every grid level the solver settings of a profile
 
     Args:
-        param_string (str): Individual line from database file
-        uncertainty_param_names (string list): List of uncertainty parameters
-        outputFileName (str): Name of json file for case
+        vspCases (LevelView list): Cases of every grid level, finest first
+        profile (str or dict list): Name of one of SOLVER_PROFILES, path to a json file listing the solver parameters
+            of each grid level, or that list (None for DEFAULT_SOLVER_PROFILE, DEFAULT_PARAMS on every level)
 
     Returns:
-        Dictionary containing case filename and uncertainty parameter
+        List of LevelViews of the same cases, with their level's settings
     """
-    param_arr = param_string.split()
-    uncertainty_params = {}
-    stringId = outputFileName
-    xId = genZeros(5, param_arr[3])
-    yId = genZeros(2, param_arr[2]) 
-    zId = genZeros(5, param_arr[0])
-    fileName = f"{stringId}.{xId}.{yId}.{zId}"
-
-    for i, name in enumerate(uncertainty_param_names):
-        uncertainty_params[name] = float(param_arr[5 + i])
+    from solversettings import levelSettings, resolveProfile
 
-    return {'filename': fileName, 'data': uncertainty_params}
+    profile = resolveProfile(profile or DEFAULT_SOLVER_PROFILE, SOLVER_PROFILES, DEFAULT_PARAMS.keys())
 
-
-#############################################
-##                 VSPAERO                 ##
-#############################################
+    return [levelCases.withSettings(levelSettings(profile, i)) for i, levelCases in enumerate(vspCases)]
 
 def writeVspAeroFiles(vspCases, geomData):
     """Writes out .vspaero config file containing runs from parsed database
+
+    Parameters from the database are listed per case, solver settings the cases
+    share are written once (see resolveParams()).
     
     Args:
         vspCases (dictionary list): List containing cases from a single mesh
@@ -137,18 +140,16 @@ def writeVspAeroFiles(vspCases, geomData):
     Retruns:
         None, Writes out a .vspaero file to geomdata path
     """
+    params = [resolveParams(vspCase) for vspCase in vspCases]
     vspAeroFile = open(f"{geomData}.vspaero", 'w')
 
     for param in DEFAULT_PARAMS.keys():
-        if param in list(vspCases[0]['data'].keys()):
-            vspAeroFile.write(f"{param} = ")
-            for vspCase in vspCases[:-1]:
-                vspAeroFile.write(f"{vspCase['data'][param]}, ")
+        values = [caseParams[param] for caseParams in params]
 
-            vspAeroFile.write(f"{vspCases[-1]['data'][param]}\n")
-                
+        if param in vspCases[0]['data'] or len(set(values)) > 1:
+            vspAeroFile.write(f"{param} = {', '.join(values)}\n")
         else:
-            vspAeroFile.write(f"{param} = {DEFAULT_PARAMS[param]}\n")
+            vspAeroFile.write(f"{param} = {values[0]}\n")
         
     vspAeroFile.close()
     print("File Successfully Written")
@@ -162,23 +163,43 @@ def deleteVspAeroFiles(geomData):
     Returns:
         None, Deletes .vspaero file in geomData path
     """
-    files = glob.glob(f"{geomData}.vspaero")
-    for f in files:
-        os.remove(f)
+    if os.path.isfile(f"{geomData}.vspaero"):
+        os.remove(f"{geomData}.vspaero")
     print("Files Successfully Deleted")
 
-def runSolver(vspAeroFile, geomData):
+def runSolver(vspAeroFile, geomData, threads=None, mglevel=None):
     """Runs VSPAero solver
     
     Args:
         vspAeroFile (str): Path to .vspaero config file
         geomData (str): Path to geometry
+        threads (int): Number of OpenMP threads given to the solver (None for every available core)
+        mglevel (int): VSPAero mesh level to solve on (2 or more, see aeroquest_mg()), None for the geometry as given
         
     Returns:
-        None, runs VSPAero solver
+        Exit code of VSPAero solver, raises ProcessFailed if a solve at a mesh level fails or writes no
+        .polar file (e.g. a VSPAero build without vspAeroMgFlag)
     """
-    os.system(f"{vspAeroFile} -quest -omp 10 {geomData}")
-    return None
+    from runner import ProcessFailed
+    from scheduler import availableCores, runCommand
+
+    args = [vspAeroFile, "-quest", "-omp", str(threads or availableCores())]
+    if mglevel is None:
+        return runCommand(args + [geomData], stage="solver")
+
+    if os.path.isfile(f"{geomData}.polar"):
+        os.remove(f"{geomData}.polar") # A .polar from an earlier run would hide a solver that ignores the flag's level
+    try:
+        exit_code = runCommand(args + [vspAeroMgFlag, str(mglevel), geomData], stage="solver")
+    except ProcessFailed as e:
+        raise ProcessFailed(f"{vspAeroFile} failed at {vspAeroMgFlag} {mglevel}, -mg needs a VSPAero build that "
+                            f"supports {vspAeroMgFlag} (see vspAeroMgFlag)\n{e}") from e
+
+    if not os.path.isfile(f"{geomData}.polar"):
+        raise ProcessFailed(f"{vspAeroFile} wrote no {geomData}.polar at {vspAeroMgFlag} {mglevel}, -mg needs a VSPAero "
+                            f"build that supports {vspAeroMgFlag} (see vspAeroMgFlag)")
+
+    return exit_code
 
 def createSliceData(slicerFile, geomData):
     """Runs geometry slicer
@@ -188,9 +209,422 @@ def createSliceData(slicerFile, geomData):
         geomData (str): Path to geometry
 
     Returns:
-        None, runs ADB slicer
+        Exit code of ADB slicer
+    """
+    from scheduler import runCommand
+
+    return runCommand([slicerFile, "-slice", geomData], stage="slicer")
+
+def solveCases(vspCases, geomData, threads=None, slice=False, checkpoint=None, mglevel=None):
+    """Writes .vspaero file for a list of cases and runs VSPAero solver (and slicer) on it
+
+    With sweepCases, the .vspaero file lists the cases in sweep order (see
+    planner.sweepOrder()) and the .polar and .slc files are put back in case order
+    as soon as the solver and slicer finish.
+
+    Args:
+        vspCases (dictionary list): List containing cases to solve
+        geomData (str): Path to geometry
+        threads (int): Number of OpenMP threads given to the solver (None for every available core)
+        slice (bool): True to also run ADB slicer
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+
+    Returns:
+        None, writes out .polar (and .slc) file to geomData path in the order of vspCases, the
+        solver's and slicer's wall times are added to the scaling history (see allocator.py)
+    """
+    import allocator
+    import profiling
+    from checkpoint import fingerprintData, fingerprintFiles, runStage
+    from planner import sweepLength, sweepOrder
+    from scheduler import GEOM_EXTENSIONS, availableCores, mergePolarFiles, mergeSliceFiles
+
+    threads = threads or availableCores()
+    vspAeroFile = f"{geomData}.vspaero"
+    geomFiles = [f"{geomData}{ext}" for ext in GEOM_EXTENSIONS if os.path.isfile(f"{geomData}{ext}")]
+    params = [resolveParams(vspCase) for vspCase in vspCases]
+
+    order = sweepOrder(params) if sweepCases else list(range(len(vspCases)))
+    swept = order != list(range(len(vspCases)))
+    if swept:
+        print(f"{geomData}: sweep order shortens the path through the flight conditions from "
+              f"{sweepLength(params):.2f} to {sweepLength(params, order):.2f}")
+
+    def write():
+        with profiling.stage("write"):
+            deleteVspAeroFiles(geomData)
+            writeVspAeroFiles([vspCases[i] for i in order], geomData)
+
+    def solve():
+        exit_code = runSolver(vspAeroPath, geomData, threads, mglevel)
+        if swept and exit_code in (None, 0):
+            mergePolarFiles([geomData], [order], geomData)
+        return exit_code
+
+    def sliceSolution():
+        exit_code = createSliceData(slicerPath, geomData)
+        if swept and exit_code in (None, 0):
+            mergeSliceFiles([geomData], [order], geomData)
+        return exit_code
+
+    with profiling.tags(mesh=geomData, cases=len(vspCases)):
+        runStage(checkpoint, geomData, "write", fingerprintData([params, order]), [vspAeroFile], write)
+        start = time.time()
+        if runStage(checkpoint, geomData, "solve", fingerprintFiles([vspAeroFile, vspAeroPath] + geomFiles),
+                    [f"{geomData}.polar"], solve):
+            allocator.getHistory().record("solver", geomData, threads, params, time.time() - start, mglevel)
+
+        if slice:
+            start = time.time()
+            if runStage(checkpoint, geomData, "slice",
+                        fingerprintFiles([f"{geomData}.polar", f"{geomData}.adb", f"{geomData}.cuts", slicerPath]),
+                        [f"{geomData}.slc"], sliceSolution):
+                allocator.getHistory().record("slicer", geomData, 1, params, time.time() - start, mglevel)
+
+def solveMesh(vspCases, geomData, threads=None, slice=False, num_shards=1, checkpoint=None, mglevel=None):
+    """Solves every case of a single mesh, optionally split into shards
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        threads (int): Number of cores given to this mesh (None for every available core)
+        slice (bool): True to also run ADB slicer
+        num_shards (int): Number of separate solver processes to split the cases across, None to pick the
+            process count and threads per process from the mesh's scaling history (see allocator.py). Once the
+            mesh has recorded solver runs, cases are binned into shards by predicted cost
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+
+    Returns:
+        None, writes out .polar (and .slc) file to geomData path in database order
+    """
+    import allocator
+    from scheduler import availableCores, runShards
+
+    threads = threads or availableCores()
+    model = allocator.getHistory().model("solver", geomData, mglevel)
+    if num_shards is None:
+        num_shards, shard_threads = model.layout([resolveParams(vspCase) for vspCase in vspCases], threads)
+        print(f"{geomData}: {len(vspCases)} cases on {threads} cores, {num_shards} solver processes x {shard_threads} threads")
+
+    if num_shards > 1:
+        costs = model.caseCosts([resolveParams(vspCase) for vspCase in vspCases]) if model.measured else None
+        runShards(geomData, vspCases, num_shards,
+                  lambda shardCases, shardGeom, shardThreads: solveCases(shardCases, shardGeom, shardThreads, slice, checkpoint, mglevel),
+                  threads, slice, costs=costs)
+    else:
+        solveCases(vspCases, geomData, threads, slice, checkpoint, mglevel)
+
+def solveMeshCached(vspCases, geomData, threads=None, slice=False, num_shards=1, cache=None, checkpoint=None, mirror=False,
+                    mglevel=None):
+    """Solves and parses a single mesh, skipping cases whose outputs are cached
+
+    Each unique flight condition is solved once (see planCases()) and its results
+    are shared by every case with that condition.
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        threads (int): Number of cores given to this mesh
+        slice (bool): True to also run ADB slicer
+        num_shards (int): Number of separate solver processes to split the cases across (None to pick, see solveMesh())
+        cache (ResultCache): Result cache (None to solve every case)
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        mirror (bool): True to also share results between cases that only differ in the sign of Beta
+            (ignored when slicing)
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+
+    Returns:
+        Tuple containing parsed VSPAero output list and a generator of SliceCase (None
+        when not slicing), both in the same order as vspCases
+    """
+    from planner import planCases
+
+    plan = planCases([resolveParams(vspCase) for vspCase in vspCases], mirror and not slice)
+    if plan.saved > 0:
+        print(f"{geomData}: {len(vspCases)} cases, {len(plan.unique)} unique conditions "
+              f"({plan.saved} solver cases saved, {plan.num_mirrored} by Beta symmetry)")
+
+    vsp_out, slice_out = solveUniqueCases(plan.select(vspCases), geomData, threads, slice, num_shards, cache, checkpoint, mglevel)
+
+    return plan.expand(vsp_out), plan.expandStream(slice_out) if slice else None
+
+def cacheKeys(vspCases, geomData, slice=False, mglevel=None):
+    """Builds the result cache keys of a list of cases
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        slice (bool): True to also build slice data keys
+        mglevel (int): VSPAero mesh level the cases are solved on, None for the geometry as given
+
+    Returns:
+        Tuple containing the polar key and the slice key (None when not slicing) of every case
+    """
+    from cache import caseKey
+    from scheduler import GEOM_EXTENSIONS
+
+    geomFiles = [f"{geomData}{ext}" for ext in GEOM_EXTENSIONS if os.path.isfile(f"{geomData}{ext}")]
+    params = [resolveParams(vspCase) for vspCase in vspCases]
+    if mglevel is not None:
+        params = [{**param, "mglevel": mglevel} for param in params]
+
+    polarKeys = [caseKey(geomFiles, param, [vspAeroPath]) for param in params]
+    if not slice:
+        return polarKeys, None
+
+    return polarKeys, [caseKey(geomFiles + [f"{geomData}.cuts"], param, [vspAeroPath, slicerPath]) for param in params]
+
+def solveUniqueCases(vspCases, geomData, threads=None, slice=False, num_shards=1, cache=None, checkpoint=None, mglevel=None):
+    """Solves and parses a list of cases, skipping cases whose outputs are cached
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        threads (int): Number of cores given to this mesh
+        slice (bool): True to also run ADB slicer
+        num_shards (int): Number of separate solver processes to split the cases across (None to pick, see solveMesh())
+        cache (ResultCache): Result cache (None to solve every case)
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+
+    Returns:
+        Tuple containing parsed VSPAero output list and a generator of SliceCase (None
+        when not slicing), both in the same order as vspCases
+    """
+    import allocator
+    import profiling
+
+    vsp_out = [None] * len(vspCases)
+    slice_hits = [False] * len(vspCases)
+    sliceKeys = None
+
+    if cache is not None:
+        polarKeys, sliceKeys = cacheKeys(vspCases, geomData, slice, mglevel)
+        vsp_out = [cache.get(key, "polar") for key in polarKeys]
+
+        if slice:
+            slice_hits = [cache.contains(key, "slicecase") for key in sliceKeys]
+
+    misses = [i for i in range(len(vspCases)) if vsp_out[i] is None or (slice and not slice_hits[i])]
+    print(f"{geomData}: {len(vspCases) - len(misses)} cases cached, {len(misses)} cases to solve")
+
+    if len(misses) == 0:
+        return vsp_out, streamMeshSlices(vspCases, geomData, misses, sliceKeys, cache, mglevel) if slice else None
+
+    if checkpoint is not None and num_shards == 1:
+        stage = checkpoint.firstIncomplete(geomData, ["write", "solve", "slice"] if slice else ["write", "solve"])
+        print(f"{geomData}: resuming at {stage} stage" if stage else f"{geomData}: every stage up to date")
+
+    solveMesh([vspCases[i] for i in misses], geomData, threads, slice, num_shards, checkpoint, mglevel)
+
+    start = time.time()
+    with profiling.stage("parse", mesh=geomData, cases=len(misses)):
+        parsed_vsp_out = parseVSPAeroData(geomData)
+    allocator.getHistory().record("parse", geomData, 1, [resolveParams(vspCases[i]) for i in misses], time.time() - start, mglevel)
+    for miss_i, case_i in enumerate(misses):
+        vsp_out[case_i] = parsed_vsp_out[miss_i]
+        if cache is not None:
+            cache.put(polarKeys[case_i], "polar", vsp_out[case_i])
+
+    if slice:
+        return vsp_out, streamMeshSlices(vspCases, geomData, misses, sliceKeys, cache, mglevel)
+
+    return vsp_out, None
+
+def streamMeshSlices(vspCases, geomData, misses, sliceKeys, cache=None, mglevel=None):
+    """Streams slice data of a single mesh one case at a time
+
+    Solved cases are read from the .slc file as they are needed (and added to the
+    cache), cached cases are loaded from the cache, so only one case is held in memory.
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        misses (int list): Indices of cases that were solved (in .slc file order)
+        sliceKeys (str list): Cache key of every case (None without a cache)
+        cache (ResultCache): Result cache (None if every case was solved)
+        mglevel (int): VSPAero mesh level it was solved on, None for the geometry as given
+
+    Yields:
+        SliceCase for every case, in the same order as vspCases (time spent parsing the .slc
+        file is added to the scaling history, see allocator.py)
+    """
+    import allocator
+    from slicedata import SliceCase, streamSliceArrays
+
+    solved = set(misses)
+    fresh = streamSliceArrays(geomData + ".slc") if len(misses) > 0 else iter(())
+    parse_seconds = 0.0
+
+    for case_i in range(len(vspCases)):
+        if case_i in solved:
+            start = time.time()
+            sliceCase = next(fresh)
+            parse_seconds += time.time() - start
+            if cache is not None:
+                cache.put(sliceKeys[case_i], "slicecase", sliceCase.toDict())
+        else:
+            columns = cache.get(sliceKeys[case_i], "slicecase")
+            if columns is None:
+                raise RuntimeError(f"Cached slice data for {vspCases[case_i]['filename']} was evicted during the run, "
+                                   "rerun with a larger cache or -nocache")
+            sliceCase = SliceCase.fromDict(columns)
+
+        yield sliceCase
+
+    if len(misses) > 0:
+        allocator.getHistory().record("slice_parse", geomData, 1, [resolveParams(vspCases[i]) for i in misses], parse_seconds, mglevel)
+
+
+def solveMeshSurrogate(vspCases, geomData, tolerance, threads=None, num_shards=1, cache=None, checkpoint=None, mirror=False,
+                       mglevel=None):
+    """Solves a single mesh one nested grid level at a time, filling in points a local surrogate predicts well
+
+    Points are grouped by the coarsest level of the nested quadrature grid that
+    contains them (see gridLevels()), so a sparse grid's points come first. Results
+    already in the cache (e.g. from a sparse study on the same mesh) are reused.
+    Before each level is solved, a surrogate fit through every point solved so far
+    fills in the points whose estimated error is within tolerance, the rest are
+    solved. Coefficients only (slice data is always solved).
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        tolerance (float): Largest estimated surrogate error to accept, relative to the range of each coefficient
+        threads (int): Number of cores given to this mesh
+        num_shards (int): Number of separate solver processes to split the cases across (None to pick, see solveMesh())
+        cache (ResultCache): Result cache (None to solve every case)
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        mirror (bool): True to also share results between cases that only differ in the sign of Beta
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+
+    Returns:
+        Parsed VSPAero output list, in the same order as vspCases
     """
-    os.system(f"{slicerFile} -slice {geomData}")
+    import numpy as np
+    from surrogate import LocalSurrogate, gridLevels
+
+    names = list(vspCases[0]['data'].keys())
+    params = np.array([[vspCase['data'][name] for name in names] for vspCase in vspCases], dtype=np.float64)
+    levels = gridLevels(params, names)
+    min_points = 2 * (params.shape[1] + 1) # Points needed before the surrogate is trusted
+
+    vsp_out = [None] * len(vspCases)
+    if cache is not None:
+        vsp_out = [cache.get(key, "polar") for key in cacheKeys(vspCases, geomData, mglevel=mglevel)[0]]
+    num_cached = sum(data is not None for data in vsp_out)
+
+    filled = set()
+    checks = [] # Relative surrogate errors at points that were predicted, then solved
+
+    for level in range(int(levels.max()) + 1 if len(levels) > 0 else 0):
+        pending = [case_i for case_i in np.flatnonzero(levels == level).tolist() if vsp_out[case_i] is None]
+        if len(pending) == 0:
+            continue
+
+        solved = [case_i for case_i in range(len(vspCases)) if vsp_out[case_i] is not None and case_i not in filled]
+        surrogate = None
+        if len(solved) >= min_points:
+            keys = list(vsp_out[solved[0]].keys())
+            surrogate = LocalSurrogate(params[solved], [[float(vsp_out[case_i][key]) for key in keys] for case_i in solved])
+            predictions = dict(zip(pending, surrogate.predict(params[pending]).tolist()))
+
+            for case_i, estimate in zip(pending, surrogate.estimateErrors(params[pending]).tolist()):
+                if estimate <= tolerance:
+                    vsp_out[case_i] = dict(zip(keys, predictions[case_i]))
+                    filled.add(case_i)
+
+        solve = [case_i for case_i in pending if case_i not in filled]
+        print(f"{geomData}: grid level {level}, {len(pending) - len(solve)} points filled by surrogate, {len(solve)} points to solve")
+        if len(solve) == 0:
+            continue
+
+        results = solveMeshCached([vspCases[case_i] for case_i in solve], geomData, threads, False, num_shards, cache, checkpoint, mirror,
+                                  mglevel)[0]
+        for case_i, data in zip(solve, results):
+            vsp_out[case_i] = data
+            if surrogate is not None:
+                actual = np.array([float(data[key]) for key in keys])
+                checks.append(float((np.abs(np.array(predictions[case_i]) - actual) / surrogate.scales).max()))
+
+    solved = [case_i for case_i in range(len(vspCases)) if case_i not in filled]
+    print(f"{geomData}: {num_cached} points cached, {len(solved) - num_cached} solved, {len(filled)} filled by surrogate "
+          f"(tolerance {tolerance:.2%} of each coefficient's range)")
+
+    if len(filled) > 0 and len(solved) >= min_points:
+        keys = list(vsp_out[solved[0]].keys())
+        rms, worst = LocalSurrogate(params[solved], [[float(vsp_out[case_i][key]) for key in keys] for case_i in solved]).looSummary()
+        print(f"{geomData}: surrogate leave-one-out error {rms:.2%} RMS, {worst:.2%} max")
+    if len(checks) > 0:
+        print(f"{geomData}: surrogate error at {len(checks)} points solved after prediction "
+              f"{np.sqrt(np.mean(np.square(checks))):.2%} RMS, {max(checks):.2%} max")
+
+    return vsp_out
+
+def calibrateSolverSettings(vspCases, geomData, threshold, threads=None, mglevel=None, reference=None):
+    """Picks the cheapest solver settings that keep a coarse level's coefficients close to the finest level's settings
+
+    A few cases spread over the level (see solversettings.sampleCases()) are
+    solved at the finest level's settings and at every one of SOLVER_CANDIDATES,
+    in a copy of the geometry under <geometry dir>/calibration. The fastest
+    settings whose CL, CDTot and CMy move by at most threshold (relative to each
+    coefficient's range over the sample) are used for the level. Picks are kept
+    in the calibration store (calibrationPath), so a mesh is calibrated again only
+    when its geometry, the solver, the settings, threshold or sample change.
+
+    Args:
+        vspCases (dictionary list): List containing cases from a single mesh
+        geomData (str): Path to geometry
+        threshold (float): Largest accepted coefficient change (e.g. 0.001)
+        threads (int): Number of cores given to this mesh
+        mglevel (int): VSPAero mesh level to solve on (see runSolver()), None for the geometry as given
+        reference (dict): Solver parameters of the finest level, None for DEFAULT_PARAMS
+
+    Returns:
+        Dictionary of solver parameters (see resolveParams())
+    """
+    import allocator
+    import profiling
+    import solversettings
+    from checkpoint import fingerprintData, fingerprintFiles
+    from scheduler import copyGeometry
+
+    reference = dict(reference or {})
+    for settings in SOLVER_CANDIDATES:
+        solversettings.checkSettings(settings, DEFAULT_PARAMS.keys())
+
+    sample = [{'filename': vspCases[i]['filename'], 'data': vspCases[i]['data']}
+              for i in solversettings.sampleCases([resolveParams(vspCase) for vspCase in vspCases])]
+    key = fingerprintData([allocator.geometryKey(geomData, mglevel), fingerprintFiles([vspAeroPath]), reference, SOLVER_CANDIDATES,
+                           threshold, [vspCase['data'] for vspCase in sample]])
+
+    store = solversettings.getStore()
+    entry = store.get(key)
+    if entry is None:
+        calibrationGeom = copyGeometry(geomData, os.path.join(os.path.dirname(geomData), "calibration", os.path.basename(geomData)))
+        print(f"{geomData}: calibrating solver settings on {len(sample)} cases")
+
+        trials = []
+        reference_out = None
+        for settings in [reference] + SOLVER_CANDIDATES:
+            start = time.time()
+            with profiling.stage("calibrate", mesh=geomData, cases=len(sample)):
+                solveCases([{**vspCase, 'settings': settings} for vspCase in sample], calibrationGeom, threads, mglevel=mglevel)
+                vsp_out = parseVSPAeroData(calibrationGeom)
+            reference_out = reference_out or vsp_out
+
+            trials.append({"settings": settings, "seconds": round(time.time() - start, 3),
+                           "change": solversettings.coefficientChange(reference_out, vsp_out)})
+            print(f"{geomData}: {settings or 'finest level settings'}: {trials[-1]['seconds']:.1f} s, "
+                  f"coefficients move {trials[-1]['change']:.3%}")
+
+        entry = {"mesh": geomData, "settings": solversettings.pickSettings(trials, threshold), "trials": trials}
+        store.put(key, entry)
+
+    print(f"{geomData}: solver settings {entry['settings'] or 'of the finest level'} (calibrated to {threshold:.3%})")
+    return entry["settings"]
 
 
 #############################################
@@ -217,23 +651,21 @@ def parseVSPAeroLineData(data_string):
 def parseVSPAeroData(filePath):
     """Parses VSPAero output from .polar file
 
+    The file is memory mapped and parsed in bulk (see fastparse.py), columns are
+    found by header name.
+
     Args:
-        filePath (str): Path to .polar file
+        filePath (str): Path to geometry, reads filePath.polar
     
     Returns:
-        List of dictionaries containing outputs from VSPAero
+        List of dictionaries containing CL, CDTot and CMy (floats) for each case
     """
-    vsp_out = open(filePath + ".polar")
+    from fastparse import polarCoefficients
 
-    with vsp_out as file:
-        vsp_out_lines = [line.rstrip() for line in file]
-    vsp_out.close()
+    coefficients = polarCoefficients(filePath + ".polar")
+    columns = [coefficients[name].tolist() for name in coefficients]
 
-    parsed_vspout = []
-    for line in vsp_out_lines[1:]:
-        parsed_vspout.append(parseVSPAeroLineData(line))
-
-    return parsed_vspout
+    return [dict(zip(coefficients, values)) for values in zip(*columns)]
 
 def parseSliceLineData(data_string):
     """Parses line from .slc file
@@ -256,6 +688,10 @@ def parseSliceLineData(data_string):
 def parseSliceData(filePath):
     """Parses slicer output from .slc file
 
+    Points are split into slices, edge sorted and given a normalized arc length
+    by the array engine in slicedata.py (see parseSliceArrays()), then converted
+    to dictionaries.
+
     Args:
         filePath (str): Path to .slc file
 
@@ -274,77 +710,9 @@ def parseSliceData(filePath):
            ]
         ]
     """
-    slice_data = open(filePath)
-
-    with slice_data as file:
-        slice_data_lines = [line.rstrip() for line in file]
-
-    slice_data.close()
- 
-    parsed_slice_data = [[]]
-    case_num = -1
-    i = 0
-
-    while i < len(slice_data_lines):
-        line = slice_data_lines[i]
-
-        if len(line) > 0:
-            if line[0] == 'B':
-                case_num = int(slice_data_lines[i + 1].split()[1])
-                i += 3  
-            else:
-                if len(parsed_slice_data) == case_num:
-                    parsed_slice_data.append([])
+    from slicedata import parseSliceArrays
 
-                parsed_line = parseSliceLineData(line)
-                parsed_slice_data[case_num].append(parsed_line)
-
-        i += 1
-
-    parsed_slice_data_reorg = []
-
-    for case in parsed_slice_data[1:]:
-        case_arr = []
-        slice_arr = []
-        for i, point in enumerate(case):
-            if i == 0:
-                slice_arr.append(point)
-            else:
-                if point['y'] != case[i - 1]['y']:
-                    case_arr.append(slice_arr)
-                    slice_arr = [point]
-                else:
-                    slice_arr.append(point)
-        
-        case_arr.append(slice_arr)
-        parsed_slice_data_reorg.append(case_arr)
-
-    for case_i, case in enumerate(parsed_slice_data_reorg):
-        for slice_i, slice in enumerate(case):
-            parsed_slice_data_reorg[case_i][slice_i] = edgeSort(slice)
-            
-            total_len = 0
-
-            for point_i in range(1, len(parsed_slice_data_reorg[case_i][slice_i])):
-                x1 = parsed_slice_data_reorg[case_i][slice_i][point_i - 1]['x']
-                x2 = parsed_slice_data_reorg[case_i][slice_i][point_i]['x']
-                diff = abs(x2 - x1)
-
-                total_len += diff
-
-            curr_len = 0
-            parsed_slice_data_reorg[case_i][slice_i][0]['arclen'] = 0.0
-
-            for point_i in range(1, len(parsed_slice_data_reorg[case_i][slice_i])):
-                x1 = parsed_slice_data_reorg[case_i][slice_i][point_i - 1]['x']
-                x2 = parsed_slice_data_reorg[case_i][slice_i][point_i]['x']
-                diff = abs(x2 - x1)
-
-                curr_len += diff
-
-                parsed_slice_data_reorg[case_i][slice_i][point_i]['arclen'] = curr_len / total_len
-
-    return parsed_slice_data_reorg
+    return [sliceCase.toLegacy() for sliceCase in parseSliceArrays(filePath)]
 
 def edgeSort(slice):
     """Sorts slice points by upper and lower edge
@@ -365,108 +733,55 @@ def edgeSort(slice):
 
     return upper_edge
 
-def genPoints(sliceData, arc_len_arr, x_arr):
-    """Interpolates fine mesh points onto coarser meshes
-    
-    Args:
-        sliceData (3D dict list): List containing slice points from all cases of a single mesh
-        arc_len_arr (dict list): List containing arc lengths from finest mesh
-        x_arr (dict list): List containing x values from finest mesh
-
-    Returns:
-        Interpolated slice data (3D list)
-    """
-    print("NUM CASES", len(sliceData))
-    for j in range(len(sliceData)):
-        max_point = len(sliceData[j][0])
-
-        for slice_i in range(len(sliceData[j])): #slice_i correspond with x_arr_i
-            lower_i = 0
-            upper_i = 1
-            new_slice = [] 
-
-            for x_coor in x_arr[slice_i]:
-                if x_coor == sliceData[j][slice_i][lower_i]["x"]:
-                    new_slice.append(sliceData[j][slice_i][lower_i])
-                
-                elif x_coor == sliceData[j][slice_i][upper_i]["x"]:
-                    new_slice.append(sliceData[j][slice_i][upper_i])
-                    lower_i = upper_i
-                    upper_i = (upper_i + 1) % max_point
-
-                else:
-                    if sliceData[j][slice_i][upper_i]["z"] < 0:
-                        if x_coor < sliceData[j][slice_i][upper_i]["x"]:
-                            lower_i = upper_i
-                            upper_i = (upper_i + 1) % max_point
-                    else:
-                        if x_coor > sliceData[j][slice_i][upper_i]["x"]:
-                            lower_i = upper_i
-                            upper_i = (upper_i + 1) % max_point
-
-                    new_point = {}
-                    x1 = sliceData[j][slice_i][lower_i]['x']
-                    z1 = sliceData[j][slice_i][lower_i]['z']
-                    x2 = sliceData[j][slice_i][upper_i]['x']
-                    z2 = sliceData[j][slice_i][upper_i]['z']
-                    x = x_coor
-                    print(x1, x2)
-                    z = z1 + (x - x1) * ((z2 - z1) / (x2 - x1))
-                    dCp = (sliceData[j][slice_i][lower_i]['dCp'] + sliceData[j][slice_i][upper_i]['dCp']) / 2
-
-                    new_point['x'] = x
-                    new_point['y'] = sliceData[j][slice_i][lower_i]['y']
-                    new_point['z'] = z
-                    new_point['dCp'] = dCp
-
-                    new_slice.append(new_point)
-
-            for arc_len_i, arc_len in enumerate(arc_len_arr[slice_i]):
-                new_slice[arc_len_i]['arclen'] = arc_len
-
-            sliceData[j][slice_i] = new_slice
-    
-    return sliceData
-
-def writeJsonFilesSlice(slice_out, vsp_cases):
-    """Writes JSON files from parsed slice data
+def writeJsonFilesSlice(slice_out, vsp_cases, bundle):
+    """Writes JSON files from parsed slice data into the json bundle
     
     Args:
         slice_out (3D dict list): List of parsed slice data
         vsp_cases (2D list): List of parsed database data
+        bundle (BundleWriter): Json bundle, see openBundle()
         
     Returns:
         None, writes out json files for Quest-post
     """
     for i, case in enumerate(slice_out): 
-        slice_out_dict = {"label": "VSPAero", "children":[]}
-
-        for j, slice in enumerate(case):
-            new_slice = {"label": f"cut y:{slice[0]['y']}", 
-                         "leaf": {
-                            "abscissa_names": ["arclen", "x", "y", "z"],
-                            "ordinate_names": ["dCp"],
-                            "ordinate_types": [0],
-                            "data": []
-                         }
-                        }
-            
-            slice_out_dict["children"].append(new_slice)
-            
-            for k, point in enumerate(slice):
-                slice_out_dict["children"][j]['leaf']["data"].append([k, [point['arclen'], point['x'], point['y'], point['z']], [point['dCp']]])
+        writeCaseJson(sliceJsonDict(case), vsp_cases[i], bundle)
+
+def sliceJsonDict(case):
+    """Builds Quest-post JSON data for the slices of a single case
+
+    Args:
+        case (2D dict list): Parsed slice data of a single case
+
+    Returns:
+        Dictionary containing a child for every slice
+    """
+    slice_out_dict = {"label": "VSPAero", "children":[]}
+
+    for j, slice in enumerate(case):
+        new_slice = {"label": f"cut y:{slice[0]['y']}", 
+                     "leaf": {
+                        "abscissa_names": ["arclen", "x", "y", "z"],
+                        "ordinate_names": ["dCp"],
+                        "ordinate_types": [0],
+                        "data": []
+                     }
+                    }
         
-        print(f"Writing {vsp_cases[i]['filename']}.json...")
-        slice_json = open(f"./QuestpostInputData/{vsp_cases[i]['filename']}.json", 'w')
-        json.dump(slice_out_dict, slice_json)
-    
+        slice_out_dict["children"].append(new_slice)
+        
+        for k, point in enumerate(slice):
+            slice_out_dict["children"][j]['leaf']["data"].append([k, [point['arclen'], point['x'], point['y'], point['z']], [point['dCp']]])
 
-def writeJsonFiles(vsp_out, vsp_cases):
-    """Writes JSON files from parsed vspaero output
+    return slice_out_dict
+
+def writeJsonFiles(vsp_out, vsp_cases, bundle):
+    """Writes JSON files from parsed vspaero output into the json bundle
     
     Args:
         vsp_out (3D dict list): List of parsed vspaero data
         vsp_cases (2D list): List of parsed database data
+        bundle (BundleWriter): Json bundle, see openBundle()
         
     Returns:
         None, writes out json files for Quest-post
@@ -484,237 +799,820 @@ def writeJsonFiles(vsp_out, vsp_cases):
         vsp_out_dict["leaf"]["ordinate_names"] = list(data.keys())
         vsp_out_dict["leaf"]["data"][0][2] = [float(data['CL']), float(data['CDTot']), float(data['CMy'])]
 
-        print(f"Writing {vsp_cases[i]['filename']}.json...")
-        vsp_json = open(f"./QuestpostInputData/{vsp_cases[i]['filename']}.json", 'w')
-        json.dump(vsp_out_dict, vsp_json)
+        writeCaseJson(vsp_out_dict, vsp_cases[i], bundle)
+
+def writeCaseJson(case_dict, vsp_case, bundle):
+    """Writes JSON file for a single case into the json bundle
 
-def bundleJson():
-    """Creates a json bundle from json files
-    
     Args:
-        None (File path to json files as a global variable)
-    
+        case_dict (dict): Quest-post JSON data for the case
+        vsp_case (dict): Case from parsed database
+        bundle (BundleWriter): Json bundle, see openBundle()
+
+    Returns:
+        None, writes out json file for Quest-post
+    """
+    print(f"Writing {vsp_case['filename']}.json...")
+    bundle.write(f"{vsp_case['filename']}.json", case_dict)
+
+def writeSliceCaseJson(sliceCase, vsp_case, bundle):
+    """Writes JSON file for the slices of a single case into the json bundle
+
+    The JSON is encoded straight from the slice arrays (see serializer.py), it
+    holds the same data as sliceJsonDict(sliceCase.toLegacy()).
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+        vsp_case (dict): Case from parsed database
+        bundle (BundleWriter): Json bundle, see openBundle()
+
     Returns:
-        None, bundles json files
+        None, writes out json file for Quest-post
     """
-    print("Json files written, bundling...")
-    os.system(f"cd QuestpostInputData; jar cf {outputFile}.bundle.json {outputFile}.*.json")
+    print(f"Writing {vsp_case['filename']}.json...")
+    bundle.writeSlice(f"{vsp_case['filename']}.json", sliceCase)
+
+def openBundle(compresslevel=None, serializer=None, path=None):
+    """Opens the json bundle for writing
 
-def deleteJsonFiles():
+    Cases are encoded straight into the bundle (a jar archive) as they are
+    written, replacing per-case json files and jar cf. Used as a context manager,
+    the bundle is moved into place on exit and left as it was on an error.
+
+    Args:
+        compresslevel (int): Deflate level 1-9, 0 to store entries uncompressed, None for bundle.DEFAULT_COMPRESSION
+        serializer (str): JSON serializer backend ("orjson", "stream" or "json"), None for serializer.DEFAULT_SERIALIZER
+        path (str): Path to bundle, None for the bundlePath global variable
+
+    Returns:
+        BundleWriter
+    """
+    from bundle import DEFAULT_COMPRESSION, BundleWriter
+
+    return BundleWriter(path or bundlePath, DEFAULT_COMPRESSION if compresslevel is None else compresslevel, serializer)
+
+def deleteJsonFiles(keep=(), directory=None):
     """Deletes json files
     
     Args:
-        None (File path to json files as a global variable)
+        keep (str list): Paths to json files that should not be deleted (e.g. the json bundle)
+        directory (str): Directory of the run's outputs, None for the directory of the bundlePath global variable
+            (a study only cleans its own directory, so studies running at the same time keep each other's bundles)
     
     Returns:
         None, deletes json files
     """
-    files = glob.glob(f"./QuestpostInputData/*.json")
+    import glob
+
+    keep = {os.path.normpath(f) for f in keep}
+    files = glob.glob(os.path.join(directory or os.path.dirname(bundlePath), "*.json"))
     for f in files:
-        os.remove(f)
+        if os.path.normpath(f) not in keep:
+            os.remove(f)
     print("Files Successfully Deleted")
 
 #############################################
 ##        RUN QUEST POSTPROCESSOR          ##
 #############################################
 
-def writePostFiles(questScript, questScriptMeasure, globalPath, output):
-    """Writes script for Quest-post application
+def writePostFiles(questScriptMeasure):
+    """Writes measure file for Quest-post application
+
+    The Quest-post script is written by PostSession.flush(), for the bundles it runs on.
     
     Args:
-       questScript (str): Path to Quest-post script
        questScriptMeasure (str): Path to Quest-post script measure file
-       globalPath (str): Global path to Quest-post script file
-       output (str): Name header for json file
     
     Returns:
-        None, Writes script file for Quest-post
+        None, Writes measure file for Quest-post (left untouched if it would not change)
+    """
+    from postsession import writeIfChanged
+
+    writeIfChanged(questScriptMeasure,
+                   "VSPAero	true\n"
+                   "CL	false\n"
+                   "ParPanelNoError	false	0	0	x	false	false	false	true	false	false	false	1-σ	false	false	1.0	false\n"
+                   "CDTot	false\n"
+                   "ParPanelNoError	false	0	0	x	false	false	false	false	false	false	false	1-σ	false	false	1.0	false\n"
+                   "CMy	false\n"
+                   "ParPanelNoError	false	0	0	x	false	false	false	false	false	false	false	1-σ	false	false	1.0	false\n")
+
+def openPostSession(force=False):
+    """Opens a Quest-post session that post-processes several bundles with one launcher
+
+    The measure file is written once here, before any run (or study) queues a bundle.
+
+    Args:
+        force (bool): True to post-process bundles that have not changed since their last post
+        (Quest launcher, script and record paths as global variables)
+
+    Returns:
+        PostSession (queued bundles are post-processed when it is flushed or closed)
     """
-    questScriptFile = open(f"{questScript}", 'w')
+    from postsession import PostSession
 
-    questScriptFile.write(f"remote(false)\n")
-    questScriptFile.write(f"cd({globalPath})\n")
-    questScriptFile.write(f"panel(json) read_database(*) read_measurement(./QuestpostInputData/{output}.bundle.json) read_measurementconfig({questScriptMeasure})")
-    questScriptFile.close()
+    writePostFiles(questScriptMeasurePath)
+    return PostSession(questLauncherPath, questScriptPath, questScriptMeasurePath, mainDir, postRecordPath, force)
 
-    questScriptMeasureFile = open(f"{questScriptMeasure}", 'w')
-    questScriptMeasureFile.write("VSPAero	true\n")
-    questScriptMeasureFile.write("CL	false\n")
-    questScriptMeasureFile.write("ParPanelNoError	false	0	0	x	false	false	false	true	false	false	false	1-σ	false	false	1.0	false\n")
-    questScriptMeasureFile.write("CDTot	false\n")
-    questScriptMeasureFile.write("ParPanelNoError	false	0	0	x	false	false	false	false	false	false	false	1-σ	false	false	1.0	false\n")
-    questScriptMeasureFile.write("CMy	false\n")
-    questScriptMeasureFile.write("ParPanelNoError	false	0	0	x	false	false	false	false	false	false	false	1-σ	false	false	1.0	false\n")
-    questScriptMeasureFile.close()
+def runPost(questScript, questLauncher, post=None, path=None):
+    """Runs Quest-post application on the json bundle
 
-def runPost(questScript, questLauncher):
-    """Runs Quest-post application
+    Quest-post is skipped if it already ran on a bundle with the same cases.
 
     Args:
         questScript (str): Path to Quest-post script
         questLauncher (str): Path to Quest launcher
+        post (PostSession): Session the bundle is queued in (post-processed with the session's other
+            bundles when it is flushed), None to run Quest-post now
+        path (str): Path to bundle, None for the bundlePath global variable
     """
-    os.system(f"java -jar {questLauncher} -post -script {questScript} -debug")
+    from postsession import PostSession
+
+    session = post
+    if session is None:
+        writePostFiles(questScriptMeasurePath)
+        session = PostSession(questLauncher, questScript, questScriptMeasurePath, mainDir, postRecordPath)
+    session.submit(path or bundlePath)
+
+    if post is None:
+        session.flush()
 
 
 #############################################
 ##               AEROQUEST                 ##
 #############################################
 
-def aeroquest(meshPathArr, num_levels):
+def printCacheStats(cache):
+    """Prints result cache statistics and adds them to the cache's running totals
+
+    Args:
+        cache (ResultCache): Result cache (None if caching is disabled)
+
+    Returns:
+        None, prints cache statistics
+    """
+    if cache is None:
+        return
+
+    stats = cache.stats()
+    cache.saveStats()
+    print(f"Result Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate), "
+          f"{stats['evictions']} evicted, {stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MB")
+
+def writeExecutionTime(start, outputDir=None):
+    """Writes the wall time of a run to execution.time
+
+    Args:
+        start (float): time.time() when the run started
+        outputDir (str): Directory of the run's outputs, None for the current directory
+
+    Returns:
+        None, writes out execution.time
+    """
+    with open(os.path.join(outputDir or ".", "execution.time"), "w") as time_file:
+        time_file.write(f"Execution Time: {time.time() - start} s")
+
+def levelCosts(meshPathArr, vspCases, mglevels=None):
+    """Estimates the solver work of every mesh level
+
+    The work is predicted case by case from the scaling history (see allocator.py),
+    so once a mesh has enough solver runs, levels with looser solver settings or
+    easier flight conditions cost less. Meshes with no runs are scaled by panel count.
+
+    Args:
+        meshPathArr (str list): List of strings containing paths to geometry files
+        vspCases (2D list): Cases of every mesh level, in the same order
+        mglevels (int list): VSPAero mesh level of every mesh (see aeroquest_mg()), None to solve each as given
+
+    Returns:
+        List containing single thread solver seconds of each level (relative units before any solver run is recorded)
+    """
+    import allocator
+
+    mglevels = mglevels or [None] * len(meshPathArr)
+    return [allocator.getHistory().levelCost(meshPath, [resolveParams(vspCase) for vspCase in cases], mglevel)
+            for meshPath, cases, mglevel in zip(meshPathArr, vspCases, mglevels)]
+
+def printRunEstimate(meshPathArr, vspCases, costs, slice=False, total_cores=None, mglevels=None):
+    """Prints the predicted run time of every mesh level before the run starts (see allocator.py)
+
+    Levels run at the same time, so the run takes as long as its slowest level.
+    Cached cases are counted as if they were solved.
+
+    Args:
+        meshPathArr (str list): List of strings containing paths to geometry files
+        vspCases (2D list): Cases of every mesh level, in the same order
+        costs (float list): Solver work of each level cores are split by (see levelCosts())
+        slice (bool): True if the levels are sliced
+        total_cores (int): Cores split across levels (defaults to all available)
+        mglevels (int list): VSPAero mesh level of every mesh (see aeroquest_mg()), None to solve each as given
+
+    Returns:
+        Predicted seconds of the run, None if a stage of some level has no recorded timings yet
+    """
+    import allocator
+    from runner import formatSeconds
+    from scheduler import allocateCores, availableCores
+
+    mglevels = mglevels or [None] * len(meshPathArr)
+    threads = allocateCores(costs, total_cores or availableCores())
+    estimates = [allocator.getHistory().estimateLevel(meshPath, [resolveParams(vspCase) for vspCase in cases], thread, slice, mglevel)
+                 for meshPath, cases, thread, mglevel in zip(meshPathArr, vspCases, threads, mglevels)]
+
+    if not all(measured for stages, measured in estimates):
+        print(f"Estimated run time: -- (no timings recorded yet for every mesh, see {scalingPath})")
+        return None
+
+    for meshPath, (stages, measured) in zip(meshPathArr, estimates):
+        print(f"Estimated {meshPath}: {formatSeconds(sum(stages.values()))} "
+              f"({', '.join(f'{stage} {formatSeconds(seconds)}' for stage, seconds in stages.items())})")
+
+    total = max(sum(stages.values()) for stages, measured in estimates)
+    print(f"Estimated run time: {formatSeconds(total)}, before cache hits")
+    return total
+
+def runBundlePath(outputDir=None):
+    """Returns the path to the json bundle of a run
+
+    Args:
+        outputDir (str): Directory of the run's outputs (created if missing), None for the bundlePath global variable
+
+    Returns:
+        Path to json bundle
+    """
+    if outputDir is None:
+        return bundlePath
+
+    os.makedirs(outputDir, exist_ok=True)
+    return os.path.join(outputDir, f"{outputFile}.bundle.json")
+
+def runArchivePath(outputDir=None):
+    """Returns the path to the columnar archive of a run
+
+    Args:
+        outputDir (str): Directory of the run's outputs, None for the archivePath global variable
+
+    Returns:
+        Path to archive directory
+    """
+    return archivePath if outputDir is None else os.path.join(outputDir, f"{outputFile}.archive")
+
+def openArchive(slice=False, path=None, enabled=True):
+    """Opens the columnar archive of a run for writing
+
+    Args:
+        slice (bool): True to store slice points instead of coefficients
+        path (str): Path to archive directory, None for the archivePath global variable
+        enabled (bool): False to skip the archive
+
+    Returns:
+        ArchiveWriter, or a context that does nothing (as None) when not enabled
+    """
+    import contextlib
+
+    from archive import ArchiveWriter
+
+    return ArchiveWriter(path or archivePath, outputFile, slice) if enabled else contextlib.nullcontext()
+
+def writeBundleFromArchive(archiveDir=None, compresslevel=None, serializer=None, path=None):
+    """Rewrites the json bundle from a columnar archive, without the solver or any text parsing
+
+    Args:
+        archiveDir (str): Path to archive directory, None for the archivePath global variable
+        compresslevel (int): Deflate level of the json bundle, 0 to store uncompressed (None for the default)
+        serializer (str): JSON serializer backend, None for serializer.DEFAULT_SERIALIZER
+        path (str): Path to bundle, None for the bundlePath global variable
+
+    Returns:
+        None, writes out json bundle
+    """
+    from archive import Archive
+
+    archive = Archive(archiveDir or archivePath)
+
+    with openBundle(compresslevel, serializer, path) as bundle:
+        for level in archive.levels():
+            vspCases = [{'filename': filename} for filename in archive.column(level, "filenames").tolist()]
+
+            if archive.slice:
+                for sliceCase, vsp_case in zip(archive.sliceCases(level), vspCases):
+                    writeSliceCaseJson(sliceCase, vsp_case, bundle)
+            else:
+                writeJsonFiles(archive.coefficients(level), vspCases, bundle)
+
+    print(f"Json bundle written to {path or bundlePath}")
+
+def aeroquest(meshPathArr, num_levels, num_shards=1, cache=None, checkpoint=None, compresslevel=None,
+              serializer=None, mirror=False, surrogate=None, post=None, archive=True, total_cores=None, databaseFile=None,
+              outputDir=None, mglevels=None, calibrate=None, profile=None):
     """Runs Aeroquest for non-slice data
 
+    Every grid level is solved with DEFAULT_PARAMS, unless a solver profile or
+    calibration picks its settings.
+
     Args:
         meshPathArr (str list): List of strings containing paths to geometry files
         num_levels (int): Number of meshes
+        num_shards (int): Number of solver processes each mesh is split across (None to pick, see solveMesh())
+        cache (ResultCache): Result cache (None to solve every case)
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        compresslevel (int): Deflate level of the json bundle, 0 to store uncompressed (None for the default)
+        serializer (str): JSON serializer backend, None for serializer.DEFAULT_SERIALIZER
+        mirror (bool): True to solve cases that only differ in the sign of Beta once (symmetric geometry)
+        surrogate (float): Surrogate tolerance relative to each coefficient's range (see solveMeshSurrogate()),
+            None to solve every case
+        post (PostSession): Session the bundle is queued in for Quest-post, None to run Quest-post before returning
+        archive (bool): False to skip writing the columnar archive of the results (see archive.py)
+        total_cores (int): Cores to split across mesh levels (defaults to all available)
+        databaseFile (str): Path to database, None for the databasePath global variable
+        outputDir (str): Directory the bundle and execution time are written to, None for the
+            bundlePath global variable and the current directory
+        mglevels (int list): VSPAero mesh level to solve each mesh on (see aeroquest_mg()), None to solve each as given
+        calibrate (float): Coefficient change threshold to pick the settings of levels past the finest with
+            (see calibrateSolverSettings()), None to use the solver profile
+        profile (str or dict list): Solver settings of each grid level (see levelSolverSettings()), None for
+            DEFAULT_SOLVER_PROFILE
 
     Returns:
         None, Runs Aeroquest
     """
-    vspCases = parseDatabase(databasePath, outputFile, num_levels)
-    vspCases = vspCases[::-1]
+    import profiling
+    from scheduler import scheduleLevels
+
     start = time.time()
+    with profiling.stage("database"):
+        vspCases = parseDatabase(databaseFile or databasePath, outputFile, num_levels)
+        vspCases = levelSolverSettings(vspCases[::-1], profile)
+
+    if surrogate is not None:
+        from surrogate import gridLevels
+        for levelCases in vspCases:
+            gridLevels(levelCases.params, levelCases.database.names) # Fails before any level is solved if the grid is not nested
+
+    bundleFile = runBundlePath(outputDir)
+    deleteJsonFiles([bundleFile] + (list(post.pending) if post is not None else []), outputDir) # Bundles queued for Quest-post
+
+    vsp_out = [None] * len(meshPathArr)
+    mglevels = mglevels or [None] * len(meshPathArr)
+
+    def solveLevel(i, meshPath, threads):
+        print("Current Mesh: ", meshPath if mglevels[i] is None else f"{meshPath} (VSPAero mesh level {mglevels[i]})")
+        if calibrate is not None and i > 0:
+            vspCases[i] = vspCases[i].withSettings(calibrateSolverSettings(vspCases[i], meshPath, calibrate, threads, mglevels[i],
+                                                                           vspCases[0].settings))
+
+        with profiling.tags(mesh=meshPath, level=i, cases=len(vspCases[i])):
+            if surrogate is not None:
+                vsp_out[i] = solveMeshSurrogate(vspCases[i], meshPath, surrogate, threads, num_shards, cache, checkpoint, mirror,
+                                                mglevels[i])
+            else:
+                vsp_out[i] = solveMeshCached(vspCases[i], meshPath, threads, False, num_shards, cache, checkpoint, mirror,
+                                             mglevels[i])[0]
+
+    def finishLevel(i, meshPath):
+        with profiling.tags(mesh=meshPath, level=i, cases=len(vspCases[i])):
+            with profiling.stage("json"):
+                writeJsonFiles(vsp_out[i], vspCases[i], bundle)
+            if results is not None:
+                with profiling.stage("archive"):
+                    results.writeLevel(i, meshPath, vspCases[i], vsp_out[i])
+
+    costs = levelCosts(meshPathArr, vspCases, mglevels)
+    printRunEstimate(meshPathArr, vspCases, costs, False, total_cores, mglevels)
+
+    with openBundle(compresslevel, serializer, bundleFile) as bundle, openArchive(False, runArchivePath(outputDir), archive) as results:
+        scheduleLevels(meshPathArr, solveLevel, finishLevel, total_cores, costs)
+    printCacheStats(cache)
+
+    print(f"Json bundle written to {bundleFile}")
+    runPost(questScriptPath, questLauncherPath, post, bundleFile)
+    writeExecutionTime(start, outputDir)
+
+def mgLevelPaths(geomData, num_levels):
+    """Names the fine geometry once for every grid level solved on VSPAero's mesh levels
+
+    Every level is solved in the fine geometry's own directory, on the same
+    geometry files: levels past the finest get hard links <geometry>_mg<level>
+    (see scheduler.linkGeometry()), no mesh is copied or built. Each level still
+    runs its own solver process under its own name, because VSPAero names its
+    outputs (.polar, .adb, ...) after the geometry and levels are solved at the
+    same time; the setup VSPAero does in memory cannot be handed from one
+    process to the next, so it is not shared between levels.
 
-    for i, meshPath in enumerate(meshPathArr):
-        print("Current Mesh: ", meshPath)
-        deleteVspAeroFiles(meshPath)
-        writeVspAeroFiles(vspCases[i], meshPath)
-        runSolver(vspAeroPath, meshPath)
+    Args:
+        geomData (str): Path to fine geometry
+        num_levels (int): Number of grid levels
 
-    deleteJsonFiles()
-    for i, vspCase in enumerate(vspCases):
-        writeJsonFiles(parseVSPAeroData(meshPathArr[i]), vspCase)
+    Returns:
+        List of paths to geometry, finest level first (the finest is geomData itself)
+    """
+    from scheduler import linkGeometry
 
-    bundleJson()
-    writePostFiles(questScriptPath, questScriptMeasurePath, mainDir, outputFile)
-    end = time.time()
+    return [geomData] + [linkGeometry(geomData, f"{geomData}_mg{level + 1}") for level in range(1, num_levels)]
 
-    time_file = open("execution.time", "w")
-    time_file.write(f"Execution Time: {start - end} s")
-    runPost(questScriptPath, questLauncherPath)
+def aeroquest_mg(geomData, num_levels, num_shards=1, cache=None, checkpoint=None, compresslevel=None, serializer=None,
+                 mirror=False, surrogate=None, post=None, archive=True, total_cores=None, databaseFile=None, outputDir=None,
+                 calibrate=None, profile=None):
+    """Runs Aeroquest for non-slice data on one geometry, with VSPAero coarsening it for every grid level
 
-def aeroquest_mg(geomDataPath, polarPathArr):
-  """Runs Aeroquest for non-slice data with mglevel
+    Instead of a separately built mesh per Quest-prep grid level, grid level i
+    (0 for the finest) is solved on the fine geometry at VSPAero mesh level i + 1
+    (see runSolver()). Results go through the same pipeline as aeroquest(), so
+    the bundle has the same cases and the database's level structure.
 
     Args:
-        geomDataPath (str): Contains path to fine mesh
-        polarPathArr (str list): List of strings containing paths to polar files
+        geomData (str): Path to fine geometry
+        num_levels (int): Number of grid levels
+        (Remaining arguments are the same as for aeroquest())
 
     Returns:
         None, Runs Aeroquest
     """
-    vspCases = parseDatabase(databasePath, outputFile)
-    print(len(vspCases))
-
-    deleteJsonFiles()
-    for i, meshPath in enumerate(polarDataArr):
-        deleteVspAeroFiles(geomDataPath)
-        writeVspAeroFiles(vspCases[i], geomDataPath)
-        runSolver(vspAeroPath, i + 1, geomDataPath)
-        
-        writeJsonFiles(parseVSPAeroData(polarPathArr[i]), vspCases[i])
+    aeroquest(mgLevelPaths(geomData, num_levels), num_levels, num_shards, cache, checkpoint, compresslevel, serializer, mirror,
+              surrogate, post, archive, total_cores, databaseFile, outputDir, [None] + list(range(2, num_levels + 1)), calibrate,
+              profile)
 
-    bundleJson()
-    writePostFiles(questScriptPath, questScriptMeasurePath, mainDir, outputFile)
-    runPost(questScriptPath, questLauncherPath)
-  
-def aeroquestSlice(meshPathArr, num_levels):
+def aeroquestSlice(meshPathArr, num_levels, num_shards=1, cache=None, checkpoint=None, interp_mode="linear",
+                   compresslevel=None, serializer=None, post=None, archive=True, total_cores=None,
+                   databaseFile=None, outputDir=None, profile=None):
     """Runs Aeroquest for slice data
 
+    Every grid level is solved with DEFAULT_PARAMS, unless a solver profile picks its settings.
+
     Args:
         meshPathArr (str list): List of strings containing paths to geometry files
         num_levels (int): Number of meshes
+        num_shards (int): Number of solver processes each mesh is split across (None to pick, see solveMesh())
+        cache (ResultCache): Result cache (None to solve every case)
+        checkpoint (Checkpoint): Checkpoint manifest, stages that already finished are skipped
+        interp_mode (str): Interpolation onto finest mesh stations, "linear" or "cubic"
+        compresslevel (int): Deflate level of the json bundle, 0 to store uncompressed (None for the default)
+        serializer (str): JSON serializer backend, None for serializer.DEFAULT_SERIALIZER
+        post (PostSession): Session the bundle is queued in for Quest-post, None to run Quest-post before returning
+        archive (bool): False to skip writing the columnar archive of the results (see archive.py)
+        total_cores (int): Cores to split across mesh levels (defaults to all available)
+        databaseFile (str): Path to database, None for the databasePath global variable
+        outputDir (str): Directory the bundle and execution time are written to, None for the
+            bundlePath global variable and the current directory
+        profile (str or dict list): Solver settings of each grid level (see levelSolverSettings()), None for
+            DEFAULT_SOLVER_PROFILE
 
     Returns:
         None, Runs Aeroquest for slice data
     """
-    vspCases = parseDatabase(databasePath, outputFile, num_levels)
-    vspCases = vspCases[::-1]
+    from concurrent.futures import Future
+
+    import profiling
+    from scheduler import scheduleLevels
+    from slicedata import interpolateLevel
+
+    start = time.time()
+    with profiling.stage("database"):
+        vspCases = parseDatabase(databaseFile or databasePath, outputFile, num_levels)
+        vspCases = levelSolverSettings(vspCases[::-1], profile)
 
-    for i, meshPath in enumerate(meshPathArr):
+    bundleFile = runBundlePath(outputDir)
+    deleteJsonFiles([bundleFile] + (list(post.pending) if post is not None else []), outputDir) # Bundles queued for Quest-post
+
+    reference = Future() # First case of finest mesh, its points are the interpolation stations
+    slice_out = [None] * len(meshPathArr)
+
+    def solveLevel(i, meshPath, threads):
         print("Current Mesh: ", meshPath)
-        deleteVspAeroFiles(meshPath)
-        writeVspAeroFiles(vspCases[i], meshPath)
-        runSolver(vspAeroPath, meshPath)
-        createSliceData(slicerPath, meshPath)
+        try:
+            with profiling.tags(mesh=meshPath, level=i, cases=len(vspCases[i])):
+                slice_out[i] = solveMeshCached(vspCases[i], meshPath, threads, True, num_shards, cache, checkpoint)[1]
+                slice_out[i] = profiling.iterate("slice_parse", slice_out[i], mesh=meshPath, level=i, cases=len(vspCases[i]))
+
+            if i == 0:
+                first = next(slice_out[0])
+                slice_out[0] = itertools.chain([first], slice_out[0])
+                reference.set_result(first)
+        except Exception as e:
+            if i == 0:
+                reference.set_exception(e) # Unblocks coarser meshes waiting on the finest mesh
+            raise
+
+    def finishLevel(i, meshPath):
+        stations = reference.result() # Coarser meshes wait here for the finest mesh
 
-    deleteJsonFiles()
+        def interpolate(sliceCases):
+            while chunk := list(itertools.islice(sliceCases, interpChunk)):
+                with profiling.stage("interpolate", total=True):
+                    chunk = interpolateLevel(chunk, stations, interp_mode)
+                yield from chunk
 
-    arc_len_arr = []
-    x_arr = []
+        # Cases are read and interpolated interpChunk at a time, then archived and written one at a time
+        with profiling.tags(mesh=meshPath, level=i, cases=len(vspCases[i])), profiling.stage("finish"):
+            sliceCases = interpolate(slice_out[i])
+            if results is not None:
+                sliceCases = results.writeSliceLevel(i, meshPath, vspCases[i], sliceCases)
 
-    for i in range(len(vspCases)):
-        filePath = meshPathArr[i] + ".slc"
-        sliceData = parseSliceData(filePath)
+            for case_i, sliceCase in enumerate(sliceCases):
+                with profiling.stage("json", total=True):
+                    writeSliceCaseJson(sliceCase, vspCases[i][case_i], bundle)
 
-        if i == 0:
-            for slice in sliceData[0]:
-                arc_len_arr.append([point['arclen'] for point in slice])
-                x_arr.append([point['x'] for point in slice])
+    costs = levelCosts(meshPathArr, vspCases)
+    printRunEstimate(meshPathArr, vspCases, costs, True, total_cores)
+
+    with openBundle(compresslevel, serializer, bundleFile) as bundle, openArchive(True, runArchivePath(outputDir), archive) as results:
+        scheduleLevels(meshPathArr, solveLevel, finishLevel, total_cores, costs)
+    printCacheStats(cache)
+
+    print(f"Json bundle written to {bundleFile}")
+    runPost(questScriptPath, questLauncherPath, post, bundleFile)
+    writeExecutionTime(start, outputDir)
+
+def runStudy(study, total_cores, cache=None, post=None, resume=False, compresslevel=None, serializer=None):
+    """Runs one study of a manifest
+
+    Args:
+        study (Study): Study to run
+        total_cores (int): Cores given to the study
+        cache (ResultCache): Result cache shared by every study (None to solve every case)
+        post (PostSession): Session the study's bundle is queued in for Quest-post
+        resume (bool): True to pick up at the first unfinished stage of the study's previous run
+        compresslevel (int): Deflate level of the json bundle, 0 to store uncompressed (None for the default)
+        serializer (str): JSON serializer backend, None for serializer.DEFAULT_SERIALIZER
 
-        sliceData = genPoints(sliceData, arc_len_arr, x_arr) # Interpolation and Sorting
-        writeJsonFilesSlice(sliceData, vspCases[i])
+    Returns:
+        None, writes out the study's bundle to <studyDir>/<study name>/
+    """
+    from checkpoint import Checkpoint
+
+    outputDir = os.path.join(studyDir, study.name)
+    os.makedirs(outputDir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(outputDir, os.path.basename(checkpointPath)), resume)
+
+    if study.slice:
+        aeroquestSlice(study.meshes, len(study.meshes), study.shards, cache, checkpoint, study.interp, compresslevel, serializer,
+                       post, total_cores=total_cores, databaseFile=study.database, outputDir=outputDir,
+                       profile=study.solverprofile)
+    else:
+        aeroquest(study.meshes, len(study.meshes), study.shards, cache, checkpoint, compresslevel, serializer, study.mirror,
+                  study.surrogate, post, total_cores=total_cores, databaseFile=study.database, outputDir=outputDir,
+                  calibrate=study.calibrate, profile=study.solverprofile)
+
+def runStudies(manifestPath, total_cores=None, cache=None, post=None, resume=False, compresslevel=None,
+               serializer=None):
+    """Runs every study of a manifest under a shared core budget (see study.scheduleStudies())
+
+    Args:
+        manifestPath (str): Path to study manifest (see study.loadManifest())
+        total_cores (int): Cores shared by every study (defaults to all available)
+        cache (ResultCache): Result cache shared by every study (None to solve every case)
+        post (PostSession): Session every bundle is queued in for Quest-post
+        resume (bool): True to pick up each study at the first unfinished stage of its previous run
+        compresslevel (int): Deflate level of the json bundles, 0 to store uncompressed (None for the default)
+        serializer (str): JSON serializer backend, None for serializer.DEFAULT_SERIALIZER
+
+    Returns:
+        None, Runs every study
+    """
+    from study import loadManifest, scheduleStudies
 
-    bundleJson()
-    writePostFiles(questScriptPath, questScriptMeasurePath, mainDir, outputFile)
-    runPost(questScriptPath, questLauncherPath)
+    studies = loadManifest(manifestPath, geometrySets)
+    timings = scheduleStudies(studies, lambda study, cores: runStudy(study, cores, cache, post, resume, compresslevel, serializer),
+                              total_cores)
+
+    for study in studies:
+        print(f"Study {study.name}: {len(study.meshes)} meshes, {timings[study.name]['cores']} cores, "
+              f"{timings[study.name]['wall']:.1f} s -> {runBundlePath(os.path.join(studyDir, study.name))}")
 
 #############################################
-##              FLAG PARSING               ##
+##              COMMAND LINE               ##
 #############################################
 
-if len(sys.argv) > 1:
-    match sys.argv[1]:
-        case "-h":
-            print("Format: python3 Aeroquest.py <command type> <mesh number (1-3)> <-slice (for slice)>\n")
-            print("-h: Help Menu")
-            print("-w: Write .VSPAero Files")
-            print("-d: Delete .VSPAero Files")
-            print("-s: Runs VSPAero Solver")
-            print("-ws: Runs full Quest/VSP Wrapper, to run for slice data add -slice flag")
-            print("-wsmg: Runs full Quest/VSP Wrapper with mglevel")
-        case "-d":
+def getFlagValue(flag, default, args=None):
+    """Returns the value following an optional flag
+
+    Args:
+        flag (str): Flag to look for (e.g. -shards)
+        default (str): Value returned if flag is not provided
+        args (str list): Command line arguments, None for sys.argv
+
+    Returns:
+        Value following flag
+    """
+    args = sys.argv if args is None else args
+    if flag in args[:-1]:
+        return args[args.index(flag) + 1]
+
+    return default
+
+def getCompressLevel(args):
+    """Returns the -compress flag's deflate level, None if it is not given"""
+    compresslevel = getFlagValue("-compress", None, args)
+    return int(compresslevel) if compresslevel is not None else None
+
+def getTimeouts(args):
+    """Returns the -timeout flag's seconds by process runner stage, None if it is not given
+
+    -timeout SECONDS applies to every process, -timeout solve=S,slice=S,post=S to
+    each stage listed (stages left out have no timeout).
+    """
+    timeout = getFlagValue("-timeout", None, args)
+    if timeout is None:
+        return None
+
+    if "=" not in timeout:
+        return {"default": float(timeout)}
+
+    timeouts = {}
+    for entry in timeout.split(","):
+        stage, _, seconds = entry.partition("=")
+        if stage not in timeoutStages:
+            raise ValueError(f"Unknown -timeout stage {stage}, expected one of {', '.join(timeoutStages)}")
+        timeouts[timeoutStages[stage]] = float(seconds)
+
+    return timeouts
+
+def configureRun(args):
+    """Sets up profiling, solver scaling history and the process runner for a run from its flags
+
+    Args:
+        args (str list): Command line arguments (-profile, -trace, -timeout, -retries, -progress, -nosweep)
+
+    Returns:
+        None, call finishRun() once the run is done
+    """
+    import allocator
+    import profiling
+    import runner
+    import solversettings
+
+    global sweepCases
+    sweepCases = "-nosweep" not in args
+
+    if "-profile" in args or "-trace" in args:
+        profiling.enable(profilePath, tracePath if "-trace" in args else None)
+    allocator.configure(scalingPath)
+    solversettings.configure(calibrationPath)
+
+    runner.configure(logDir, getTimeouts(args), int(getFlagValue("-retries", 0, args)), float(getFlagValue("-progress", runner.PROGRESS_INTERVAL, args)))
+
+def finishRun():
+    """Stops the process runner and profiling started by configureRun() and saves the run's scaling history"""
+    import allocator
+    import profiling
+    import runner
+
+    runner.shutdown()
+    profiling.disable()
+    allocator.getHistory().save()
+
+def main(args):
+    """Runs a command line command
+
+    Only the modules a command needs are imported, so delete and other quick
+    commands start in tens of milliseconds (see cli.py and tests/test_startup.py).
+
+    Args:
+        args (str list): Command and its arguments (sys.argv[1:])
+
+    Returns:
+        None, runs the command
+    """
+    if len(args) == 0:
+        print("Error: No Arguments Provided")
+        return
+
+    match args[0]:
+        case "help" | "-h":
+            from cli import printHelp
+            printHelp()
+
+        case "delete" | "-d":
             deleteVspAeroFiles(geomDataPath)
-        case "-w":
+
+        case "write" | "-w":
             vspCases = parseDatabase(databasePath, outputFile)
             writeVspAeroFiles(vspCases[0], geomDataPath)
 
-        case "-s":
-            runSolver(vspAeroPath, geomDataPath)
-        
-        case "-ws":
-            if len(sys.argv) < 3:
+        case "solve" | "-s":
+            configureRun(args[1:])
+            try:
+                runSolver(vspAeroPath, geomDataPath)
+            finally:
+                finishRun()
+
+        case "slice":
+            configureRun(args[1:])
+            try:
+                createSliceData(slicerPath, geomDataPath)
+            finally:
+                finishRun()
+
+        case "parse":
+            databaseFile = args[1] if len(args) > 1 and not args[1].startswith("-") else databasePath
+            vspCases = parseDatabase(databaseFile, outputFile)
+            print(f"{databaseFile}: {sum(len(level) for level in vspCases)} cases, {len(vspCases)} mesh levels")
+            for level, levelCases in enumerate(vspCases[::-1]):
+                print(f"    Level {level}{' (finest)' if level == 0 else ''}: {len(levelCases)} cases")
+
+        case "run" | "-ws" | "-wsmg":
+            if len(args) < 2:
                 print("Error: Missing Mesh Number Arg")
-            else:
-                geomDataArr = []
-                polarDataArr = []
-                match sys.argv[2]:
-                    case "1":
-                        geomDataArr = [geomDataPath]
-                    case "2":
-                        geomDataArr = [geomDataPath, geomDataPathCoarse]
-                    case "3":
-                        geomDataArr = [geomDataPath, geomDataPathMed, geomDataPathCoarse]
-                    case _:
-                        print("Error: Invalid Mesh Number")
-                        sys.exit()
-
-            if len(sys.argv) < 4:
-                aeroquest(geomDataArr, int(sys.argv[2]))
-            else:
-                print(len(sys.argv))
-                if sys.argv[3] == "-slice":
-                    print("Outputting Slice Data")
-                    aeroquestSlice(geomDataArr, int(sys.argv[2]))
-                  
-        case "-wsmg":
-                  polarDataArr = [polarFilePath, polarFilePathMed, polarFilePathCoarse]
-                  aeroquest_mg(geomDataPath, polarDataArr)
-          
+                return
+
+            from cache import ResultCache
+            from checkpoint import Checkpoint
+
+            flags = args[2:]
+            mg = args[0] == "-wsmg" or "-mg" in flags
+            if mg and "-slice" in flags:
+                print("Error: -mg does not support slice data")
+                return
+
+            match args[1]:
+                case "1":
+                    geomDataArr = [geomDataPath]
+                case "2":
+                    geomDataArr = [geomDataPath, geomDataPathCoarse]
+                case "3":
+                    geomDataArr = [geomDataPath, geomDataPathMed, geomDataPathCoarse]
+                case level if mg and level.isdigit() and int(level) > 0:
+                    geomDataArr = None # Grid levels are set up from geomDataPath by aeroquest_mg()
+                case _:
+                    print("Error: Invalid Mesh Number")
+                    return
+
+            num_shards = getFlagValue("-shards", "1", flags)
+            num_shards = None if num_shards == "auto" else int(num_shards)
+            cache = None if "-nocache" in flags else ResultCache(cachePath)
+            checkpoint = Checkpoint(checkpointPath, "-resume" in flags)
+            compresslevel = getCompressLevel(flags)
+            serializer = getFlagValue("-serializer", None, flags)
+            profile = getFlagValue("-solverprofile", None, flags)
+
+            configureRun(flags)
+            try:
+                with openPostSession("-repost" in flags) as post:
+                    if "-slice" in flags:
+                        print("Outputting Slice Data")
+                        aeroquestSlice(geomDataArr, int(args[1]), num_shards, cache, checkpoint, getFlagValue("-interp", "linear", flags),
+                                       compresslevel, serializer, post, "-noarchive" not in flags, profile=profile)
+                    else:
+                        surrogate = getFlagValue("-surrogate", None, flags)
+                        surrogate = float(surrogate) if surrogate is not None else None
+                        calibrate = getFlagValue("-calibrate", None, flags)
+                        calibrate = float(calibrate) if calibrate is not None else None
+                        if mg:
+                            print("Solving grid levels on VSPAero mesh levels of", geomDataPath)
+                            aeroquest_mg(geomDataPath, int(args[1]), num_shards, cache, checkpoint, compresslevel, serializer,
+                                         "-mirror" in flags, surrogate, post, "-noarchive" not in flags, calibrate=calibrate,
+                                         profile=profile)
+                        else:
+                            aeroquest(geomDataArr, int(args[1]), num_shards, cache, checkpoint, compresslevel, serializer,
+                                      "-mirror" in flags, surrogate, post, "-noarchive" not in flags, calibrate=calibrate,
+                                      profile=profile)
+            finally:
+                finishRun()
+
+        case "study" | "-study":
+            if len(args) < 2:
+                print("Error: Missing Manifest Arg")
+                return
+
+            from cache import ResultCache
+
+            flags = args[2:]
+            cores = getFlagValue("-cores", None, flags)
+            cache = None if "-nocache" in flags else ResultCache(cachePath)
+
+            configureRun(flags)
+            try:
+                with openPostSession("-repost" in flags) as post:
+                    runStudies(args[1], int(cores) if cores is not None else None, cache, post, "-resume" in flags,
+                               getCompressLevel(flags), getFlagValue("-serializer", None, flags))
+            finally:
+                finishRun()
+
+        case "bundle" | "-rebundle":
+            archiveDir = args[1] if len(args) > 1 and not args[1].startswith("-") else None
+            writeBundleFromArchive(archiveDir, getCompressLevel(args), getFlagValue("-serializer", None, args))
+
+            if args[0] == "-rebundle":
+                configureRun(args[1:])
+                try:
+                    runPost(questScriptPath, questLauncherPath)
+                finally:
+                    finishRun()
+
+        case "post":
+            bundleFile = args[1] if len(args) > 1 and not args[1].startswith("-") else None
+            configureRun(args[1:])
+            try:
+                with openPostSession("-repost" in args) as post:
+                    runPost(questScriptPath, questLauncherPath, post, bundleFile)
+            finally:
+                finishRun()
+
         case "-test":
             print("Nothing to see here")
 
         case _:
             print("Error: Invalid Argument Provided")
-else:
-    print("Error: No Arguments Provided")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
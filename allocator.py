@@ -0,0 +1,387 @@
+import os
+import json
+import math
+import threading
+
+import numpy as np
+
+from cache import hashFile
+from scheduler import GEOM_EXTENSIONS, estimatePanelCount
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_HISTORY_PATH = "./aeroquest.scaling.json" # Observed solver, slicer and parse runs of every mesh
+DEFAULT_SERIAL_FRACTION = 0.1 # Share of a case's solve time that does not speed up with threads, until measured
+DEFAULT_STARTUP = 1.0 # Process startup in single thread case solves, until measured
+STAGES = {"solver": True, "slicer": False, "parse": False, "slice_parse": False} # Timed stages, True for those that divide across threads
+FEATURES = ["case", "Mach^2", "WakeIters", "GMRES digits"] # Per case features the cost of a case is linear in (see caseFeatures())
+MAX_RUNS = 50 # Runs kept per mesh and stage (oldest are dropped)
+MIN_CASE_COST = 1e-6 # Floor on a predicted case cost, keeps fits with negative weights usable
+MG_COARSENING = 4 # Panels merged into one by each VSPAero mesh level past the first, until the level is measured
+
+_history = None # History used by the solver functions, see configure()
+_historyLock = threading.Lock()
+
+
+#############################################
+##             SCALING HISTORY             ##
+#############################################
+
+def geometryKey(geomData, mglevel=None):
+    """Identifies a mesh by the contents of its geometry file (shard copies share the key)
+
+    Args:
+        geomData (str): Path to geometry
+        mglevel (int): VSPAero mesh level the geometry is solved on, None for the geometry as given
+
+    Returns:
+        Hex digest of the first geometry file found, or of the path if there is none (with the mesh level appended)
+    """
+    geomFiles = [f"{geomData}{ext}" for ext in GEOM_EXTENSIONS if os.path.isfile(f"{geomData}{ext}")]
+    key = hashFile(geomFiles[0] if geomFiles else geomData)
+
+    return key if mglevel is None else f"{key}.mg{mglevel}"
+
+def meshPanels(geomData, mglevel=None):
+    """Estimates the panel count a solver works on (see scheduler.estimatePanelCount())
+
+    Args:
+        geomData (str): Path to geometry
+        mglevel (int): VSPAero mesh level the geometry is solved on, None for the geometry as given
+
+    Returns:
+        Panel count, divided by MG_COARSENING for every mesh level past the first
+    """
+    return estimatePanelCount(geomData) / MG_COARSENING ** ((mglevel or 1) - 1)
+
+def caseFeatures(params):
+    """Builds the features the cost of a case is predicted from
+
+    Args:
+        params (dict): Resolved solver parameters of a case (see Aeroquest.resolveParams())
+
+    Returns:
+        List of FEATURES values: 1, Mach squared, wake iterations and digits of GMRES reduction
+    """
+    gmres = float(params.get("GMRESReductionFactor", 1))
+
+    return [1.0, float(params.get("Mach", 0)) ** 2, float(params.get("WakeIters", 1)), math.log10(1 / gmres) if 0 < gmres < 1 else 0.0]
+
+def featureMatrix(params):
+    """Stacks caseFeatures() of every case into a (len(params), len(FEATURES)) array"""
+    return np.array([caseFeatures(param) for param in params], dtype=np.float64).reshape(len(params), len(FEATURES))
+
+def independentColumns(design):
+    """Picks the columns of a design matrix least squares can tell apart
+
+    Columns are taken in order and one that is a linear combination of those
+    already taken is skipped (e.g. WakeIters summed over runs that all use the
+    same settings is a multiple of the case count), so its weight stays 0
+    instead of an arbitrary split.
+
+    Args:
+        design (ndarray): (runs, columns) array
+
+    Returns:
+        List of column indices
+    """
+    norms = np.linalg.norm(design, axis=0)
+    scaled = design / np.where(norms > 0, norms, 1.0)
+    columns = []
+
+    for column in range(design.shape[1]):
+        if np.linalg.matrix_rank(scaled[:, columns + [column]]) > len(columns):
+            columns.append(column)
+
+    return columns
+
+class ScalingModel:
+    """Predicted wall time of one process of a stage: startup + summed case costs * (serial + (1 - serial) / threads)
+
+    A case costs the dot product of its features (see caseFeatures()) with the
+    weights, in seconds on one thread. Only the serial share of it does not
+    divide across threads (all of it for stages that do not thread).
+    """
+
+    def __init__(self, startup, weights, serial, measured):
+        """
+        Args:
+            startup (float): Seconds to start a process (load geometry, set up the solver)
+            weights (float list): Single thread seconds per unit of each of FEATURES
+            serial (float): Share of a case's single thread time that does not speed up with threads
+            measured (bool): False if the model is in relative units (no run of any mesh recorded yet)
+        """
+        self.startup = startup
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.serial = serial
+        self.measured = measured
+
+    def speedup(self, threads):
+        """Share of its single thread time a case takes on threads"""
+        return self.serial + (1 - self.serial) / max(threads, 1)
+
+    def caseCosts(self, params):
+        """Predicts the single thread seconds of every case
+
+        Args:
+            params (dict list): Resolved solver parameters of every case
+
+        Returns:
+            List of seconds (relative units when not measured)
+        """
+        return np.maximum(featureMatrix(params) @ self.weights, MIN_CASE_COST).tolist()
+
+    def predict(self, params, threads=1):
+        """Predicts the wall time of one process
+
+        Args:
+            params (dict list): Resolved solver parameters of the cases it runs
+            threads (int): Threads of the process
+
+        Returns:
+            Seconds (relative units when not measured)
+        """
+        return self.startup + sum(self.caseCosts(params)) * self.speedup(threads)
+
+    def layout(self, params, cores):
+        """Picks the number of processes and threads per process that finish a set of cases soonest
+
+        Args:
+            params (dict list): Resolved solver parameters of the cases to solve
+            cores (int): Cores available
+
+        Returns:
+            Tuple containing number of processes and threads per process (ties go to fewer processes)
+        """
+        cases = len(params)
+        perCase = sum(self.caseCosts(params)) / max(cases, 1)
+        best = None
+
+        for shards in range(1, max(1, min(cases, cores)) + 1):
+            wall = self.startup + math.ceil(cases / shards) * perCase * self.speedup(cores // shards)
+            if best is None or wall < best[0] * (1 - 1e-9):
+                best = (wall, shards, cores // shards)
+
+        return best[1], best[2]
+
+class ScalingHistory:
+    """Observed solver, slicer and parse runs of every mesh, kept across runs to predict the cost of work
+
+    Each run records the threads, cases, wall time and the summed features of
+    its cases (see caseFeatures()). For a stage that threads, runs at two or more
+    thread counts give the startup and serial share by least squares, otherwise
+    DEFAULT_SERIAL_FRACTION and DEFAULT_STARTUP are assumed. With enough runs the
+    weight of every feature the runs tell apart from the case count is fit too,
+    so cases cost more or less by Mach and solver settings, until then every case
+    of the mesh costs the same. Meshes with no runs are scaled from measured
+    meshes by panel count.
+
+    Runs are kept in memory and written out once by save(), merged into the
+    history file as it is then, so levels, shards and studies finishing at the
+    same time do not rewrite the file for every process.
+    """
+
+    def __init__(self, historyPath=DEFAULT_HISTORY_PATH):
+        """
+        Args:
+            historyPath (str): Path to history file (None to keep it in memory only)
+        """
+        self.historyPath = historyPath
+        self.meshes = self._load()
+        self._pending = []
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.historyPath is None or not os.path.isfile(self.historyPath):
+            return {}
+
+        with open(self.historyPath) as file:
+            return {key: mesh for key, mesh in json.load(file).items() if "stages" in mesh} # Solver-only runs of older files are dropped
+
+    @staticmethod
+    def _addRun(meshes, key, header, stage, run):
+        mesh = meshes.setdefault(key, {**header, "stages": {}})
+        mesh["stages"][stage] = (mesh["stages"].get(stage, []) + [run])[-MAX_RUNS:]
+
+    def record(self, stage, geomData, threads, params, seconds, mglevel=None):
+        """Adds a finished process (or parse) of a stage
+
+        Args:
+            stage (str): One of STAGES
+            geomData (str): Path to geometry
+            threads (int): Threads of the process
+            params (dict list): Resolved solver parameters of the cases it ran
+            seconds (float): Wall time
+            mglevel (int): VSPAero mesh level it ran on, None for the geometry as given
+
+        Returns:
+            None, the run is written out by save()
+        """
+        key = geometryKey(geomData, mglevel)
+        header = {"mesh": geomData, "panels": meshPanels(geomData, mglevel)}
+        sums = featureMatrix(params).sum(axis=0)
+        run = [threads, len(params), round(seconds, 4), [round(value, 6) for value in sums.tolist()]]
+
+        with self._lock:
+            self._addRun(self.meshes, key, header, stage, run)
+            self._pending.append((key, header, stage, run))
+            self._models.clear()
+
+    def save(self):
+        """Writes the runs recorded since the last save
+
+        They are added to the history file as it is now (runs other Aeroquest
+        processes saved in the meantime are kept), which replaces the old file
+        in one step.
+
+        Returns:
+            None, writes out history
+        """
+        with self._lock:
+            if self.historyPath is None or not self._pending:
+                return
+
+            meshes = self._load()
+            for pending in self._pending:
+                self._addRun(meshes, *pending)
+
+            tmpPath = f"{self.historyPath}.{os.getpid()}.tmp"
+            with open(tmpPath, 'w') as file:
+                json.dump(meshes, file, indent=1)
+            os.replace(tmpPath, self.historyPath)
+
+            self.meshes = meshes
+            self._pending = []
+            self._models.clear()
+
+    def _fit(self, runs, threaded):
+        threads, cases, seconds = (np.array(column, dtype=np.float64) for column in list(zip(*runs))[:3])
+        sums = np.array([run[3] for run in runs], dtype=np.float64)
+        startup = DEFAULT_STARTUP if threaded else 0.0
+        serial = DEFAULT_SERIAL_FRACTION if threaded else 1.0
+        fitted = None
+
+        if threaded and len(runs) >= 3 and len(set(threads.tolist())) >= 2:
+            design = np.stack([np.ones(len(runs)), cases, cases / threads], axis=1)
+            fitStartup, fitSerial, fitParallel = np.maximum(np.linalg.lstsq(design, seconds, rcond=None)[0], 0)
+            if fitParallel > 0:
+                serial = float(fitSerial / (fitSerial + fitParallel))
+                fitted = ScalingModel(float(fitStartup), [float(fitSerial + fitParallel)] + [0.0] * (len(FEATURES) - 1), serial, True)
+
+        scale = serial + (1 - serial) / threads
+        design = np.column_stack([np.ones(len(runs)), sums * scale[:, None]])
+        columns = independentColumns(design)
+        if columns[:2] == [0, 1] and len(runs) >= len(columns) + 2: # Startup and per case cost must both be told apart
+            fit = np.zeros(design.shape[1])
+            fit[columns] = np.linalg.lstsq(design[:, columns], seconds, rcond=None)[0]
+            model = ScalingModel(max(float(fit[0]), 0), fit[1:].tolist(), serial, True)
+            if np.all(sums @ model.weights > 0):
+                return model
+
+        if fitted is not None:
+            return fitted
+
+        # Single case time on one thread from each run, with the default startup
+        single = float(np.median(seconds / (startup + np.maximum(cases, 1) * scale)))
+        return ScalingModel(startup * single, [single] + [0.0] * (len(FEATURES) - 1), serial, True)
+
+    def model(self, stage, geomData, mglevel=None):
+        """Returns the model of a stage on a mesh
+
+        Args:
+            stage (str): One of STAGES
+            geomData (str): Path to geometry
+            mglevel (int): VSPAero mesh level it runs on, None for the geometry as given
+
+        Returns:
+            ScalingModel
+        """
+        key = (stage, geometryKey(geomData, mglevel))
+
+        with self._lock:
+            if key not in self._models:
+                runs = self.meshes.get(key[1], {}).get("stages", {}).get(stage)
+                if runs:
+                    self._models[key] = self._fit(runs, STAGES[stage])
+                else:
+                    self._models[key] = self._scaled(stage, meshPanels(geomData, mglevel))
+
+            return self._models[key]
+
+    def _scaled(self, stage, panels):
+        # Single thread seconds per case per panel of every measured mesh, a mesh is assumed to cost the median
+        threaded = STAGES[stage]
+        perPanel = []
+        for mesh in self.meshes.values():
+            runs = mesh["stages"].get(stage)
+            if runs:
+                model = self._fit(runs, threaded)
+                perPanel.append(float(np.median([np.dot(run[3], model.weights) / max(run[1], 1) for run in runs])) / mesh["panels"])
+        perPanel = [value for value in perPanel if value > 0]
+
+        single = float(np.median(perPanel)) * panels if perPanel else float(panels)
+        return ScalingModel((DEFAULT_STARTUP if threaded else 0.0) * single, [single] + [0.0] * (len(FEATURES) - 1),
+                            DEFAULT_SERIAL_FRACTION if threaded else 1.0, bool(perPanel))
+
+    def levelCost(self, geomData, params, mglevel=None):
+        """Estimates the single thread work of solving cases on a mesh (used to split cores between levels)
+
+        Args:
+            geomData (str): Path to geometry
+            params (dict list): Resolved solver parameters of the cases
+            mglevel (int): VSPAero mesh level it is solved on, None for the geometry as given
+
+        Returns:
+            Seconds on one thread (relative units when no mesh has been measured)
+        """
+        return self.model("solver", geomData, mglevel).predict(params, 1)
+
+    def estimateLevel(self, geomData, params, threads, slice=False, mglevel=None):
+        """Predicts the time every stage of one mesh level takes
+
+        Args:
+            geomData (str): Path to geometry
+            params (dict list): Resolved solver parameters of every case of the level
+            threads (int): Cores given to the level
+            slice (bool): True to include the slicer and slice parsing
+            mglevel (int): VSPAero mesh level it is solved on, None for the geometry as given
+
+        Returns:
+            Tuple containing a dictionary of seconds by stage and True if every stage is measured
+        """
+        stages = ["solver", "slicer", "slice_parse"] if slice else ["solver", "parse"]
+        models = {stage: self.model(stage, geomData, mglevel) for stage in stages}
+
+        return ({stage: model.predict(params, threads) for stage, model in models.items()},
+                all(model.measured for model in models.values()))
+
+
+#############################################
+##              SHARED HISTORY             ##
+#############################################
+
+def configure(historyPath=DEFAULT_HISTORY_PATH):
+    """Replaces the history used by the solver functions
+
+    Args:
+        historyPath (str): Path to history file (None to keep it in memory only)
+
+    Returns:
+        ScalingHistory
+    """
+    global _history
+    with _historyLock:
+        _history = ScalingHistory(historyPath)
+        return _history
+
+def getHistory():
+    """Returns the history used by the solver functions, loaded from DEFAULT_HISTORY_PATH on first use"""
+    global _history
+    with _historyLock:
+        if _history is None:
+            _history = ScalingHistory()
+
+        return _history
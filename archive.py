@@ -0,0 +1,255 @@
+import os
+import json
+import shutil
+import threading
+
+import numpy as np
+
+from slicedata import POINT_DTYPE, SliceCase
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+ARCHIVE_VERSION = 1 # Version of the archive layout, stored in its manifest
+MANIFEST_NAME = "manifest.json" # Manifest file inside an archive directory
+COPY_CHUNK = 16 * 1024 ** 2 # Bytes copied at a time when finishing a streamed column
+
+
+#############################################
+##             ARCHIVE WRITER              ##
+#############################################
+
+class ArchiveWriter:
+    """Writes solver results as a columnar archive, one table per mesh level
+
+    An archive is a directory of .npy files (memory-mappable with
+    np.load(mmap_mode='r')) and a json manifest listing every level's mesh,
+    case count and columns. Each level holds the case parameters, point,
+    realization and database level ids and filenames of its cases, and either
+    the integrated coefficients or the slice points, with offsets of every
+    slice and of every case's slices. Slice cases are streamed to disk one at a
+    time. Files go to a temporary directory that replaces the archive once
+    every level is in, used as a context manager a failed run leaves the old
+    archive as it was.
+    """
+
+    def __init__(self, archiveDir, outputFileName, slice=False):
+        """
+        Args:
+            archiveDir (str): Path to archive directory
+            outputFileName (str): Json filename header of the cases (e.g. VSPAero)
+            slice (bool): True to store slice points instead of coefficients
+        """
+        self.archiveDir = archiveDir
+        self.tmpDir = f"{archiveDir}.tmp"
+        self.manifest = {"version": ARCHIVE_VERSION, "output": outputFileName, "kind": "slice" if slice else "polar", "levels": {}}
+        self._lock = threading.Lock()
+
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+        os.makedirs(self.tmpDir)
+
+    def _levelDir(self, level):
+        levelDir = os.path.join(self.tmpDir, f"level{level}")
+        os.makedirs(levelDir, exist_ok=True)
+        return levelDir
+
+    def _writeCases(self, level, meshPath, vspCases):
+        levelDir = self._levelDir(level)
+        database = vspCases.database
+        columns = {"params": vspCases.params, "filenames": vspCases.filenames(), "point": database.point[vspCases.rows],
+                   "realization": database.realization[vspCases.rows], "database_level": database.level[vspCases.rows]}
+
+        for name, values in columns.items():
+            np.save(os.path.join(levelDir, f"{name}.npy"), values)
+
+        return {"mesh": meshPath, "cases": len(vspCases), "param_names": list(database.names),
+                "columns": sorted(columns)}
+
+    def _addLevel(self, level, record):
+        with self._lock:
+            self.manifest["levels"][str(level)] = record
+
+    def writeLevel(self, level, meshPath, vspCases, vsp_out):
+        """Adds the coefficients of one mesh level (safe to call from several threads)
+
+        Args:
+            level (int): Mesh level, 0 for the finest
+            meshPath (str): Path to geometry
+            vspCases (LevelView): Cases of the level (see parseDatabase())
+            vsp_out (dict list): Parsed coefficients of every case, in the same order
+
+        Returns:
+            None, writes out level table
+        """
+        record = self._writeCases(level, meshPath, vspCases)
+        names = list(vsp_out[0].keys()) if vsp_out else []
+        coefficients = np.array([[float(data[name]) for name in names] for data in vsp_out], dtype=np.float64).reshape(len(vsp_out), len(names))
+
+        np.save(os.path.join(self._levelDir(level), "coefficients.npy"), coefficients)
+        record["coefficient_names"] = names
+        record["columns"].append("coefficients")
+
+        self._addLevel(level, record)
+
+    def writeSliceLevel(self, level, meshPath, vspCases, sliceCases):
+        """Adds the slice points of one mesh level, streaming cases to disk as they come (safe to call from several threads)
+
+        Args:
+            level (int): Mesh level, 0 for the finest
+            meshPath (str): Path to geometry
+            vspCases (LevelView): Cases of the level (see parseDatabase())
+            sliceCases (iterator): SliceCase of every case, in the same order
+
+        Yields:
+            Every SliceCase of sliceCases, after it is written
+        """
+        record = self._writeCases(level, meshPath, vspCases)
+        levelDir = self._levelDir(level)
+        rawPath = os.path.join(levelDir, "points.raw")
+
+        slice_offsets = [np.zeros(1, dtype=np.int64)]
+        case_slices = [0]
+        num_points = 0
+
+        with open(rawPath, 'wb') as raw:
+            for sliceCase in sliceCases:
+                points = np.ascontiguousarray(sliceCase.points, dtype=POINT_DTYPE)
+                raw.write(points.tobytes())
+
+                slice_offsets.append(np.asarray(sliceCase.offsets[1:], dtype=np.int64) + num_points)
+                case_slices.append(case_slices[-1] + len(sliceCase))
+                num_points += len(points)
+
+                yield sliceCase
+
+        finishColumn(rawPath, os.path.join(levelDir, "points.npy"), POINT_DTYPE, num_points)
+        np.save(os.path.join(levelDir, "slice_offsets.npy"), np.concatenate(slice_offsets))
+        np.save(os.path.join(levelDir, "case_slices.npy"), np.array(case_slices, dtype=np.int64))
+        record["columns"] += ["case_slices", "points", "slice_offsets"]
+
+        self._addLevel(level, record)
+
+    def close(self):
+        """Writes the manifest and moves the archive into place
+
+        Returns:
+            None, writes out archive
+        """
+        with open(os.path.join(self.tmpDir, MANIFEST_NAME), 'w') as file:
+            json.dump(self.manifest, file, indent=1)
+
+        shutil.rmtree(self.archiveDir, ignore_errors=True)
+        os.replace(self.tmpDir, self.archiveDir)
+
+    def discard(self):
+        """Drops the levels written so far, the previous archive is kept
+
+        Returns:
+            None, removes temporary archive
+        """
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+def finishColumn(rawPath, npyPath, dtype, length):
+    """Turns a file of raw records into a .npy file
+
+    Args:
+        rawPath (str): Path to raw records (removed afterwards)
+        npyPath (str): Path to .npy file
+        dtype (dtype): Record dtype
+        length (int): Number of records
+
+    Returns:
+        None, writes out .npy file
+    """
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (length,)}
+
+    with open(npyPath, 'wb') as npy, open(rawPath, 'rb') as raw:
+        np.lib.format.write_array_header_1_0(npy, header)
+        shutil.copyfileobj(raw, npy, COPY_CHUNK)
+
+    os.remove(rawPath)
+
+
+#############################################
+##             ARCHIVE READER              ##
+#############################################
+
+class Archive:
+    """Reads a columnar archive written by ArchiveWriter
+
+    Columns are memory-mapped, so only the cases that are used are read.
+    """
+
+    def __init__(self, archiveDir):
+        """
+        Args:
+            archiveDir (str): Path to archive directory
+        """
+        self.archiveDir = archiveDir
+
+        with open(os.path.join(archiveDir, MANIFEST_NAME)) as file:
+            self.manifest = json.load(file)
+
+        if self.manifest.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"{archiveDir} has archive version {self.manifest.get('version')}, expected {ARCHIVE_VERSION}")
+
+    @property
+    def slice(self):
+        """True if the archive holds slice points"""
+        return self.manifest["kind"] == "slice"
+
+    def levels(self):
+        """Returns the mesh levels in the archive, finest first"""
+        return sorted(int(level) for level in self.manifest["levels"])
+
+    def level(self, level):
+        """Returns the manifest record of a level (mesh, cases, param_names, columns)"""
+        return self.manifest["levels"][str(level)]
+
+    def column(self, level, name):
+        """Memory-maps one column of a level
+
+        Args:
+            level (int): Mesh level
+            name (str): Column name (see the level's manifest record)
+
+        Returns:
+            Read only ndarray
+        """
+        if name not in self.level(level)["columns"]:
+            raise KeyError(f"Level {level} of {self.archiveDir} has no {name} column")
+
+        return np.load(os.path.join(self.archiveDir, f"level{level}", f"{name}.npy"), mmap_mode='r')
+
+    def coefficients(self, level):
+        """Returns the parsed coefficients of every case of a level
+
+        Returns:
+            List containing a dictionary (e.g. CL, CDTot, CMy) for every case, as parseVSPAeroData() builds
+        """
+        names = self.level(level)["coefficient_names"]
+        return [dict(zip(names, values)) for values in self.column(level, "coefficients").tolist()]
+
+    def sliceCases(self, level):
+        """Streams the slice data of every case of a level
+
+        Yields:
+            SliceCase of every case, in order (points are memory-mapped)
+        """
+        points = self.column(level, "points")
+        slice_offsets = self.column(level, "slice_offsets")
+        case_slices = self.column(level, "case_slices").tolist()
+
+        for start, end in zip(case_slices[:-1], case_slices[1:]):
+            offsets = np.asarray(slice_offsets[start:end + 1])
+            yield SliceCase(points[offsets[0]:offsets[-1]], offsets - offsets[0])
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import QuestDatabase
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DATABASES = ["./databasefiles/dense_AoAAbs_4level_database", "./databasefiles/dense_noAbs_4level_database",
+             "./databasefiles/sparse_noAbs_4level_database"]
+
+
+#############################################
+##             LEGACY DATABASE             ##
+#############################################
+
+def legacyDatabase(filePath, outputFileName, num_levels):
+    """Parses a database into lists of case dictionaries, as parseDatabase() did before database.py
+
+    Args:
+        filePath (str): Path to database file
+        outputFileName (str): Header for quest post json filename
+        num_levels (int): Number of meshes
+
+    Returns:
+        2D list of dictionaries containing uncertainty parameters and filename for each case from each mesh
+    """
+    with open(filePath) as file:
+        databaseLines = [line.rstrip() for line in file]
+
+    runs, runs_total = int(databaseLines[2].split()[0]), int(databaseLines[2].split()[1])
+    names = databaseLines[3].split()
+    levels = []
+
+    for i in range(runs_total // runs):
+        cases = []
+        for j in range(i, runs_total, num_levels):
+            values = databaseLines[4 + j].split()
+            fileName = f"{outputFileName}.{values[3].zfill(5)}.{values[2].zfill(2)}.{values[0].zfill(5)}"
+            cases.append({'filename': fileName, 'data': {name: float(values[5 + k]) for k, name in enumerate(names)}})
+        levels.append(cases)
+
+    return levels
+
+
+#############################################
+##                BENCHMARK                ##
+#############################################
+
+def measure(function, repeat):
+    """Times a function and measures the memory held by its result
+
+    Args:
+        function (function): Called with no arguments
+        repeat (int): Number of timed runs
+
+    Returns:
+        Tuple containing the best time in seconds, bytes held by the result and the result
+    """
+    best = float("inf")
+    for run in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = function()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return best, held, result
+
+def benchDatabase(databasePath, repeat):
+    """Compares loading a database into case dictionaries against QuestDatabase
+
+    Args:
+        databasePath (str): Path to database file
+        repeat (int): Number of timed runs
+
+    Returns:
+        None, prints results
+    """
+    database = QuestDatabase.fromFile(databasePath, "VSPAero")
+    num_levels = database.num_levels
+
+    legacy_time, legacy_held, legacy = measure(lambda: legacyDatabase(databasePath, "VSPAero", num_levels), repeat)
+    load_time, load_held, database = measure(lambda: QuestDatabase.fromFile(databasePath, "VSPAero"), repeat)
+    names_time, names_held, filenames = measure(lambda: QuestDatabase.fromFile(databasePath, "VSPAero").filenames(), repeat)
+    same = [list(view) for view in database.levels(num_levels)] == legacy
+
+    print(f"{os.path.basename(databasePath)}: {len(database)} cases, {num_levels} levels, {len(database.names)} parameters")
+    print(f"    dicts     {legacy_time * 1e3:8.2f} ms  {legacy_held / 1e3:9.1f} kB")
+    print(f"    database  {load_time * 1e3:8.2f} ms  {load_held / 1e3:9.1f} kB   (with filenames "
+          f"{names_time * 1e3:.2f} ms, {names_held / 1e3:.1f} kB)   same cases: {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks QuestDatabase against lists of case dictionaries")
+    parser.add_argument("databases", nargs="*", default=DATABASES, help="Database files to load")
+    parser.add_argument("-repeat", type=int, default=5, help="Timed runs per loader (best is reported)")
+    args = parser.parse_args()
+
+    for databasePath in args.databases:
+        benchDatabase(databasePath, args.repeat)
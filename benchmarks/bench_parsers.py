@@ -0,0 +1,178 @@
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Aeroquest import parseVSPAeroLineData
+from fastparse import polarCoefficients, iterSliceCasesMapped
+from slicedata import iterSliceCases
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+POLAR_HEADER = "Beta Mach AoA Re/1e6 CL CDo CDi CDtot CDt CDtot_t CS L/D E CFx CFy CFz CMx CMy CMz CMl CMm CMn FOpt"
+DATABASES = ["./databasefiles/dense_AoAAbs_4level_database", "./databasefiles/dense_noAbs_4level_database"]
+
+
+#############################################
+##             SYNTHETIC OUTPUT            ##
+#############################################
+
+def databaseSize(databasePath):
+    """Reads the number of runs in a Quest-prep database
+
+    Args:
+        databasePath (str): Path to database file
+
+    Returns:
+        Tuple containing runs per mesh and runs over every mesh
+    """
+    with open(databasePath) as file:
+        sizes = [file.readline() for i in range(3)][2].split()
+
+    return int(sizes[0]), int(sizes[1])
+
+def writePolar(filePath, num_cases, rng):
+    """Writes a .polar file in VSPAero's format
+
+    Args:
+        filePath (str): Path to .polar file
+        num_cases (int): Number of rows
+        rng (Generator): NumPy random generator
+
+    Returns:
+        None, writes out .polar file
+    """
+    values = rng.uniform(-1, 1, size=(num_cases, len(POLAR_HEADER.split())))
+
+    with open(filePath, 'w') as file:
+        file.write(POLAR_HEADER + "\n")
+        for row in values:
+            file.write(" ".join(f"{value:12.8f}" for value in row) + "\n")
+
+def writeSlice(filePath, num_cases, num_cuts, num_points, rng):
+    """Writes a .slc file in the ADB slicer's format
+
+    Args:
+        filePath (str): Path to .slc file
+        num_cases (int): Number of cases
+        num_cuts (int): Number of cuts per case
+        num_points (int): Number of points per cut
+        rng (Generator): NumPy random generator
+
+    Returns:
+        None, writes out .slc file
+    """
+    with open(filePath, 'w') as file:
+        for case_i in range(num_cases):
+            for cut_i in range(num_cuts):
+                y = 1.0 + cut_i
+                file.write(f"BLOCK Cut_{cut_i + 1}_at_Y:_{y:.4f}\n")
+                file.write(f"Case: {case_i + 1} ... Mach: 0.3000\n")
+                file.write("     x          y          z         dCp\n")
+
+                points = rng.uniform(-1, 1, size=(num_points, 4))
+                points[:, 1] = y
+                for point in points:
+                    file.write("%10.4f %10.4f %10.4f %10.4f\n" % tuple(point))
+            file.write("\n\n")
+
+
+#############################################
+##               LINE PARSERS              ##
+#############################################
+
+def linePolar(filePath):
+    """Parses a .polar file line by line, as parseVSPAeroData() did before fastparse.py
+
+    Args:
+        filePath (str): Path to .polar file
+
+    Returns:
+        List of dictionaries containing CL, CDTot and CMy (floats) for each case
+    """
+    with open(filePath) as file:
+        lines = [line.rstrip() for line in file]
+
+    parsed = [parseVSPAeroLineData(line) for line in lines[1:]]
+
+    return [{name: float(value) for name, value in case.items()} for case in parsed]
+
+
+#############################################
+##                BENCHMARK                ##
+#############################################
+
+def timeRuns(function, repeat):
+    """Times a function
+
+    Args:
+        function (function): Called with no arguments
+        repeat (int): Number of timed runs
+
+    Returns:
+        Tuple containing the best time in seconds and the last return value
+    """
+    best = float("inf")
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def benchDatabase(databasePath, workDir, num_cuts, num_points, repeat):
+    """Benchmarks both parsers on outputs sized from a database
+
+    Args:
+        databasePath (str): Path to database file
+        workDir (str): Directory for the synthetic outputs
+        num_cuts (int): Number of cuts per case
+        num_points (int): Number of points per cut
+        repeat (int): Number of timed runs
+
+    Returns:
+        None, prints timings
+    """
+    rng = np.random.default_rng(0)
+    runs, runs_total = databaseSize(databasePath)
+    polarPath = os.path.join(workDir, "bench.polar")
+    slicePath = os.path.join(workDir, "bench.slc")
+
+    writePolar(polarPath, runs_total, rng)
+    writeSlice(slicePath, runs, num_cuts, num_points, rng)
+
+    print(f"{os.path.basename(databasePath)}: {runs_total} polar rows "
+          f"({os.path.getsize(polarPath) / 1e6:.1f} MB), {runs} slice cases "
+          f"({os.path.getsize(slicePath) / 1e6:.1f} MB)")
+
+    line_time, line_out = timeRuns(lambda: linePolar(polarPath), repeat)
+    mapped_time, mapped_out = timeRuns(lambda: polarCoefficients(polarPath), repeat)
+    same = all(np.array_equal([case[name] for case in line_out], mapped_out[name]) for name in mapped_out)
+    print(f"    .polar  line {line_time * 1e3:9.2f} ms   mapped {mapped_time * 1e3:9.2f} ms   "
+          f"x{line_time / mapped_time:6.1f}   identical: {same}")
+
+    line_time, line_out = timeRuns(lambda: list(iterSliceCases(slicePath)), repeat)
+    mapped_time, mapped_out = timeRuns(lambda: list(iterSliceCasesMapped(slicePath)), repeat)
+    same = len(line_out) == len(mapped_out) and all(line_case == mapped_case and np.array_equal(line_points, mapped_points)
+                                                    for (line_case, line_points), (mapped_case, mapped_points) in zip(line_out, mapped_out))
+    print(f"    .slc    line {line_time * 1e3:9.2f} ms   mapped {mapped_time * 1e3:9.2f} ms   "
+          f"x{line_time / mapped_time:6.1f}   identical: {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks line by line against memory mapped parsing of solver outputs")
+    parser.add_argument("databases", nargs="*", default=DATABASES, help="Database files to size outputs from")
+    parser.add_argument("-cuts", type=int, default=4, help="Cuts per case in the .slc file")
+    parser.add_argument("-points", type=int, default=200, help="Points per cut in the .slc file")
+    parser.add_argument("-repeat", type=int, default=3, help="Timed runs per parser (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workDir:
+        for databasePath in args.databases:
+            benchDatabase(databasePath, workDir, args.cuts, args.points, args.repeat)
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import Aeroquest
+from bundle import BundleWriter
+from database import QuestDatabase
+from fastparse import polarCoefficients
+from scheduler import availableCores
+from slicedata import interpolateLevel, streamSliceArrays
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+FAKES = os.path.join(REPO, "benchmarks", "fakes") # Stand-ins for vspaero, adb2loads and the Quest launcher (java)
+SCALES = {"sparse": ("./databasefiles/sparse_noAbs_4level_database", 1),
+          "dense": ("./databasefiles/dense_noAbs_4level_database", 1),
+          "dense10": ("./databasefiles/dense_noAbs_4level_database", 10)} # Scale -> database and copies of each point
+MESHES = {"wing": 4000, "wingmed": 2000, "wingcoarse": 1000} # Mesh -> panel count, finest first
+TOLERANCE = 0.2 # Slowdown (fraction of the baseline) reported as a regression
+
+
+#############################################
+##             BENCH WORKSPACE             ##
+#############################################
+
+def writeDatabase(filePath, database, copies):
+    """Writes a Quest-prep database file, optionally with every point repeated
+
+    Copies get new point ids and AoA shifted by 1e-3 per copy, so they are distinct
+    flight conditions and stay in the same level order as the original rows.
+
+    Args:
+        filePath (str): Path to database file
+        database (QuestDatabase): Database to write out
+        copies (int): Number of copies of each point
+
+    Returns:
+        None, writes out database file
+    """
+    num_points = int(database.point.max()) + 1
+    shift = np.zeros(len(database.names))
+    if "AoA" in database.names:
+        shift[database.names.index("AoA")] = 1e-3
+
+    rows = []
+    for copy in range(copies):
+        for row in range(len(database)):
+            params = "\t".join(f"{value!r}" for value in (database.params[row] + copy * shift).tolist())
+            rows.append(f"{database.point[row] + copy * num_points}\t{len(rows)}\t{database.level[row]}\t"
+                        f"{database.realization[row]}\t3\t{params}\t")
+
+    with open(filePath, 'w') as file:
+        file.write(f"#  number of independent evaluations (computer runs) required: {len(rows) // database.num_levels}\n")
+        file.write(f"#  number of resolution (grid) levels required: {database.num_levels}\n")
+        file.write(f"{len(rows) // database.num_levels} {len(rows)} 4 0\n")
+        file.write("\t".join(database.names) + "\t\n")
+        file.write("\n".join(rows) + "\n")
+
+def createWorkspace(workDir, databasePath, copies, num_cuts):
+    """Sets up a run directory for Aeroquest with fake geometry and the fake executables
+
+    Args:
+        workDir (str): Empty directory to run in
+        databasePath (str): Path to database file the study is built from
+        copies (int): Number of copies of each database point (see writeDatabase())
+        num_cuts (int): Number of slicer cuts per mesh
+
+    Returns:
+        List containing path to every mesh, finest first
+    """
+    database = QuestDatabase.fromFile(os.path.join(REPO, databasePath), Aeroquest.outputFile)
+    writeDatabase(os.path.join(workDir, "database"), database, copies)
+    os.makedirs(os.path.join(workDir, "QuestpostInputData"))
+    os.makedirs(os.path.join(workDir, "geometry"))
+
+    meshPaths = []
+    for mesh, panels in MESHES.items():
+        geomData = os.path.join(".", "geometry", mesh)
+        with open(os.path.join(workDir, f"{geomData}.tri"), 'w') as file:
+            file.write(f"{panels // 2} {panels}\n") # Only the header is read (for core allocation)
+        with open(os.path.join(workDir, f"{geomData}.cuts"), 'w') as file:
+            file.write(f"{num_cuts}\n" + "".join(f"y {1.0 + 16.0 * cut / max(num_cuts - 1, 1):.4f}\n" for cut in range(num_cuts)))
+        meshPaths.append(geomData)
+
+    Aeroquest.databasePath = "./database"
+    Aeroquest.vspAeroPath = os.path.join(FAKES, "vspaero")
+    Aeroquest.slicerPath = os.path.join(FAKES, "adb2loads")
+    Aeroquest.questLauncherPath = "QuestLauncher.jar" # Ignored by the fake java
+    Aeroquest.mainDir = workDir
+
+    return meshPaths
+
+
+#############################################
+##                BENCHMARK                ##
+#############################################
+
+def timeRuns(function, repeat):
+    """Times a function
+
+    Args:
+        function (function): Called with no arguments
+        repeat (int): Number of timed runs
+
+    Returns:
+        Tuple containing the best time in seconds and the last return value
+    """
+    best = float("inf")
+    for run in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+def benchComponents(meshPaths, repeat):
+    """Times each parser, the interpolator and the bundle writer on the outputs of a slice run
+
+    Args:
+        meshPaths (str list): Path to every mesh, finest first (with .polar and .slc from the run)
+        repeat (int): Number of timed runs
+
+    Returns:
+        Dictionary containing seconds for each component
+    """
+    results = {}
+    coarse = meshPaths[-1]
+
+    results["database_load"] = timeRuns(lambda: QuestDatabase.fromFile(Aeroquest.databasePath, Aeroquest.outputFile).levels(), repeat)[0]
+    results["polar_parse"] = timeRuns(lambda: polarCoefficients(f"{coarse}.polar"), repeat)[0]
+    results["slice_parse"], sliceCases = timeRuns(lambda: list(streamSliceArrays(f"{coarse}.slc")), repeat)
+
+    stations = next(streamSliceArrays(f"{meshPaths[0]}.slc"))
+    chunk = Aeroquest.interpChunk
+    results["interpolate"] = timeRuns(lambda: [interpolated for start in range(0, len(sliceCases), chunk)
+                                               for interpolated in interpolateLevel(sliceCases[start:start + chunk], stations)], repeat)[0]
+
+    def writeBundle():
+        with BundleWriter(os.path.join("QuestpostInputData", "bench.bundle.json")) as bundle:
+            for case_i, sliceCase in enumerate(sliceCases):
+                bundle.writeSlice(f"case{case_i}.json", sliceCase)
+
+    results["bundle_write"] = timeRuns(writeBundle, repeat)[0]
+
+    return results
+
+def benchScale(scale, num_cuts, num_points, latency, repeat):
+    """Runs the pipelines (three meshes, one mesh at VSPAero mesh levels, slice) and times each component at one scale
+
+    Args:
+        scale (str): Key of SCALES
+        num_cuts (int): Number of slicer cuts per mesh
+        num_points (int): Number of points per cut
+        latency (float): Simulated solver seconds per case per 1000 panels on one thread
+        repeat (int): Number of timed runs of each component
+
+    Returns:
+        Dictionary containing the case count and seconds for each pipeline and component
+    """
+    databasePath, copies = SCALES[scale]
+    workDir = tempfile.mkdtemp(prefix=f"aeroquest-bench-{scale}-")
+    startDir = os.getcwd()
+    env = {name: os.environ.get(name) for name in ["PATH", "AEROQUEST_FAKE_POINTS", "AEROQUEST_FAKE_LATENCY"]}
+
+    try:
+        meshPaths = createWorkspace(workDir, databasePath, copies, num_cuts)
+        os.chdir(workDir)
+        os.environ["PATH"] = FAKES + os.pathsep + os.environ.get("PATH", "")
+        os.environ["AEROQUEST_FAKE_POINTS"] = str(num_points)
+        os.environ["AEROQUEST_FAKE_LATENCY"] = str(latency)
+
+        results = {"cases": len(QuestDatabase.fromFile(Aeroquest.databasePath, Aeroquest.outputFile))}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results["aeroquest"] = timeRuns(lambda: Aeroquest.aeroquest(meshPaths, len(meshPaths)), 1)[0]
+            results["aeroquest_mg"] = timeRuns(lambda: Aeroquest.aeroquest_mg(meshPaths[0], len(meshPaths)), 1)[0]
+            results["aeroquestSlice"] = timeRuns(lambda: Aeroquest.aeroquestSlice(meshPaths, len(meshPaths)), 1)[0]
+        results.update(benchComponents(meshPaths, repeat))
+    finally:
+        os.chdir(startDir)
+        for name, value in env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(workDir, ignore_errors=True)
+
+    return results
+
+def compareResults(results, baseline, tolerance):
+    """Prints the change of every timing against a saved baseline
+
+    Args:
+        results (dict): Timings of this run (scale -> name -> seconds)
+        baseline (dict): Timings of an earlier run, as saved by -save
+        tolerance (float): Slowdown (fraction of the baseline) reported as a regression
+
+    Returns:
+        Number of regressions
+    """
+    regressions = 0
+    for scale, timings in results.items():
+        for name, seconds in timings.items():
+            before = baseline.get(scale, {}).get(name)
+            if name == "cases" or before is None or before == 0:
+                continue
+
+            ratio = seconds / before
+            flag = "REGRESSION" if ratio > 1 + tolerance else ""
+            regressions += flag != ""
+            print(f"    {scale:8s} {name:16s} {before * 1e3:10.1f} ms -> {seconds * 1e3:10.1f} ms  x{ratio:5.2f}  {flag}")
+
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the Aeroquest pipelines and their components on fake solver output")
+    parser.add_argument("scales", nargs="*", default=list(SCALES), help=f"Study sizes to run ({', '.join(SCALES)})")
+    parser.add_argument("-cuts", type=int, default=4, help="Slicer cuts per mesh")
+    parser.add_argument("-points", type=int, default=200, help="Points per cut")
+    parser.add_argument("-latency", type=float, default=0.0, help="Simulated solver seconds per case per 1000 panels on one thread")
+    parser.add_argument("-repeat", type=int, default=3, help="Timed runs per component (best is reported)")
+    parser.add_argument("-save", help="Writes results to a json file")
+    parser.add_argument("-compare", help="Compares against results saved with -save")
+    parser.add_argument("-tolerance", type=float, default=TOLERANCE, help="Slowdown reported as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scales:
+        results[scale] = benchScale(scale, args.cuts, args.points, args.latency, args.repeat)
+        print(f"{scale}: {results[scale]['cases']} cases")
+        for name, seconds in results[scale].items():
+            if name != "cases":
+                print(f"    {name:16s} {seconds * 1e3:10.1f} ms")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                       "cores": availableCores(),
+                       "settings": {"cuts": args.cuts, "points": args.points, "latency": args.latency},
+                       "results": results}, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"Compared with {args.compare}:")
+        sys.exit(1 if compareResults(results, baseline["results"], args.tolerance) > 0 else 0)
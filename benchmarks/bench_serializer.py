@@ -0,0 +1,119 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Aeroquest import sliceJsonDict
+from serializer import SERIALIZERS, orjson
+from slicedata import POINT_DTYPE, SliceCase
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+EXAMPLES = "./examples/examples_*/*-slice" # Example runs whose Quest-post slice files are encoded
+
+
+#############################################
+##              EXAMPLE CASES              ##
+#############################################
+
+def loadSliceCase(filePath):
+    """Rebuilds a SliceCase from a Quest-post slice json file
+
+    Args:
+        filePath (str): Path to json file
+
+    Returns:
+        SliceCase
+    """
+    with open(filePath) as file:
+        children = json.load(file)['children']
+
+    rows = [row for child in children for row in child['leaf']['data']]
+    points = np.empty(len(rows), dtype=POINT_DTYPE)
+    points['arclen'] = [row[1][0] for row in rows]
+    points['x'] = [row[1][1] for row in rows]
+    points['y'] = [row[1][2] for row in rows]
+    points['z'] = [row[1][3] for row in rows]
+    points['dCp'] = [row[2][0] for row in rows]
+
+    offsets = np.cumsum([0] + [len(child['leaf']['data']) for child in children])
+
+    return SliceCase(points, offsets)
+
+def legacyEncode(sliceCase):
+    """Encodes a case the way writeJsonFilesSlice() did, through per-point dictionaries
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+
+    Returns:
+        UTF-8 bytes
+    """
+    return json.dumps(sliceJsonDict(sliceCase.toLegacy())).encode()
+
+
+#############################################
+##                BENCHMARK                ##
+#############################################
+
+def benchExample(exampleDir, limit, repeat):
+    """Checks and times every serializer backend on the slice files of an example run
+
+    Args:
+        exampleDir (str): Path to example run
+        limit (int): Maximum number of cases to load
+        repeat (int): Number of timed runs (best is reported)
+
+    Returns:
+        None, prints results
+    """
+    filePaths = sorted(glob.glob(os.path.join(exampleDir, "Questpost Files", "*.json")))
+    filePaths = [filePath for filePath in filePaths if not filePath.endswith(".bundle.json")][:limit]
+    if len(filePaths) == 0:
+        return
+
+    originals = []
+    for filePath in filePaths:
+        with open(filePath, 'rb') as file:
+            originals.append(file.read())
+    sliceCases = [loadSliceCase(filePath) for filePath in filePaths]
+    num_points = sum(len(sliceCase.points) for sliceCase in sliceCases)
+
+    print(f"{exampleDir}: {len(sliceCases)} cases, {num_points} points, {sum(map(len, originals)) / 1e6:.1f} MB")
+
+    encoders = {"legacy": legacyEncode}
+    for backend, backendEncoders in SERIALIZERS.items():
+        if backend != "orjson" or orjson is not None:
+            encoders[backend] = backendEncoders["slice"]
+
+    for name, encode in encoders.items():
+        best = float("inf")
+        for run in range(repeat):
+            start = time.perf_counter()
+            encoded = [encode(sliceCase) for sliceCase in sliceCases]
+            best = min(best, time.perf_counter() - start)
+
+        identical = all(text == original for text, original in zip(encoded, originals))
+        equal = identical or all(json.loads(text) == json.loads(original) for text, original in zip(encoded, originals))
+        size = sum(map(len, encoded)) / 1e6
+
+        print(f"    {name:8s} {best * 1e3:9.1f} ms  {size / best:7.1f} MB/s  {size:7.1f} MB  "
+              f"byte identical: {str(identical):5s}  same values: {equal}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks json serializer backends on the example slice cases")
+    parser.add_argument("examples", nargs="*", default=sorted(glob.glob(EXAMPLES)), help="Example run directories")
+    parser.add_argument("-limit", type=int, default=300, help="Cases loaded per example run")
+    parser.add_argument("-repeat", type=int, default=3, help="Timed runs per backend (best is reported)")
+    args = parser.parse_args()
+
+    for exampleDir in args.examples:
+        benchExample(exampleDir, args.limit, args.repeat)
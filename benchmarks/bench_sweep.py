@@ -0,0 +1,101 @@
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+import subprocess
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from Aeroquest import parseDatabase, resolveParams, writeVspAeroFiles
+from planner import sweepLength, sweepOrder
+from scheduler import copyGeometry
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DATABASES = ["./databasefiles/dense_AoAAbs_4level_database", "./databasefiles/dense_noAbs_4level_database"]
+FAKE_SOLVER = os.path.join(REPO, "benchmarks", "fakes", "vspaero") # Prints the iterations of each case it solves
+WAKE_PATTERN = re.compile(r"(\d+) wake iterations") # Solver output giving the wake iterations of a case
+GMRES_PATTERN = re.compile(r"(\d+) GMRES iterations") # Solver output giving the GMRES iterations of a case
+
+
+#############################################
+##                BENCHMARK                ##
+#############################################
+
+def countIterations(solverPath, geomData, vspCases, threads):
+    """Solves a list of cases in the given order and totals the iterations the solver reports
+
+    Args:
+        solverPath (str): Path to solver
+        geomData (str): Path to geometry (.vspaero file is written next to it)
+        vspCases (dictionary list): Cases, in solve order
+        threads (int): OpenMP threads given to the solver
+
+    Returns:
+        Tuple containing total wake iterations, total GMRES iterations and wall time in seconds
+    """
+    with contextlib.redirect_stdout(None):
+        writeVspAeroFiles(vspCases, geomData)
+
+    start = time.perf_counter()
+    result = subprocess.run([solverPath, "-quest", "-omp", str(threads), geomData], capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+
+    return (sum(int(count) for count in WAKE_PATTERN.findall(result.stdout)),
+            sum(int(count) for count in GMRES_PATTERN.findall(result.stdout)), wall)
+
+def benchSweep(databasePath, solverPath, geomData, threads):
+    """Compares database order against sweep order on every level of a database
+
+    Args:
+        databasePath (str): Path to database file
+        solverPath (str): Path to solver (None to only measure path length)
+        geomData (str): Path to geometry the solver runs on (None for an empty one, enough for the fake solver)
+        threads (int): OpenMP threads given to the solver
+
+    Returns:
+        None, prints path length (and iterations) of each level in both orders
+    """
+    print(databasePath)
+
+    with tempfile.TemporaryDirectory() as workDir:
+        geomCopy = os.path.join(workDir, "wing") if geomData is None else copyGeometry(geomData, workDir)
+
+        for level_i, vspCases in enumerate(parseDatabase(databasePath, "VSPAero")):
+            params = [resolveParams(vspCase) for vspCase in vspCases]
+
+            start = time.perf_counter()
+            order = sweepOrder(params)
+            ordering = time.perf_counter() - start
+
+            print(f"  level {level_i}: {len(vspCases)} cases, path {sweepLength(params):.2f} -> {sweepLength(params, order):.2f}"
+                  f" (ordered in {ordering * 1e3:.1f} ms)")
+
+            if solverPath is None:
+                continue
+
+            before = countIterations(solverPath, geomCopy, list(vspCases), threads)
+            after = countIterations(solverPath, geomCopy, [vspCases[i] for i in order], threads)
+
+            for name, old, new in [("wake", before[0], after[0]), ("GMRES", before[1], after[1])]:
+                print(f"    {name:5} iterations {old:8d} -> {new:8d}  ({(1 - new / max(old, 1)) * 100:5.1f}% fewer)")
+            print(f"    solver wall    {before[2]:8.2f} -> {after[2]:8.2f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures how much sweep ordering shortens each level's path through the "
+                                                 "flight conditions and the solver iterations it saves")
+    parser.add_argument("databases", nargs="*", default=DATABASES, help="Quest-prep database files")
+    parser.add_argument("-solver", default=FAKE_SOLVER, help="Solver to count iterations with (default the fake vspaero)")
+    parser.add_argument("-geometry", default=None, help="Geometry the solver runs on, copied to a temporary directory (needed by a real solver)")
+    parser.add_argument("-threads", type=int, default=1, help="OpenMP threads given to the solver")
+    parser.add_argument("-nosolve", action="store_true", help="Only measure path length")
+    args = parser.parse_args()
+
+    for databasePath in args.databases:
+        benchSweep(databasePath, None if args.nosolve else args.solver, args.geometry, args.threads)
@@ -0,0 +1,135 @@
+import os
+import json
+import hashlib
+import threading
+import zipfile
+
+import profiling
+from serializer import getSerializer
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_COMPRESSION = 6 # Deflate level of bundle entries (0 stores them uncompressed)
+MANIFEST = "Manifest-Version: 1.0\r\nCreated-By: Aeroquest\r\n\r\n" # Same manifest jar cf writes
+
+
+#############################################
+##              BUNDLE WRITER              ##
+#############################################
+
+class BundleWriter:
+    """Writes the Quest-post json bundle one case at a time
+
+    The bundle is a jar (zip) archive of per-case json files. Every case is
+    encoded in memory (see serializer.py) and compressed straight into its
+    archive entry, so no per-case files are written.
+    Entries go to a temporary archive that replaces the bundle once every case
+    is in, used as a context manager a failed run leaves the old bundle as it was.
+    """
+
+    def __init__(self, bundlePath, compresslevel=DEFAULT_COMPRESSION, serializer=None):
+        """
+        Args:
+            bundlePath (str): Path to bundle
+            compresslevel (int): Deflate level 1-9, 0 to store entries uncompressed
+            serializer (str): Serializer backend (see getSerializer()), None for serializer.DEFAULT_SERIALIZER
+        """
+        self.bundlePath = bundlePath
+        self.encoders = getSerializer(serializer)
+        self.tmpPath = f"{bundlePath}.tmp"
+        self.entries = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(bundlePath) or ".", exist_ok=True)
+
+        if compresslevel == 0:
+            self.archive = zipfile.ZipFile(self.tmpPath, 'w', zipfile.ZIP_STORED)
+        else:
+            self.archive = zipfile.ZipFile(self.tmpPath, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel)
+
+        self.archive.writestr("META-INF/MANIFEST.MF", MANIFEST)
+
+    def write(self, name, data):
+        """Adds a json entry to the bundle (safe to call from several threads)
+
+        Args:
+            name (str): Entry name (e.g. VSPAero.00000.00.00000.json)
+            data: JSON serializable data
+
+        Returns:
+            None, writes out bundle entry
+        """
+        self._writeEncoded(name, self.encoders["data"](data))
+
+    def writeSlice(self, name, sliceCase):
+        """Adds the slices of a single case to the bundle, encoded straight from its arrays
+
+        Args:
+            name (str): Entry name (e.g. VSPAero.00000.00.00000.json)
+            sliceCase (SliceCase): Slice data of a single case
+
+        Returns:
+            None, writes out bundle entry
+        """
+        self._writeEncoded(name, self.encoders["slice"](sliceCase))
+
+    def _writeEncoded(self, name, text):
+        # Text is encoded before taking the lock, so levels only wait on each other to compress
+        with self._lock:
+            self.archive.writestr(name, text)
+            self.entries += 1
+
+    def close(self):
+        """Finishes the bundle and moves it into place
+
+        Returns:
+            None, writes out bundle
+        """
+        with profiling.stage("bundle", cases=self.entries):
+            self.archive.close()
+            os.replace(self.tmpPath, self.bundlePath)
+
+    def discard(self):
+        """Drops the entries written so far, the previous bundle is kept
+
+        Returns:
+            None, removes temporary bundle
+        """
+        self.archive.close()
+        os.remove(self.tmpPath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+#############################################
+##           BUNDLE FINGERPRINT            ##
+#############################################
+
+def bundleFingerprint(bundlePath):
+    """Fingerprints the entries of a bundle
+
+    Only entry names and CRCs are hashed, so rewriting the same cases (in any
+    order, at any compression level) keeps the same fingerprint.
+
+    Args:
+        bundlePath (str): Path to bundle
+
+    Returns:
+        Hex digest of bundle entries, or of the path itself if the bundle does not exist
+    """
+    if not os.path.isfile(bundlePath):
+        return hashlib.sha256(bundlePath.encode()).hexdigest()
+
+    with zipfile.ZipFile(bundlePath) as archive:
+        entries = sorted((info.filename, info.CRC) for info in archive.infolist())
+
+    return hashlib.sha256(json.dumps(entries).encode()).hexdigest()
@@ -0,0 +1,231 @@
+import os
+import json
+import hashlib
+import threading
+import time
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3 # Default cache size limit in bytes (2 GB)
+
+
+#############################################
+##               HASHING                   ##
+#############################################
+
+_file_hashes = {}
+
+def hashFile(filePath):
+    """Hashes the contents of a file
+
+    Hashes are memoized on (path, size, modification time) so large geometry
+    files and solver binaries are only read once per run.
+
+    Args:
+        filePath (str): Path to file
+
+    Returns:
+        Hex digest of file contents, or of the path itself if the file does not exist
+    """
+    if not os.path.isfile(filePath):
+        return hashlib.sha256(filePath.encode()).hexdigest()
+
+    stat = os.stat(filePath)
+    memo_key = (os.path.abspath(filePath), stat.st_size, stat.st_mtime_ns)
+
+    if memo_key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(filePath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+
+    return _file_hashes[memo_key]
+
+def caseKey(inputFiles, params, tools):
+    """Builds the cache key for a single case
+
+    Args:
+        inputFiles (str list): Paths to geometry (and cut) files the case depends on
+        params (dict): Fully resolved solver parameters of the case
+        tools (str list): Paths to solver (and slicer) binaries
+
+    Returns:
+        Hex digest identifying the case
+    """
+    digest = hashlib.sha256()
+
+    for filePath in sorted(inputFiles):
+        digest.update(os.path.basename(filePath).encode())
+        digest.update(hashFile(filePath).encode())
+
+    digest.update(json.dumps(params, sort_keys=True).encode())
+
+    for tool in tools:
+        digest.update(hashFile(tool).encode())
+
+    return digest.hexdigest()
+
+
+#############################################
+##              RESULT CACHE               ##
+#############################################
+
+class ResultCache:
+    """Persistent, size bounded cache of per-case solver outputs
+
+    Every entry is a JSON file at <cacheDir>/<key[:2]>/<key>.<kind>.json. File
+    modification times double as LRU access times, so recency survives between runs.
+    """
+
+    def __init__(self, cacheDir, max_bytes=DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            cacheDir (str): Path to cache directory
+            max_bytes (int): Size limit, least recently used entries are evicted past it
+        """
+        self.cacheDir = cacheDir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._statsLock = threading.Lock()
+        self._saved = {'hits': 0, 'misses': 0, 'evictions': 0} # Counts already added to stats.json
+        self._entries = {} # entry path -> [size, last access]
+
+        os.makedirs(cacheDir, exist_ok=True)
+        for root, dirs, files in os.walk(cacheDir):
+            for name in files:
+                if name.endswith(".json") and name != "stats.json":
+                    entryPath = os.path.join(root, name)
+                    stat = os.stat(entryPath)
+                    self._entries[entryPath] = [stat.st_size, stat.st_mtime]
+
+    def _entryPath(self, key, kind):
+        return os.path.join(self.cacheDir, key[:2], f"{key}.{kind}.json")
+
+    def contains(self, key, kind):
+        """Checks if an output is cached without loading it (not counted as a hit or miss)
+
+        Args:
+            key (str): Case key from caseKey()
+            kind (str): Output type (e.g. "polar" or "slice")
+
+        Returns:
+            True if the output is cached
+        """
+        with self._lock:
+            return self._entryPath(key, kind) in self._entries
+
+    def get(self, key, kind):
+        """Looks up a cached output
+
+        Args:
+            key (str): Case key from caseKey()
+            kind (str): Output type (e.g. "polar" or "slice")
+
+        Returns:
+            Cached value, None on a miss
+        """
+        entryPath = self._entryPath(key, kind)
+
+        with self._lock:
+            if entryPath not in self._entries:
+                self.misses += 1
+                return None
+
+            try:
+                with open(entryPath) as file:
+                    value = json.load(file)
+            except (OSError, ValueError):
+                del self._entries[entryPath]
+                self.misses += 1
+                return None
+
+            os.utime(entryPath)
+            self._entries[entryPath][1] = time.time()
+            self.hits += 1
+
+        return value
+
+    def put(self, key, kind, value):
+        """Stores an output and evicts least recently used entries past the size limit
+
+        Args:
+            key (str): Case key from caseKey()
+            kind (str): Output type (e.g. "polar" or "slice")
+            value: JSON serializable output
+
+        Returns:
+            None, writes out cache entry
+        """
+        entryPath = self._entryPath(key, kind)
+        os.makedirs(os.path.dirname(entryPath), exist_ok=True)
+
+        tmpPath = f"{entryPath}.{threading.get_ident()}.tmp"
+        with open(tmpPath, 'w') as file:
+            json.dump(value, file)
+        os.replace(tmpPath, entryPath)
+
+        with self._lock:
+            self._entries[entryPath] = [os.path.getsize(entryPath), os.path.getmtime(entryPath)]
+            self._evict()
+
+    def _evict(self):
+        total = sum(size for size, access in self._entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for entryPath in sorted(self._entries, key = lambda path: self._entries[path][1]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries.pop(entryPath)[0]
+            self.evictions += 1
+            try:
+                os.remove(entryPath)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Returns hit/miss statistics for this run
+
+        Returns:
+            Dictionary containing hits, misses, hit rate, evictions, entries and size in bytes
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'entries': len(self._entries),
+                    'bytes': sum(size for size, access in self._entries.values())}
+
+    def saveStats(self):
+        """Adds this run's statistics to the running totals in <cacheDir>/stats.json
+
+        Counts added by an earlier call are not added again, so runs sharing one
+        cache (e.g. the studies of a manifest) can each save their statistics.
+
+        Returns:
+            Dictionary containing running totals
+        """
+        statsPath = os.path.join(self.cacheDir, "stats.json")
+        totals = {'runs': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+
+        with self._statsLock:
+            if os.path.isfile(statsPath):
+                with open(statsPath) as file:
+                    totals.update(json.load(file))
+
+            run = self.stats()
+            totals['runs'] += 1
+            for name in ['hits', 'misses', 'evictions']:
+                totals[name] += run[name] - self._saved[name]
+                self._saved[name] = run[name]
+
+            with open(statsPath, 'w') as file:
+                json.dump(totals, file)
+
+        return totals
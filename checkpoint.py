@@ -0,0 +1,183 @@
+import os
+import json
+import hashlib
+import threading
+
+from cache import hashFile
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+STAGES = ["write", "solve", "slice"] # Checkpointed pipeline stages, in run order (parsing and the bundle are always redone)
+
+
+#############################################
+##              FINGERPRINTS               ##
+#############################################
+
+def fingerprintFiles(paths):
+    """Fingerprints a list of files
+
+    Args:
+        paths (str list): Paths to files
+
+    Returns:
+        Hex digest of file names and contents (missing files hash as their path)
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode())
+        digest.update(hashFile(path).encode())
+
+    return digest.hexdigest()
+
+def fingerprintData(data):
+    """Fingerprints JSON serializable data
+
+    Args:
+        data: JSON serializable data (e.g. case parameters or parsed results)
+
+    Returns:
+        Hex digest of data
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+#############################################
+##           CHECKPOINT MANIFEST           ##
+#############################################
+
+class Checkpoint:
+    """Manifest of finished pipeline stages
+
+    Stages are recorded per scope (a mesh path or "run") along
+    with a fingerprint of their inputs and of their output files. A stage counts
+    as done only while both still match, so stale artifacts are redone.
+    """
+
+    def __init__(self, manifestPath, resume=False):
+        """
+        Args:
+            manifestPath (str): Path to manifest file
+            resume (bool): True to load the manifest from the previous run, False to start over
+        """
+        self.manifestPath = manifestPath
+        self.scopes = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.isfile(manifestPath):
+            with open(manifestPath) as file:
+                self.scopes = json.load(file)
+
+        self.save()
+
+    def isDone(self, scope, stage, inputs, outputs=[]):
+        """Checks if a stage finished with the same inputs and untouched outputs
+
+        Args:
+            scope (str): Mesh path or "run"
+            stage (str): Stage name (see STAGES)
+            inputs (str): Fingerprint of stage inputs
+            outputs (str list): Paths to stage output files
+
+        Returns:
+            True if the stage can be skipped
+        """
+        with self._lock:
+            record = self.scopes.get(scope, {}).get(stage)
+
+        if record is None or record['inputs'] != inputs or record['output_paths'] != list(outputs):
+            return False
+
+        if not all(os.path.isfile(path) for path in outputs):
+            return False
+
+        return record['outputs'] == fingerprintFiles(outputs)
+
+    def markDone(self, scope, stage, inputs, outputs=[], save=True):
+        """Records a finished stage
+
+        Args:
+            scope (str): Mesh path or "run"
+            stage (str): Stage name (see STAGES)
+            inputs (str): Fingerprint of stage inputs
+            outputs (str list): Paths to stage output files
+            save (bool): False to defer writing the manifest (call save() later)
+
+        Returns:
+            None, records stage
+        """
+        record = {'inputs': inputs, 'output_paths': list(outputs), 'outputs': fingerprintFiles(outputs)}
+
+        with self._lock:
+            self.scopes.setdefault(scope, {})[stage] = record
+
+        if save:
+            self.save()
+
+    def firstIncomplete(self, scope, stages=STAGES):
+        """Returns the first stage of a scope that has not been recorded
+
+        Args:
+            scope (str): Mesh path or "run"
+            stages (str list): Stages that apply to this scope, in run order
+
+        Returns:
+            Stage name, None if every stage is recorded
+        """
+        with self._lock:
+            recorded = set(self.scopes.get(scope, {}))
+
+        for stage in stages:
+            if stage not in recorded:
+                return stage
+
+        return None
+
+    def save(self):
+        """Writes manifest to disk
+
+        Returns:
+            None, writes out manifest file
+        """
+        with self._lock:
+            tmpPath = f"{self.manifestPath}.tmp"
+            with open(tmpPath, 'w') as file:
+                json.dump(self.scopes, file)
+            os.replace(tmpPath, self.manifestPath)
+
+
+#############################################
+##              STAGE RUNNER               ##
+#############################################
+
+def runStage(checkpoint, scope, stage, inputs, outputs, function):
+    """Runs a stage unless the checkpoint shows it already finished
+
+    Args:
+        checkpoint (Checkpoint): Checkpoint manifest (None to always run)
+        scope (str): Mesh path or "run"
+        stage (str): Stage name (see STAGES)
+        inputs (str): Fingerprint of stage inputs
+        outputs (str list): Paths to stage output files
+        function (function): Called with no arguments to run the stage, a nonzero
+            exit code returned from it leaves the stage unrecorded
+
+    Returns:
+        True if the stage was run, False if it was skipped
+    """
+    if checkpoint is None:
+        function()
+        return True
+
+    if checkpoint.isDone(scope, stage, inputs, outputs):
+        print(f"Skipping {stage} for {scope} (checkpoint up to date)")
+        return False
+
+    exit_code = function()
+
+    if exit_code in (None, 0) and all(os.path.isfile(path) for path in outputs):
+        checkpoint.markDone(scope, stage, inputs, outputs)
+
+    return True
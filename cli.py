@@ -0,0 +1,74 @@
+import sys
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+HELP_COMMANDS = ["help", "-h"] # Commands answered without loading Aeroquest.py
+
+
+#############################################
+##              COMMAND LINE               ##
+#############################################
+
+def printHelp():
+    """Prints the help menu"""
+    print("Format: python3 cli.py <command> <arguments> <flags> (or python3 Aeroquest.py ...)\n")
+    print("help (-h): Help Menu")
+    print("write (-w): Write .VSPAero File of the fine mesh")
+    print("delete (-d): Delete .VSPAero File of the fine mesh")
+    print("solve (-s): Runs VSPAero Solver on the fine mesh (-timeout, -retries, -progress, -profile, -trace)")
+    print("slice: Runs ADB slicer on the fine mesh (-timeout, -retries, -progress, -profile, -trace)")
+    print("parse <database (optional)>: Prints the cases of each mesh level of a Quest-prep database")
+    print("run (-ws) <mesh number (1-3)>: Runs full Quest/VSP Wrapper, to run for slice data add -slice")
+    print("    -mg: Solves every grid level on the fine mesh at VSPAero's own mesh levels instead of separate meshes (any number of levels, not for slice data)")
+    print("    -shards <N/auto>: Splits the cases of each mesh across N solver processes (auto picks processes and threads from observed scaling)")
+    print("    -nocache: Solves every case instead of reusing cached results")
+    print("    -resume: Picks up at the first unfinished stage of the previous run")
+    print("    -interp <linear/cubic>: Interpolation of slice data onto finest mesh stations")
+    print("    -compress <0-9>: Compression level of the json bundle (0 for none)")
+    print("    -serializer <orjson/stream/json>: JSON encoder (default stream)")
+    print("    -mirror: Solves cases that only differ in the sign of Beta once (symmetric geometry, not for slice data)")
+    print("    -nosweep: Writes cases to the solver in database order instead of along a short path through Mach, Beta and AoA")
+    print("    -noarchive: Skips the columnar archive of the results (QuestpostInputData/VSPAero.archive)")
+    print("    -repost: Runs Quest-post even if the bundle has not changed since it last ran")
+    print("    -timeout <seconds or solve=S,slice=S,post=S>: Kills a solver, slicer or Quest-post process that runs longer")
+    print("    -retries <N>: Reruns a failed solver, slicer or Quest-post process up to N times")
+    print("    -progress <seconds>: Interval between progress/ETA lines (default 30, 0 for none)")
+    print("    -profile: Records time, CPU, memory and I/O of every stage to aeroquest.profile.jsonl")
+    print("    -trace: Same as -profile, also writes a Chrome trace to aeroquest.trace.json")
+    print("    -surrogate <tolerance>: Fills in points a local surrogate predicts within tolerance (e.g. 0.01), not for slice data")
+    print("    -calibrate <threshold>: Picks the cheapest solver settings of each coarse level that move coefficients by at most threshold (e.g. 0.001), not for slice data")
+    print("    -solverprofile <name or json file>: Solver settings of each level (default: DEFAULT_PARAMS on every level, loose: relaxed coarse levels)")
+    print("study (-study) <manifest>: Runs every study of a manifest (json) under one core budget, studies sharing a mesh reuse cached solves")
+    print("    -cores <N>: Cores shared by every study (default all available)")
+    print("    -nocache, -nosweep, -resume, -repost, -compress, -serializer, -timeout, -retries, -progress, -profile, -trace: Same as for run")
+    print("bundle <archive (optional)>: Rewrites the json bundle from a columnar archive (-compress, -serializer)")
+    print("post <bundle (optional)>: Runs Quest-post on the json bundle (-repost to run it on an unchanged bundle, -timeout, -retries, -progress, -profile, -trace)")
+    print("-rebundle <archive (optional)>: bundle, then post")
+    print("-wsmg <levels>: Same as run <levels> -mg")
+
+def main(args):
+    """Runs a command line command
+
+    Help is printed without loading Aeroquest.py. Every other command imports
+    Aeroquest as a module, so Python reuses its compiled bytecode from __pycache__
+    instead of compiling the whole script on every call as python3 Aeroquest.py
+    does, and the command loads only the modules it needs (see Aeroquest.main()).
+
+    Args:
+        args (str list): Command and its arguments (sys.argv[1:])
+
+    Returns:
+        None, runs the command
+    """
+    if len(args) > 0 and args[0] in HELP_COMMANDS:
+        printHelp()
+        return
+
+    import Aeroquest
+
+    Aeroquest.main(args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,243 @@
+import numpy as np
+
+from fastparse import parseNumbers
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+ID_COLUMNS = 5 # Point, row, level, realization and weight columns before the parameters of every row
+ID_WIDTHS = {'realization': 5, 'level': 2, 'point': 5} # Zero padded width of each id in case filenames, in filename order
+
+
+#############################################
+##              QUEST DATABASE             ##
+#############################################
+
+class QuestDatabase:
+    """Cases of a Quest-prep database file, stored as columns
+
+    Every case is a row of params (one column per uncertainty parameter) with its
+    point, level and realization ids held in integer columns alongside. Cases
+    are looked up by (level, point) or by filename in O(1), filenames are built
+    for all cases at once the first time they are needed.
+    """
+
+    __slots__ = ("names", "params", "point", "level", "realization", "runs", "outputFileName",
+                 "_filenames", "_byFilename", "_byLevelPoint")
+
+    def __init__(self, names, params, point, level, realization, runs, outputFileName):
+        """
+        Args:
+            names (string list): Uncertainty parameter names
+            params (ndarray): (N, len(names)) float64 array of parameter values
+            point (ndarray): Point id of each case
+            level (ndarray): Level (mesh) id of each case
+            realization (ndarray): Realization id of each case
+            runs (int): Number of runs per mesh given by the database header
+            outputFileName (str): Header for quest post json filename
+        """
+        self.names = list(names)
+        self.params = params
+        self.point = point
+        self.level = level
+        self.realization = realization
+        self.runs = runs
+        self.outputFileName = outputFileName
+        self._filenames = None
+        self._byFilename = None
+        self._byLevelPoint = None
+
+    @staticmethod
+    def fromFile(filePath, outputFileName):
+        """Parses a Quest-prep database file
+
+        Only the rows counted by the header are read, the configuration text
+        after them is skipped.
+
+        Args:
+            filePath (str): Path to database file
+            outputFileName (str): Header for quest post json filename
+
+        Returns:
+            QuestDatabase
+        """
+        with open(filePath, 'rb') as file:
+            text = file.read()
+
+        lines = text.split(b"\n", 4)
+        if len(lines) < 5:
+            raise ValueError(f"{filePath}: missing database header")
+
+        runs, runs_total = (int(value) for value in lines[2].split()[:2])
+        names = lines[3].decode().split()
+        width = ID_COLUMNS + len(names)
+
+        rows = lines[4].split(b"\n", runs_total)[:runs_total]
+        values = parseNumbers(b"\n".join(rows)) if len(rows) == runs_total else np.empty(0)
+        if len(values) != runs_total * width:
+            raise ValueError(f"{filePath}: expected {runs_total} rows of {width} columns")
+
+        table = values.reshape(runs_total, width)
+        ids = table[:, :ID_COLUMNS].astype(np.int64)
+
+        return QuestDatabase(names, np.ascontiguousarray(table[:, ID_COLUMNS:]),
+                             ids[:, 0], ids[:, 2], ids[:, 3], runs, outputFileName)
+
+    def __len__(self):
+        return len(self.params)
+
+    @property
+    def num_levels(self):
+        """Number of levels (meshes) in the database"""
+        return int(self.level.max()) + 1 if len(self) > 0 else 0
+
+    def filenames(self):
+        """Builds the Quest-post json filename of every case
+
+        Returns:
+            Array of filenames ({outputFileName}.{realization}.{level}.{point}), in row order
+        """
+        if self._filenames is None:
+            filenames = np.full(len(self), self.outputFileName)
+            for name, width in ID_WIDTHS.items():
+                ids = np.char.zfill(getattr(self, name).astype(str), width)
+                filenames = np.char.add(np.char.add(filenames, "."), ids)
+            self._filenames = filenames
+
+        return self._filenames
+
+    def find(self, filename):
+        """Looks up a case by filename
+
+        Args:
+            filename (str): Case filename (see filenames())
+
+        Returns:
+            Row of the case
+        """
+        if self._byFilename is None:
+            self._byFilename = {filename: row for row, filename in enumerate(self.filenames().tolist())}
+
+        return self._byFilename[filename]
+
+    def rowOf(self, level, point):
+        """Looks up a case by level and point id
+
+        Args:
+            level (int): Level id
+            point (int): Point id
+
+        Returns:
+            Row of the case
+        """
+        if self._byLevelPoint is None:
+            table = np.full((self.num_levels, int(self.point.max()) + 1), -1, dtype=np.int64)
+            table[self.level, self.point] = np.arange(len(self))
+            self._byLevelPoint = table
+
+        row = self._byLevelPoint[level, point] if 0 <= level < self._byLevelPoint.shape[0] and 0 <= point < self._byLevelPoint.shape[1] else -1
+        if row < 0:
+            raise KeyError((level, point))
+
+        return int(row)
+
+    def case(self, row):
+        """Builds the dictionary of a single case
+
+        Args:
+            row (int): Row of the case
+
+        Returns:
+            Dictionary containing case filename and uncertainty parameters
+        """
+        return {'filename': str(self.filenames()[row]), 'data': dict(zip(self.names, self.params[row].tolist()))}
+
+    def levelView(self, level):
+        """Selects the cases of a single level
+
+        Args:
+            level (int): Level id
+
+        Returns:
+            LevelView of the cases, in database order
+        """
+        return LevelView(self, np.flatnonzero(self.level == level))
+
+    def levels(self, num_levels=None):
+        """Splits the database by level
+
+        Args:
+            num_levels (int): Number of meshes, None for every level in the database
+
+        Returns:
+            List of LevelViews, level num_levels - 1 first and level 0 last
+        """
+        if num_levels is None:
+            num_levels = self.num_levels
+
+        if num_levels > self.num_levels:
+            raise ValueError(f"Database has {self.num_levels} levels, {num_levels} meshes given")
+
+        return [self.levelView(level) for level in range(num_levels - 1, -1, -1)]
+
+
+class LevelView:
+    """Read only sequence over a subset of database cases
+
+    Indexing gives the same dictionaries parseLineData() used to build, made on
+    demand, so code written against lists of cases works unchanged. Solver
+    settings given to the view are added to every case under 'settings'.
+    """
+
+    __slots__ = ("database", "rows", "settings")
+
+    def __init__(self, database, rows, settings=None):
+        """
+        Args:
+            database (QuestDatabase): Database the cases belong to
+            rows (ndarray): Rows of the cases, in order
+            settings (dict): Solver parameters shared by the cases (see Aeroquest.resolveParams()), None for none
+        """
+        self.database = database
+        self.rows = rows
+        self.settings = settings
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LevelView(self.database, self.rows[index], self.settings)
+
+        return self._case(int(self.rows[index]))
+
+    def __iter__(self):
+        for row in self.rows.tolist():
+            yield self._case(row)
+
+    def _case(self, row):
+        case = self.database.case(row)
+        if self.settings:
+            case['settings'] = dict(self.settings)
+        return case
+
+    def withSettings(self, settings):
+        """Gives the cases solver settings
+
+        Args:
+            settings (dict): Solver parameters shared by the cases, None for none
+
+        Returns:
+            LevelView of the same cases
+        """
+        return LevelView(self.database, self.rows, settings)
+
+    @property
+    def params(self):
+        """(len(self), P) float64 array of parameter values"""
+        return self.database.params[self.rows]
+
+    def filenames(self):
+        """Returns the filenames of the cases, in order"""
+        return self.database.filenames()[self.rows]
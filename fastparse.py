@@ -0,0 +1,330 @@
+import os
+import re
+import mmap
+
+import numpy as np
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+POLAR_COLUMNS = {'CL': ["CL", "CLtot"],
+                 'CDTot': ["CDtot", "CDTot"],
+                 'CMy': ["CMy", "CMytot"]} # Output name -> .polar header names it may appear under, in lookup order
+POLAR_INDICES = {'CL': 4, 'CDTot': 7, 'CMy': -6} # Fallback column positions when a header name is not found
+
+SLICE_BATCH = 64 # Cases parsed together by iterSliceCasesMapped()
+MAX_DIGITS = 15 # Longest field parseFixedWidth() parses exactly (integers up to 10^15 are exact floats)
+
+
+
+#############################################
+##               MAPPED FILES              ##
+#############################################
+
+def mapFile(filePath):
+    """Memory maps a file for reading
+
+    Args:
+        filePath (str): Path to file
+
+    Returns:
+        Read only mmap of the file, None if the file is empty
+    """
+    with open(filePath, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def parseNumbers(buffer):
+    """Parses whitespace separated numbers in bulk
+
+    Args:
+        buffer (bytes): Text containing only numbers and whitespace
+
+    Returns:
+        1D float64 array of every number in buffer
+    """
+    if len(buffer.strip()) == 0:
+        return np.empty(0, dtype=np.float64)
+
+    return np.fromstring(buffer, dtype=np.float64, sep=" ")
+
+def selectFields(rows, columns):
+    """Cuts the bytes of some columns out of a fixed width table
+
+    Each column keeps the separator in front of it, so the result is a fixed
+    width table of only those columns (in the given order).
+
+    Args:
+        rows (ndarray): (N, L) uint8 array, one line of text per row (no newline)
+        columns (int list): Column indices, field positions are taken from the first row
+
+    Returns:
+        (N, L') uint8 array, None if the first row has fewer columns
+    """
+    tokens = [token.span() for token in re.finditer(rb"\S+", rows[0].tobytes())]
+    if any(column >= len(tokens) or column < -len(tokens) for column in columns):
+        return None
+
+    starts = [0] + [end for start, end in tokens[:-1]]
+    keep = np.concatenate([np.arange(starts[column], tokens[column][1]) for column in columns])
+
+    return rows[:, keep]
+
+def parseFixedWidth(rows, columns=None):
+    """Parses a table of printf style %w.pf columns without tokenizing
+
+    Column layout (field ends and decimal points) is taken from the first row and
+    must line up in every row. Each field is read as an integer from its digits and
+    divided by a power of ten, which rounds the same as float() on the text.
+
+    Args:
+        rows (ndarray): (N, L) uint8 array, one line of text per row (no newline)
+        columns (int list): Columns to parse, None for every column (only the bytes
+            of these columns are read, see selectFields())
+
+    Returns:
+        (N, columns) float64 array, None if the rows are not a fixed width table
+    """
+    if columns is not None:
+        rows = selectFields(rows, columns)
+        if rows is None:
+            return None
+
+    first = rows[0].tobytes()
+    width = rows.shape[1]
+    fields = [(first.find(b".", token.start(), token.end()), token.end()) for token in re.finditer(rb"\S+", first)]
+
+    if len(fields) == 0 or any(dot == -1 for dot, end in fields):
+        return None
+
+    integer_part = np.zeros(width, dtype=bool) # Leading spaces, sign and digits before the decimal point
+    fraction_part = np.zeros(width, dtype=bool)
+    decimal_point = np.zeros(width, dtype=bool)
+    weights = np.zeros((width, len(fields)))
+    sign_positions = np.zeros((width, len(fields)), dtype=np.float32)
+    scales = np.empty(len(fields))
+
+    filled = rows.max(axis=0) > ord(" ") # Positions that are not blank in every row
+    field_start = 0
+
+    for column, (dot, end) in enumerate(fields):
+        integer_part[field_start:dot] = True
+        fraction_part[dot + 1:end] = True
+        decimal_point[dot] = True
+        sign_positions[field_start:dot, column] = 1
+
+        start = field_start + np.argmax(filled[field_start:dot]) if filled[field_start:dot].any() else dot
+        if end - start - 1 > MAX_DIGITS:
+            return None
+
+        weights[start:dot, column] = 10.0 ** np.arange(end - start - 2, end - dot - 2, -1)
+        weights[dot + 1:end, column] = 10.0 ** np.arange(end - dot - 2, -1, -1)
+        scales[column] = 10.0 ** (end - dot - 1)
+        field_start = end
+
+    digits = rows - np.uint8(ord("0")) # Wraps around to >= 10 for anything but a digit
+    is_digit = digits < 10
+    is_blank = rows == ord(" ")
+    is_minus = rows == ord("-")
+
+    valid = is_digit & (integer_part | fraction_part)
+    valid |= (is_blank | is_minus) & integer_part
+    valid |= (rows == ord(".")) & decimal_point
+    valid |= is_blank & ~(integer_part | fraction_part | decimal_point) # Trailing spaces
+    if not valid.all():
+        return None
+
+    digits *= is_digit
+    values = digits.astype(np.float64) @ weights
+    values /= scales
+
+    negative = is_minus.astype(np.float32) @ sign_positions > 0
+    values[negative] *= -1
+
+    return values
+
+def parseLines(buffer, columns=None):
+    """Parses lines of numbers, using parseFixedWidth() when the lines allow it
+
+    Args:
+        buffer (bytes): Lines containing only numbers, each ending in a newline
+        columns (int list): Columns to parse, None for every column
+
+    Returns:
+        (N, columns) float64 array, None if the lines are not a fixed width table
+    """
+    width = buffer.find(b"\n") + 1
+    if width < 2 or len(buffer) % width != 0:
+        return None
+
+    rows = np.frombuffer(buffer, dtype=np.uint8).reshape(-1, width)
+    if not np.all(rows[:, -1] == ord("\n")):
+        return None
+
+    return parseFixedWidth(rows[:, :-1], columns)
+
+
+#############################################
+##               POLAR FILES               ##
+#############################################
+
+def readPolar(filePath, outputs=None):
+    """Parses a .polar file into typed columns
+
+    The header line names the columns, every following line is one case. Only
+    the bytes of the columns asked for are parsed.
+
+    Args:
+        filePath (str): Path to .polar file
+        outputs (str list): Output names to parse (see POLAR_COLUMNS), None for every column
+
+    Returns:
+        Dictionary containing a float64 array for every header column (in header order),
+        or for every output name when outputs are given
+    """
+    mapped = mapFile(filePath)
+    if mapped is None:
+        return {}
+
+    with mapped:
+        header_end = mapped.find(b"\n")
+        if header_end == -1:
+            header_end = len(mapped)
+
+        names = mapped[:header_end].decode().split()
+        body = mapped[header_end + 1:].rstrip()
+
+    keys = names if outputs is None else list(outputs)
+    if len(body) == 0:
+        return {key: np.empty(0, dtype=np.float64) for key in keys}
+
+    num_columns = len(body.split(b"\n", 1)[0].split())
+    if len(names) != num_columns:
+        names = [f"col{column}" for column in range(num_columns)]
+        keys = names if outputs is None else keys
+
+    columns = None if outputs is None else [polarIndex(names, output) for output in outputs]
+
+    table = parseLines(body + b"\n", columns)
+    if table is None:
+        values = parseNumbers(body)
+        if len(values) % num_columns != 0:
+            raise ValueError(f"{filePath}: rows do not all have {num_columns} columns")
+        table = values.reshape(-1, num_columns)
+        if columns is not None:
+            table = table[:, columns]
+
+    return {key: table[:, column] for column, key in enumerate(keys)}
+
+def polarIndex(names, name):
+    """Looks up the column of an output in a .polar header by name
+
+    Args:
+        names (str list): Header column names
+        name (str): Output name (see POLAR_COLUMNS)
+
+    Returns:
+        Column index (POLAR_INDICES when no header name matches)
+    """
+    for header in POLAR_COLUMNS[name]:
+        if header in names:
+            return names.index(header)
+
+    return POLAR_INDICES[name]
+
+def polarCoefficients(filePath):
+    """Reads CL, CDTot and CMy from a .polar file
+
+    Args:
+        filePath (str): Path to .polar file
+
+    Returns:
+        Dictionary containing a float64 array for CL, CDTot and CMy (one value per case)
+    """
+    columns = readPolar(filePath, list(POLAR_COLUMNS))
+    if len(columns) == 0:
+        return {name: np.empty(0, dtype=np.float64) for name in POLAR_COLUMNS}
+
+    return columns
+
+
+#############################################
+##               SLICE FILES               ##
+#############################################
+
+def findSliceBlocks(mapped):
+    """Locates the points of every BLOCK in a .slc file
+
+    Args:
+        mapped (mmap): Memory mapped .slc file
+
+    Returns:
+        List containing case number, start and end of the point lines of each BLOCK,
+        the first point after each BLOCK header is left out
+    """
+    starts = [0] if mapped[:1] == b"B" else []
+    position = mapped.find(b"\nB")
+    while position != -1:
+        starts.append(position + 1)
+        position = mapped.find(b"\nB", position + 2)
+
+    blocks = []
+    for block_i, start in enumerate(starts):
+        end = starts[block_i + 1] if block_i + 1 < len(starts) else len(mapped)
+
+        line_starts = [start]
+        for line in range(4): # Case line, column header, first point (skipped as parseSliceData() always has), rest of points
+            position = mapped.find(b"\n", line_starts[-1], end)
+            line_starts.append(end if position == -1 else position + 1)
+
+        block_case = int(mapped[line_starts[1]:line_starts[2]].split()[1])
+        blocks.append((block_case, line_starts[4], end))
+
+    return blocks
+
+def iterSliceCasesMapped(filePath):
+    """Streams raw slice points from .slc file one case at a time
+
+    Same output as slicedata.iterSliceCases(). BLOCK headers are found by searching
+    the memory mapped file, then the points of SLICE_BATCH cases at a time are
+    parsed together by parseLines() (parseNumbers() if they are not fixed width).
+
+    Args:
+        filePath (str): Path to .slc file
+
+    Yields:
+        Tuple containing case number and an (N, 4) array of x, y, z, dCp values, in file order
+    """
+    mapped = mapFile(filePath)
+    if mapped is None:
+        return
+
+    with mapped:
+        cases = []
+        for block_case, start, end in findSliceBlocks(mapped):
+            if len(cases) == 0 or cases[-1][0] != block_case:
+                cases.append((block_case, []))
+            cases[-1][1].append((start, end))
+
+        for batch_start in range(0, len(cases), SLICE_BATCH):
+            batch = cases[batch_start:batch_start + SLICE_BATCH]
+            texts = []
+            counts = []
+            for case_num, regions in batch:
+                counts.append(0)
+                for start, end in regions:
+                    text = mapped[start:end].rstrip()
+                    if len(text) > 0:
+                        texts.append(text + b"\n")
+                        counts[-1] += text.count(b"\n") + 1
+
+            points = parseLines(b"".join(texts))
+            if points is None or points.shape[1] != 4:
+                points = np.concatenate([parseNumbers(text) for text in texts] + [np.empty(0)]).reshape(-1, 4)
+
+            offset = 0
+            for (case_num, regions), count in zip(batch, counts):
+                yield case_num, points[offset:offset + count]
+                offset += count
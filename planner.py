@@ -0,0 +1,210 @@
+import numpy as np
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+MIRROR_PARAM = "Beta" # Flight condition whose sign can be flipped without changing CL, CDTot and CMy
+SWEEP_PARAMS = ["Mach", "Beta", "AoA"] # Flight conditions a sweep is ordered along (see sweepOrder())
+
+
+#############################################
+##              CASE PLANNING              ##
+#############################################
+
+class CasePlan:
+    """Maps the cases of a single mesh onto the unique flight conditions to solve
+
+    The first case of every condition represents it, so unique keeps database
+    order and the solver sees exactly the parameters of an existing row.
+    """
+
+    def __init__(self, unique, mapping, mirrored):
+        """
+        Args:
+            unique (int list): Index of the representative case of each condition, in case order
+            mapping (int list): Position in unique of the condition of every case
+            mirrored (bool list): True for cases solved through their mirror image (Beta sign flipped)
+        """
+        self.unique = unique
+        self.mapping = mapping
+        self.mirrored = mirrored
+
+    @property
+    def saved(self):
+        """Number of solver cases saved"""
+        return len(self.mapping) - len(self.unique)
+
+    @property
+    def num_mirrored(self):
+        """Number of cases covered by a mirrored condition"""
+        return sum(self.mirrored)
+
+    def select(self, cases):
+        """Picks the representative cases
+
+        Args:
+            cases (list): Every case (anything indexable in case order)
+
+        Returns:
+            List of the cases to solve
+        """
+        return [cases[i] for i in self.unique]
+
+    def expand(self, results):
+        """Fans results of the unique conditions back out to every case
+
+        Args:
+            results (list): One result per unique condition
+
+        Returns:
+            List of results, one per case (duplicates share the same object)
+        """
+        return [results[u] for u in self.mapping]
+
+    def expandStream(self, results):
+        """Fans a stream of results back out to every case
+
+        Results are only held until the last case that shares them. Once every case
+        is out, results is run to its end, so work it does after its last result
+        (e.g. recording slice parse timings) is not skipped.
+
+        Args:
+            results (iterator): One result per unique condition, in order
+
+        Yields:
+            Result of every case, in case order
+        """
+        last_use = {u: case_i for case_i, u in enumerate(self.mapping)}
+        held = {}
+        next_unique = 0
+
+        for case_i, u in enumerate(self.mapping):
+            if u == next_unique:
+                result = next(results)
+                next_unique += 1
+            else:
+                result = held[u]
+
+            if last_use[u] > case_i:
+                held[u] = result
+            else:
+                held.pop(u, None)
+
+            yield result
+
+        next(results, None)
+
+def mirrorKey(params):
+    """Builds the key of a condition with Beta's sign dropped
+
+    Args:
+        params (dict): Resolved solver parameters of a case (see resolveParams())
+
+    Returns:
+        Tuple of parameter values, Beta without its sign
+    """
+    return tuple(value.lstrip("-") if param == MIRROR_PARAM else value for param, value in params.items())
+
+def planCases(params, mirror=False):
+    """Finds the unique flight conditions among the cases of a single mesh
+
+    Cases are duplicates when every solver parameter is written the same way. With
+    mirror, cases that only differ in the sign of Beta are also merged: for a
+    geometry symmetric about the xz plane CL, CDTot and CMy do not change with the
+    sign of sideslip. Slice data does (cuts swap sides), so leave mirror off for it.
+
+    Args:
+        params (dict list): Resolved solver parameters of every case (see resolveParams())
+        mirror (bool): True to merge cases that only differ in the sign of Beta
+
+    Returns:
+        CasePlan
+    """
+    conditions = {}
+    unique = []
+    mapping = []
+    mirrored = []
+
+    for case_i, param in enumerate(params):
+        key = mirrorKey(param) if mirror else tuple(param.values())
+
+        if key not in conditions:
+            conditions[key] = len(unique)
+            unique.append(case_i)
+
+        u = conditions[key]
+        mapping.append(u)
+        mirrored.append(params[unique[u]].get(MIRROR_PARAM) != param.get(MIRROR_PARAM))
+
+    return CasePlan(unique, mapping, mirrored)
+
+
+#############################################
+##              SWEEP ORDERING             ##
+#############################################
+
+def sweepPoints(params, names=SWEEP_PARAMS):
+    """Places cases in the unit cube of the swept flight conditions
+
+    Args:
+        params (dict list): Resolved solver parameters of every case (see resolveParams())
+        names (str list): Parameters to sweep along
+
+    Returns:
+        (N, len(names)) array, each parameter scaled by its range over the cases (0 where it does not vary)
+    """
+    points = np.array([[float(param[name]) for name in names] for param in params], dtype=np.float64).reshape(len(params), len(names))
+    if len(points) == 0:
+        return points
+
+    span = points.max(axis=0) - points.min(axis=0)
+    return (points - points.min(axis=0)) / np.where(span > 0, span, 1)
+
+def sweepOrder(params, names=SWEEP_PARAMS):
+    """Orders cases along a short path through the swept flight conditions
+
+    VSPAero starts each case of a sweep from the solution of the case before it,
+    so neighbouring conditions converge in fewer wake and GMRES iterations than
+    the jumps of database order. The path starts at the lowest corner and always
+    steps to the nearest case not yet visited (ties go to the earlier case), so
+    the same cases always come out in the same order.
+
+    Args:
+        params (dict list): Resolved solver parameters of every case (see resolveParams())
+        names (str list): Parameters to sweep along
+
+    Returns:
+        List containing the index of every case, in solve order (order[k] is the case solved k-th)
+    """
+    points = sweepPoints(params, names)
+    if len(points) == 0:
+        return []
+
+    visited = np.zeros(len(points), dtype=bool)
+    order = [int(np.argmin(points.sum(axis=1)))]
+
+    for step in range(len(points) - 1):
+        visited[order[-1]] = True
+        distance = np.sqrt(((points - points[order[-1]]) ** 2).sum(axis=1))
+        distance[visited] = np.inf
+        order.append(int(np.argmin(distance)))
+
+    return order
+
+def sweepLength(params, order=None, names=SWEEP_PARAMS):
+    """Measures the path a sweep takes through the swept flight conditions
+
+    Args:
+        params (dict list): Resolved solver parameters of every case (see resolveParams())
+        order (int list): Solve order (see sweepOrder()), None for case order
+        names (str list): Parameters to sweep along
+
+    Returns:
+        Sum of the distances between consecutive cases, in the unit cube of sweepPoints()
+    """
+    points = sweepPoints(params, names)
+    if order is not None:
+        points = points[order]
+
+    return float(np.sqrt((np.diff(points, axis=0) ** 2).sum(axis=1)).sum())
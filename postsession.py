@@ -0,0 +1,163 @@
+import os
+import json
+
+from bundle import bundleFingerprint
+from checkpoint import fingerprintData, fingerprintFiles
+from scheduler import runCommand
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_RECORD_PATH = "./aeroquest.post.json" # Fingerprint of every bundle Quest-post last ran on
+
+
+#############################################
+##              POST SCRIPTS               ##
+#############################################
+
+def postScript(globalPath, bundlePaths, measurementConfig):
+    """Builds a Quest-post script that reads one or more json bundles
+
+    Every bundle is read into a panel of its own, so one launcher process
+    post-processes all of them and loads the Quest database once.
+
+    Args:
+        globalPath (str): Directory Quest-post runs in (bundle paths are relative to it)
+        bundlePaths (str list): Paths to json bundles
+        measurementConfig (str): Path to Quest-post measurement config file
+
+    Returns:
+        Text of script
+    """
+    lines = ["remote(false)", f"cd({globalPath})"]
+    lines += [f"panel(json) read_database(*) read_measurement({bundle}) read_measurementconfig({measurementConfig})"
+              for bundle in bundlePaths]
+
+    return "\n".join(lines)
+
+def writeIfChanged(filePath, text):
+    """Writes a text file unless it already holds the same text
+
+    Args:
+        filePath (str): Path to file
+        text (str): Contents
+
+    Returns:
+        True if the file was written
+    """
+    if os.path.isfile(filePath):
+        with open(filePath, encoding="utf-8", newline="") as file:
+            if file.read() == text:
+                return False
+
+    with open(filePath, 'w', encoding="utf-8", newline="") as file:
+        file.write(text)
+
+    return True
+
+
+#############################################
+##              POST SESSION               ##
+#############################################
+
+class PostSession:
+    """Runs Quest-post on json bundles, batched into as few launcher processes as possible
+
+    Bundles are queued with submit() and post-processed together by flush(), one
+    launcher (and JVM) for the whole batch. A bundle whose entries, measurement
+    config and launcher match the last successful post is skipped; the
+    fingerprints are kept in a record file across runs. Used as a context
+    manager, queued bundles are flushed on exit.
+    """
+
+    def __init__(self, questLauncher, scriptPath, measurementConfig, globalPath, recordPath=DEFAULT_RECORD_PATH, force=False):
+        """
+        Args:
+            questLauncher (str): Path to Quest launcher
+            scriptPath (str): Path the Quest-post script is written to
+            measurementConfig (str): Path to Quest-post measurement config file
+            globalPath (str): Directory Quest-post runs in
+            recordPath (str): Path to record of post-processed bundles
+            force (bool): True to post-process every bundle, even unchanged ones
+        """
+        self.questLauncher = questLauncher
+        self.scriptPath = scriptPath
+        self.measurementConfig = measurementConfig
+        self.globalPath = globalPath
+        self.recordPath = recordPath
+        self.force = force
+        self.pending = {} # Bundle path -> fingerprint, in submit order
+        self.records = {}
+
+        if os.path.isfile(recordPath):
+            with open(recordPath) as file:
+                self.records = json.load(file)
+
+    def fingerprint(self, bundlePath):
+        """Fingerprints everything Quest-post reads for a bundle
+
+        Args:
+            bundlePath (str): Path to json bundle
+
+        Returns:
+            Hex digest of bundle entries, measurement config and launcher path
+        """
+        return fingerprintData([bundleFingerprint(bundlePath), fingerprintFiles([self.measurementConfig]),
+                                os.path.abspath(self.questLauncher), os.path.abspath(self.globalPath)])
+
+    def submit(self, bundlePath):
+        """Queues a bundle for the next flush()
+
+        Args:
+            bundlePath (str): Path to json bundle (must not change until flushed)
+
+        Returns:
+            True if queued, False if Quest-post already ran on the same bundle
+        """
+        fingerprint = self.fingerprint(bundlePath)
+
+        if not self.force and self.records.get(os.path.abspath(bundlePath)) == fingerprint:
+            print(f"Skipping Quest-post for {bundlePath} (bundle unchanged since last post)")
+            return False
+
+        self.pending[bundlePath] = fingerprint
+        return True
+
+    def flush(self):
+        """Runs Quest-post once on every queued bundle
+
+        Returns:
+            Number of bundles post-processed
+        """
+        if not self.pending:
+            return 0
+
+        bundlePaths = list(self.pending)
+        writeIfChanged(self.scriptPath, postScript(self.globalPath, bundlePaths, self.measurementConfig))
+        print(f"Running Quest-post on {len(bundlePaths)} bundle(s)")
+        runCommand(["java", "-jar", self.questLauncher, "-post", "-script", self.scriptPath, "-debug"], stage="post")
+
+        for bundlePath in bundlePaths:
+            self.records[os.path.abspath(bundlePath)] = self.pending.pop(bundlePath)
+        self.save()
+
+        return len(bundlePaths)
+
+    def save(self):
+        """Writes the record of post-processed bundles
+
+        Returns:
+            None, writes out record file
+        """
+        tmpPath = f"{self.recordPath}.tmp"
+        with open(tmpPath, 'w') as file:
+            json.dump(self.records, file, indent=1)
+        os.replace(tmpPath, self.recordPath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
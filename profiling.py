@@ -0,0 +1,322 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+THREAD_IO = "/proc/thread-self/io" # Per thread I/O counters (Linux), stages on other systems record no I/O
+
+_active = None # Profiler recording the current run, see enable()
+_context = threading.local() # Tags of the enclosing tags() blocks on each thread
+
+
+#############################################
+##            RESOURCE COUNTERS            ##
+#############################################
+
+def threadIO():
+    """Reads the bytes read and written by the calling thread
+
+    Returns:
+        Tuple containing bytes read and written so far (None, None if not available)
+    """
+    try:
+        with open(THREAD_IO) as file:
+            counters = dict(line.split(":") for line in file)
+    except OSError:
+        return None, None
+
+    return int(counters["rchar"]), int(counters["wchar"])
+
+def peakRSS():
+    """Returns the peak resident set size of this process in bytes (None if not available)"""
+    if resource is None:
+        return None
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Kilobytes on Linux
+
+
+#############################################
+##                PROFILER                 ##
+#############################################
+
+class Profiler:
+    """Records wall time, CPU time, peak RSS and I/O of every pipeline stage
+
+    Every stage is written to a JSON lines file as it finishes, tagged with the
+    mesh, level and case count of the enclosing tags() blocks. Stages run once
+    per case (parsing, interpolating and writing slice cases) are summed into
+    one record per level, written when the profiler closes. A Chrome trace
+    (chrome://tracing, Perfetto) of the stages can be written alongside.
+    """
+
+    def __init__(self, logPath, tracePath=None):
+        """
+        Args:
+            logPath (str): Path to JSON lines file
+            tracePath (str): Path to Chrome trace file (None to skip)
+        """
+        self.logPath = logPath
+        self.tracePath = tracePath
+        self.origin = time.perf_counter()
+        self.events = []
+        self.totals = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(logPath) or ".", exist_ok=True)
+        self.log = open(logPath, 'w')
+
+    def now(self):
+        """Returns seconds since the profiler started"""
+        return time.perf_counter() - self.origin
+
+    def record(self, name, start, wall, cpu, peak_rss, read_bytes, write_bytes, tags, total=False):
+        """Adds a finished stage
+
+        Args:
+            name (str): Stage name
+            start (float): Start time (see now())
+            wall (float): Wall time in seconds
+            cpu (float): CPU time in seconds
+            peak_rss (int): Peak resident set size in bytes
+            read_bytes (int): Bytes read
+            write_bytes (int): Bytes written
+            tags (dict): Tags of the stage (mesh, level, cases, ...)
+            total (bool): True to sum the stage into one record per name and tags
+
+        Returns:
+            None, writes out record
+        """
+        entry = {"stage": name, "start": round(start, 6), "wall": round(wall, 6), "cpu": round(cpu, 6),
+                 "peak_rss": peak_rss, "read_bytes": read_bytes, "write_bytes": write_bytes, "calls": 1,
+                 "thread": threading.current_thread().name, **tags}
+
+        with self._lock:
+            if total:
+                key = (name, json.dumps(tags, sort_keys=True, default=str))
+                summed = self.totals.setdefault(key, entry)
+                if summed is not entry:
+                    for field in ["wall", "cpu", "read_bytes", "write_bytes"]:
+                        if summed[field] is not None and entry[field] is not None:
+                            summed[field] = round(summed[field] + entry[field], 6)
+                    summed["peak_rss"] = max(summed["peak_rss"] or 0, entry["peak_rss"] or 0)
+                    summed["calls"] += 1
+                return
+
+            self.log.write(json.dumps(entry, default=str) + "\n")
+            self.log.flush()
+            self.events.append((entry, threading.get_ident()))
+
+    def recordProcess(self, name, start, wall, usage, tags):
+        """Adds a finished subprocess, measured by its own resource usage
+
+        Args:
+            name (str): Stage name
+            start (float): Start time (see now())
+            wall (float): Wall time in seconds
+            usage (struct_rusage): Resource usage of the process (from os.wait4)
+            tags (dict): Tags of the stage
+
+        Returns:
+            None, writes out record
+        """
+        self.record(name, start, wall, usage.ru_utime + usage.ru_stime, usage.ru_maxrss * 1024,
+                    usage.ru_inblock * 512, usage.ru_oublock * 512, tags) # Block counts, disk I/O only
+
+    def summary(self):
+        """Sums wall and CPU time over every record of each stage
+
+        Returns:
+            Dictionary containing calls, wall and cpu for each stage name, in first run order
+        """
+        stages = {}
+        for entry in [event for event, thread in self.events] + list(self.totals.values()):
+            summed = stages.setdefault(entry["stage"], {"calls": 0, "wall": 0.0, "cpu": 0.0})
+            summed["calls"] += entry["calls"]
+            summed["wall"] += entry["wall"]
+            summed["cpu"] += entry["cpu"]
+
+        return stages
+
+    def writeTrace(self):
+        """Writes the recorded stages as a Chrome trace
+
+        Returns:
+            None, writes out trace file
+        """
+        lanes = {}
+        traceEvents = []
+        for entry, thread in self.events:
+            lane = lanes.setdefault(thread, len(lanes) + 1)
+            traceEvents.append({"name": entry["stage"], "cat": entry["stage"], "ph": "X", "pid": os.getpid(), "tid": lane,
+                                "ts": round(entry["start"] * 1e6), "dur": round(entry["wall"] * 1e6), "args": entry})
+
+        threadNames = {}
+        for entry, thread in self.events:
+            threadNames.setdefault(lanes[thread], entry["thread"])
+        for lane, threadName in threadNames.items():
+            traceEvents.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": lane, "args": {"name": threadName}})
+
+        with open(self.tracePath, 'w') as file:
+            json.dump({"traceEvents": traceEvents, "displayTimeUnit": "ms"}, file, default=str)
+
+    def close(self):
+        """Writes the summed stages (and the trace) and prints a summary
+
+        Returns:
+            None, writes out profile
+        """
+        for entry in self.totals.values():
+            self.log.write(json.dumps(entry, default=str) + "\n")
+        self.log.close()
+
+        if self.tracePath is not None:
+            self.writeTrace()
+
+        print(f"Profile written to {self.logPath}" + (f" and {self.tracePath}" if self.tracePath else ""))
+        for name, summed in self.summary().items():
+            print(f"    {name:12s} {summed['calls']:6d} calls  {summed['wall']:10.2f} s wall  {summed['cpu']:10.2f} s cpu")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        disable()
+
+
+#############################################
+##              INSTRUMENTATION            ##
+#############################################
+
+def enable(logPath, tracePath=None):
+    """Starts profiling every stage of the run
+
+    Args:
+        logPath (str): Path to JSON lines file
+        tracePath (str): Path to Chrome trace file (None to skip)
+
+    Returns:
+        Profiler (close it with disable(), or use it as a context manager)
+    """
+    global _active
+    disable()
+    _active = Profiler(logPath, tracePath)
+
+    return _active
+
+def disable():
+    """Stops profiling and closes the active profiler
+
+    Returns:
+        None, writes out profile
+    """
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        profiler.close()
+
+def currentTags():
+    """Returns the tags of the enclosing tags() blocks on the calling thread"""
+    return dict(getattr(_context, "tags", {}))
+
+@contextmanager
+def tags(**newTags):
+    """Tags every stage recorded inside the block (nested blocks override outer tags)
+
+    Args:
+        **newTags: Tags to add (e.g. mesh, level, cases)
+    """
+    outer = currentTags()
+    _context.tags = {**outer, **newTags}
+    try:
+        yield
+    finally:
+        _context.tags = outer
+
+def inherit(function):
+    """Wraps a function so it runs with the calling thread's tags (for work handed to other threads)
+
+    Args:
+        function (function): Function to wrap
+
+    Returns:
+        Wrapped function
+    """
+    outer = currentTags()
+
+    def run(*args, **kwargs):
+        with tags(**outer):
+            return function(*args, **kwargs)
+
+    return run
+
+@contextmanager
+def stage(name, total=False, **stageTags):
+    """Measures the block as a pipeline stage (does nothing unless profiling is enabled)
+
+    Args:
+        name (str): Stage name
+        total (bool): True for stages run once per case, summed into one record
+        **stageTags: Tags of this stage only
+    """
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+
+    start = profiler.now()
+    cpu = time.thread_time()
+    read_bytes, write_bytes = threadIO()
+    try:
+        yield
+    finally:
+        wall = profiler.now() - start
+        cpu = time.thread_time() - cpu
+        read_end, write_end = threadIO()
+        if read_bytes is not None and read_end is not None:
+            read_bytes, write_bytes = read_end - read_bytes, write_end - write_bytes
+
+        profiler.record(name, start, wall, cpu, peakRSS(), read_bytes, write_bytes, {**currentTags(), **stageTags}, total)
+
+def iterate(name, iterable, **stageTags):
+    """Measures every step of an iterator as a summed stage (see stage())
+
+    Args:
+        name (str): Stage name
+        iterable (iterable): Items to step through (e.g. a generator parsing one case at a time)
+        **stageTags: Tags of this stage only
+
+    Yields:
+        Items of iterable
+    """
+    iterator = iter(iterable)
+    while True:
+        with stage(name, True, **stageTags):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def recordProcess(name, start, wall, usage, **processTags):
+    """Records a finished subprocess (does nothing unless profiling is enabled)
+
+    Args:
+        name (str): Stage name
+        start (float): perf_counter() when the process started
+        wall (float): Wall time in seconds
+        usage (struct_rusage): Resource usage of the process (from os.wait4)
+        **processTags: Tags of this process only
+    """
+    profiler = _active
+    if profiler is not None and usage is not None:
+        profiler.recordProcess(name, start - profiler.origin, wall, usage, {**currentTags(), **processTags})
@@ -0,0 +1,338 @@
+import os
+import re
+import sys
+import time
+import asyncio
+import itertools
+import threading
+import subprocess
+
+import profiling
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_LOG_DIR = "./AeroquestLogs" # Output of every external process goes under here, one directory per run
+PROGRESS_INTERVAL = 30 # Seconds between progress lines (0 to disable)
+POLL_INTERVAL = 0.1 # Longest wait between checks on a running process
+LOG_TAIL = 20 # Lines of a failed process's log shown in its error
+
+_runner = None # Runner used by runCommand(), see configure()
+_runnerLock = threading.Lock()
+
+
+#############################################
+##                PROGRESS                 ##
+#############################################
+
+class ProcessFailed(RuntimeError):
+    """An external process exited with an error (or timed out) on every attempt"""
+
+
+class Progress:
+    """Case throughput and ETA of every stage run through the ProcessRunner"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def started(self, stage, cases):
+        """Records a process starting on a number of cases
+
+        Args:
+            stage (str): Stage name
+            cases (int): Cases the process works on
+
+        Returns:
+            None
+        """
+        with self._lock:
+            record = self.stages.setdefault(stage, {"total": 0, "done": 0, "running": 0, "failed": 0, "start": time.time()})
+            record["total"] += cases
+            record["running"] += 1
+
+    def finished(self, stage, cases, failed=False):
+        """Records a process finishing
+
+        Args:
+            stage (str): Stage name
+            cases (int): Cases the process worked on
+            failed (bool): True if the process did not succeed (its cases are no longer expected)
+
+        Returns:
+            None
+        """
+        with self._lock:
+            record = self.stages[stage]
+            record["running"] -= 1
+            if failed:
+                record["total"] -= cases
+                record["failed"] += 1
+            else:
+                record["done"] += cases
+
+    def running(self):
+        """Returns True while any process is running"""
+        with self._lock:
+            return any(record["running"] > 0 for record in self.stages.values())
+
+    def report(self):
+        """Describes the progress of every stage
+
+        Returns:
+            One line per stage with cases done, throughput and estimated time left
+        """
+        lines = []
+        now = time.time()
+
+        with self._lock:
+            for stage, record in self.stages.items():
+                elapsed = now - record["start"]
+                rate = record["done"] / elapsed if elapsed > 0 else 0
+                remaining = record["total"] - record["done"]
+
+                eta = f"ETA {formatSeconds(remaining / rate)}" if rate > 0 and remaining > 0 else "ETA --" if remaining > 0 else "done"
+                lines.append(f"{stage}: {record['done']}/{record['total']} cases, {record['running']} running, "
+                             f"{rate * 60:.1f} cases/min, {eta}" + (f", {record['failed']} failed" if record["failed"] else ""))
+
+        return lines
+
+def formatSeconds(seconds):
+    """Formats a duration as h/m/s
+
+    Args:
+        seconds (float): Duration
+
+    Returns:
+        String such as 1h02m03s
+    """
+    seconds = int(round(seconds))
+    hours, minutes = divmod(seconds // 60, 60)
+
+    if hours > 0:
+        return f"{hours}h{minutes:02d}m{seconds % 60:02d}s"
+    return f"{minutes}m{seconds % 60:02d}s" if minutes > 0 else f"{seconds}s"
+
+
+#############################################
+##             PROCESS RUNNER              ##
+#############################################
+
+class ProcessRunner:
+    """Runs external processes on an asyncio event loop
+
+    The loop runs in its own thread, so processes can be started from any thread
+    (levels and shards each wait on their own processes) while one loop supervises
+    all of them. Every process writes its output to a log file of its own, is
+    killed if it runs past its stage's timeout, and is retried on failure. A
+    process that fails every attempt raises ProcessFailed in the thread that
+    started it.
+    """
+
+    def __init__(self, logDir=DEFAULT_LOG_DIR, timeouts=None, retries=0, progressInterval=PROGRESS_INTERVAL):
+        """
+        Args:
+            logDir (str): Directory for process logs, a subdirectory is made for this run
+            timeouts (dict): Stage name -> seconds a process may run ("default" for other stages)
+            retries (int): Extra attempts given to a failed process
+            progressInterval (float): Seconds between progress lines while processes run (0 to disable)
+        """
+        self.logDir = os.path.join(logDir, time.strftime("%Y%m%d-%H%M%S"))
+        self.timeouts = dict(timeouts or {})
+        self.retries = retries
+        self.progressInterval = progressInterval
+        self.progress = Progress()
+        self._ids = itertools.count(1)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ProcessRunner", daemon=True)
+        self._thread.start()
+
+        if progressInterval > 0:
+            asyncio.run_coroutine_threadsafe(self._reportProgress(), self._loop)
+
+    def run(self, args, stage="command", cwd=None, cases=None):
+        """Runs an external program and waits for it
+
+        Args:
+            args (str list): Program and its arguments
+            stage (str): Stage name, picks the timeout and groups progress and profiling
+            cwd (str): Working directory (None for current directory)
+            cases (int): Cases the program works on, None for the "cases" tag of the calling thread (see profiling.tags())
+
+        Returns:
+            Exit code of the program (0, failures raise ProcessFailed)
+        """
+        tags = profiling.currentTags()
+        if cases is None:
+            cases = tags.get("cases", 0)
+
+        future = asyncio.run_coroutine_threadsafe(self.runAsync(args, stage, cwd, cases, tags), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel() # Kills the process if it is still running (e.g. on Ctrl-C)
+            raise
+
+    async def runAsync(self, args, stage="command", cwd=None, cases=0, tags=None):
+        """Runs an external program on the loop, with retries (see run())
+
+        Args:
+            args (str list): Program and its arguments
+            stage (str): Stage name
+            cwd (str): Working directory (None for current directory)
+            cases (int): Cases the program works on
+            tags (dict): Profiling tags of the process
+
+        Returns:
+            Exit code of the program (0, failures raise ProcessFailed)
+        """
+        tags = dict(tags or {})
+        label = re.sub(r"[^\w.-]", "_", os.path.basename(tags.get("mesh", args[0])))
+        timeout = self.timeouts.get(stage, self.timeouts.get("default"))
+        logPath = os.path.join(self.logDir, f"{next(self._ids):04d}-{stage}-{label}.log")
+        os.makedirs(self.logDir, exist_ok=True)
+
+        for attempt in range(self.retries + 1):
+            self.progress.started(stage, cases)
+            start = time.perf_counter()
+            exit_code = None
+            try:
+                exit_code, usage, timed_out = await self._attempt(args, cwd, logPath, timeout)
+            finally:
+                self.progress.finished(stage, cases, failed=exit_code != 0) # Also on a cancel or a process that never started
+            wall = time.perf_counter() - start
+
+            profiling.recordProcess(stage, start, wall, usage, command=os.path.basename(args[0]),
+                                    exit_code=exit_code, attempt=attempt + 1, **tags)
+
+            if exit_code == 0:
+                return 0
+
+            reason = f"timed out after {timeout} s" if timed_out else f"exited with {exit_code}"
+            print(f"{stage} {label} {reason} (attempt {attempt + 1} of {self.retries + 1}), log: {logPath}", file=sys.stderr)
+
+        raise ProcessFailed(f"{stage} {label} {reason} on every attempt ({' '.join(args)})\n"
+                            f"Last lines of {logPath}:\n{logTail(logPath)}")
+
+    async def _attempt(self, args, cwd, logPath, timeout):
+        # Processes are reaped with os.wait4 (polled, so timeouts still apply) to get their own resource usage
+        with open(logPath, 'ab') as log:
+            log.write(f"$ {' '.join(args)}\n".encode())
+            log.flush()
+            process = subprocess.Popen(args, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = None if timeout is None else self._loop.time() + timeout
+
+        try:
+            return await self._waitFor(process, deadline)
+        except asyncio.CancelledError:
+            process.kill() # The thread waiting on this process was interrupted
+            process.wait()
+            raise
+
+    async def _waitFor(self, process, deadline):
+        delay = 0.001
+        timed_out = False
+
+        while True:
+            if hasattr(os, "wait4"):
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+                if pid != 0:
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    return process.returncode, usage, timed_out
+            elif process.poll() is not None:
+                return process.returncode, None, timed_out
+
+            if not timed_out and deadline is not None and self._loop.time() > deadline:
+                process.kill()
+                timed_out = True
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, POLL_INTERVAL)
+
+    async def _cancelAll(self):
+        # Lets pending tasks (progress reports, processes nobody waits on) finish before the loop stops
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _reportProgress(self):
+        while True:
+            await asyncio.sleep(self.progressInterval)
+            if self.progress.running():
+                for line in self.progress.report():
+                    print(f"Progress: {line}", file=sys.stderr)
+
+    def close(self):
+        """Stops the event loop and prints the final progress of every stage
+
+        Returns:
+            None
+        """
+        asyncio.run_coroutine_threadsafe(self._cancelAll(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        for line in self.progress.report():
+            print(f"Processes: {line}")
+
+
+def logTail(logPath, lines=LOG_TAIL):
+    """Returns the last lines of a log file
+
+    Args:
+        logPath (str): Path to log file
+        lines (int): Number of lines
+
+    Returns:
+        Text of the last lines ("" if the log cannot be read)
+    """
+    try:
+        with open(logPath, errors="replace") as file:
+            return "".join(file.readlines()[-lines:])
+    except OSError:
+        return ""
+
+
+#############################################
+##              SHARED RUNNER              ##
+#############################################
+
+def configure(logDir=DEFAULT_LOG_DIR, timeouts=None, retries=0, progressInterval=PROGRESS_INTERVAL):
+    """Replaces the runner used by runCommand() (see ProcessRunner for arguments)
+
+    Returns:
+        ProcessRunner
+    """
+    global _runner
+    with _runnerLock:
+        if _runner is not None:
+            _runner.close()
+        _runner = ProcessRunner(logDir, timeouts, retries, progressInterval)
+        print(f"Process output logged to {_runner.logDir}")
+
+        return _runner
+
+def getRunner():
+    """Returns the runner used by runCommand(), made with default settings on first use"""
+    global _runner
+    with _runnerLock:
+        if _runner is None:
+            _runner = ProcessRunner()
+
+        return _runner
+
+def shutdown():
+    """Closes the runner used by runCommand(), if one was started
+
+    Returns:
+        None
+    """
+    global _runner
+    with _runnerLock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.close()
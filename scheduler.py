@@ -0,0 +1,427 @@
+import os
+import re
+import math
+import heapq
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import profiling
+from runner import getRunner
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+GEOM_EXTENSIONS = [".vspgeom", ".tri", ".csf"] # VSPAero geometry inputs, in lookup order
+SHARD_EXTENSIONS = GEOM_EXTENSIONS + [".cuts"] # Files copied into every shard working directory
+CGROUP_ROOT = "/sys/fs/cgroup" # Mount point of the cgroup hierarchy (CPU quotas limit the cores in use)
+
+
+#############################################
+##            CORE ALLOCATION              ##
+#############################################
+
+def availableCores():
+    """Returns number of cores this process is allowed to run on
+
+    Cores outside the CPU affinity mask and beyond a cgroup CPU quota (container
+    or batch job limits) are not counted.
+
+    Returns:
+        Number of usable cores (int)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    quota = cgroupCores()
+    return max(1, min(cores, quota)) if quota is not None else cores
+
+def cgroupCores():
+    """Reads the CPU quota of this process's cgroup (v2 cpu.max or v1 cfs quota)
+
+    Returns:
+        Quota in cores rounded up, None if there is no quota
+    """
+    paths = {}
+    try:
+        with open("/proc/self/cgroup") as file:
+            for line in file:
+                hierarchy, controllers, path = line.rstrip("\n").split(":", 2)
+                paths["v2" if hierarchy == "0" else controllers] = path
+    except OSError:
+        pass
+
+    v1Dirs = [os.path.join(CGROUP_ROOT, name) for name in ["cpu", "cpu,cpuacct"]]
+    candidates = [(os.path.join(CGROUP_ROOT, paths.get("v2", "/").lstrip("/"), "cpu.max"), None),
+                  (os.path.join(CGROUP_ROOT, "cpu.max"), None)]
+    for controllers, path in paths.items():
+        if "cpu" in controllers.split(","):
+            candidates += [(os.path.join(v1Dir, path.lstrip("/"), "cpu.cfs_quota_us"), "cpu.cfs_period_us") for v1Dir in v1Dirs]
+    candidates += [(os.path.join(v1Dir, "cpu.cfs_quota_us"), "cpu.cfs_period_us") for v1Dir in v1Dirs]
+
+    for quotaPath, periodName in candidates:
+        try:
+            with open(quotaPath) as file:
+                fields = file.read().split()
+            if periodName is not None:
+                with open(os.path.join(os.path.dirname(quotaPath), periodName)) as file:
+                    fields.append(file.read().strip())
+        except OSError:
+            continue
+
+        if fields[0] in ("max", "-1") or len(fields) < 2:
+            return None
+        return math.ceil(int(fields[0]) / int(fields[1]))
+
+    return None
+
+def estimatePanelCount(geomData):
+    """Estimates the number of panels in a geometry
+
+    Reads the triangle count from the header of a .tri file, otherwise falls back
+    to the size of the geometry file (which grows linearly with panel count)
+
+    Args:
+        geomData (str): Path to geometry
+
+    Returns:
+        Panel count (or a value proportional to it), 1 if no geometry file exists
+    """
+    for ext in GEOM_EXTENSIONS:
+        geomFile = f"{geomData}{ext}"
+        if not os.path.isfile(geomFile):
+            continue
+
+        if ext == ".tri":
+            with open(geomFile) as file:
+                header = file.readline().split()
+            if len(header) >= 2 and header[1].isdigit():
+                return int(header[1])
+
+        return max(os.path.getsize(geomFile), 1)
+
+    return 1
+
+def allocateCores(weights, total_cores):
+    """Splits cores across jobs in proportion to their weights
+
+    Every job gets at least one core, cores given to jobs whose share rounds down
+    to zero are taken back from the jobs with the most, and leftover cores go to
+    the jobs with the largest remainders. Cores are split evenly when every weight
+    is zero. Only when there are more jobs than cores does the total exceed
+    total_cores (every job still gets its one core).
+
+    Args:
+        weights (int list): Relative cost of each job (e.g. panel count)
+        total_cores (int): Number of cores to split
+
+    Returns:
+        List containing number of cores for each job
+    """
+    total_weight = sum(weights)
+    if total_weight <= 0:
+        weights, total_weight = [1] * len(weights), len(weights)
+
+    shares = [total_cores * weight / total_weight for weight in weights]
+    cores = [max(1, int(share)) for share in shares]
+
+    for _ in range(sum(cores) - total_cores):
+        largest = max(range(len(cores)), key = lambda i: (cores[i], shares[i]))
+        if cores[largest] == 1:
+            break
+        cores[largest] -= 1
+
+    remainders = sorted(range(len(weights)), key = lambda i: cores[i] - shares[i])
+    for i in remainders[:max(total_cores - sum(cores), 0)]:
+        cores[i] += 1
+
+    return cores
+
+
+#############################################
+##            LEVEL SCHEDULING             ##
+#############################################
+
+def runCommand(args, cwd=None, stage=None):
+    """Runs an external program and waits for it
+
+    The program runs on the shared ProcessRunner (see runner.py): its output goes
+    to a log file, it is killed past its stage's timeout and retried on failure.
+
+    Args:
+        args (str list): Program and its arguments
+        cwd (str): Working directory (None for current directory)
+        stage (str): Stage name (solver, slicer, post), picks the timeout and groups progress and profiling
+
+    Returns:
+        Exit code of the program (0, a program that fails every attempt raises ProcessFailed)
+    """
+    return getRunner().run(args, stage or "command", cwd)
+
+def scheduleLevels(meshPathArr, solveLevel, finishLevel, total_cores=None, costs=None):
+    """Runs every mesh level at the same time
+
+    Cores are split across levels in proportion to their cost (panel count unless given), and levels
+    are started longest first. Each level is finished (sliced, parsed, written) as soon as its own
+    solve completes, so coarse levels finish while the fine level is still running.
+
+    Args:
+        meshPathArr (str list): List of strings containing paths to geometry files
+        solveLevel (function): Called as solveLevel(level, meshPath, threads), runs the solver
+        finishLevel (function): Called as finishLevel(level, meshPath) after solveLevel returns
+        total_cores (int): Cores to split across levels (defaults to all available)
+        costs (float list): Estimated solver work of each level (defaults to panel count)
+
+    Returns:
+        List containing finishLevel's return value for each level
+    """
+    if total_cores is None:
+        total_cores = availableCores()
+
+    panels = [estimatePanelCount(meshPath) for meshPath in meshPathArr]
+    threads = allocateCores(costs or panels, total_cores)
+
+    for meshPath, panel, thread in zip(meshPathArr, panels, threads):
+        print(f"Scheduling {meshPath}: {panel} panels, {thread} threads")
+
+    def runLevel(level):
+        solveLevel(level, meshPathArr[level], threads[level])
+        return finishLevel(level, meshPathArr[level])
+
+    results = [None] * len(meshPathArr)
+
+    order = sorted(range(len(meshPathArr)), key = lambda level: -(costs or panels)[level])
+
+    with ThreadPoolExecutor(max_workers=len(meshPathArr)) as pool:
+        futures = {pool.submit(runLevel, level): level for level in order}
+
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            print("Finished Mesh: ", meshPathArr[futures[future]])
+
+    return results
+
+
+#############################################
+##             CASE SHARDING               ##
+#############################################
+
+def splitCases(num_cases, num_shards):
+    """Splits case indices into contiguous shards of near equal size
+
+    Args:
+        num_cases (int): Number of cases in a mesh level
+        num_shards (int): Number of shards
+
+    Returns:
+        2D list containing original case indices for each shard (empty shards dropped)
+    """
+    num_shards = max(1, min(num_shards, num_cases))
+    shard_len, extra = divmod(num_cases, num_shards)
+
+    shards = []
+    start = 0
+    for shard_i in range(num_shards):
+        end = start + shard_len + (1 if shard_i < extra else 0)
+        shards.append(list(range(start, end)))
+        start = end
+
+    return shards
+
+def binCases(costs, num_shards):
+    """Splits case indices into shards of near equal predicted cost, longest case first
+
+    Each case, from the most to the least expensive, goes to the shard with the
+    least work so far (ties go to the lower shard).
+
+    Args:
+        costs (float list): Predicted cost of every case
+        num_shards (int): Number of shards
+
+    Returns:
+        2D list containing sorted original case indices for each shard (empty shards dropped)
+    """
+    num_shards = max(1, min(num_shards, len(costs)))
+    loads = [(0.0, shard_i) for shard_i in range(num_shards)]
+    shards = [[] for shard_i in range(num_shards)]
+
+    for case_i in sorted(range(len(costs)), key = lambda case_i: -costs[case_i]):
+        load, shard_i = heapq.heappop(loads)
+        shards[shard_i].append(case_i)
+        heapq.heappush(loads, (load + costs[case_i], shard_i))
+
+    return [sorted(shard) for shard in shards if shard]
+
+def copyGeometry(geomData, shardDir):
+    """Copies geometry input files into a shard working directory
+
+    Args:
+        geomData (str): Path to geometry
+        shardDir (str): Path to shard working directory
+
+    Returns:
+        Path to geometry copy inside shardDir
+    """
+    os.makedirs(shardDir, exist_ok=True)
+    shardGeom = os.path.join(shardDir, os.path.basename(geomData))
+
+    for ext in SHARD_EXTENSIONS:
+        if os.path.isfile(f"{geomData}{ext}"):
+            shutil.copyfile(f"{geomData}{ext}", f"{shardGeom}{ext}")
+
+    return shardGeom
+
+def linkGeometry(geomData, linkGeom):
+    """Gives the geometry input files a second name, next to them
+
+    Files are hard linked, so no mesh is copied (they are copied on file systems
+    without hard links). Links left by an earlier run are replaced.
+
+    Args:
+        geomData (str): Path to geometry
+        linkGeom (str): Path to the second name, in the same directory as geomData
+
+    Returns:
+        linkGeom
+    """
+    for ext in SHARD_EXTENSIONS:
+        if os.path.isfile(f"{geomData}{ext}"):
+            if os.path.lexists(f"{linkGeom}{ext}"):
+                os.remove(f"{linkGeom}{ext}")
+            try:
+                os.link(f"{geomData}{ext}", f"{linkGeom}{ext}")
+            except OSError:
+                shutil.copyfile(f"{geomData}{ext}", f"{linkGeom}{ext}")
+
+    return linkGeom
+
+def mergePolarFiles(shardGeoms, shardIndices, geomData):
+    """Merges shard .polar files back into original case order
+
+    Args:
+        shardGeoms (str list): Paths to shard geometries
+        shardIndices (2D int list): Original case indices for each shard
+        geomData (str): Path to geometry, merged file is written to geomData.polar
+
+    Returns:
+        None, writes out merged .polar file
+    """
+    header = None
+    rows = [None] * sum(len(indices) for indices in shardIndices)
+
+    for shardGeom, indices in zip(shardGeoms, shardIndices):
+        with open(f"{shardGeom}.polar") as file:
+            lines = [line.rstrip() for line in file]
+
+        header = lines[0]
+        for case_i, line in zip(indices, lines[1:]):
+            rows[case_i] = line
+
+    with open(f"{geomData}.polar", 'w') as file:
+        file.write(header + "\n")
+        for row in rows:
+            file.write(row + "\n")
+
+def readSliceBlocks(filePath):
+    """Splits a .slc file into the text of each case
+
+    Args:
+        filePath (str): Path to .slc file
+
+    Returns:
+        List containing lines for each case, in file order
+    """
+    with open(filePath) as file:
+        lines = file.readlines()
+
+    blocks = []
+    case_num = None
+
+    for i, line in enumerate(lines):
+        if line[0] == 'B' and i + 1 < len(lines):
+            block_case = int(lines[i + 1].split()[1])
+            if block_case != case_num:
+                blocks.append([])
+                case_num = block_case
+
+        if case_num is not None:
+            blocks[-1].append(line)
+
+    return blocks
+
+def mergeSliceFiles(shardGeoms, shardIndices, geomData):
+    """Merges shard .slc files back into original case order
+
+    Case numbers are rewritten so that they count up from 1 in original order,
+    the same as a single unsharded slicer run.
+
+    Args:
+        shardGeoms (str list): Paths to shard geometries
+        shardIndices (2D int list): Original case indices for each shard
+        geomData (str): Path to geometry, merged file is written to geomData.slc
+
+    Returns:
+        None, writes out merged .slc file
+    """
+    blocks = [None] * sum(len(indices) for indices in shardIndices)
+
+    for shardGeom, indices in zip(shardGeoms, shardIndices):
+        for case_i, block in zip(indices, readSliceBlocks(f"{shardGeom}.slc")):
+            blocks[case_i] = block
+
+    with open(f"{geomData}.slc", 'w') as file:
+        for case_i, block in enumerate(blocks):
+            for line in block:
+                file.write(re.sub(r"^Case: \d+", f"Case: {case_i + 1}", line))
+
+def runShards(geomData, vspCases, num_shards, runShard, threads, slice=False, executor=None, costs=None):
+    """Splits the cases of one mesh level into shards and solves them separately
+
+    Every shard gets its own copy of the geometry and .vspaero file under
+    <geometry dir>/shards, and is run through runShard on the executor. Outputs
+    are merged back into geomData.polar (and geomData.slc) in original case order.
+
+    Args:
+        geomData (str): Path to geometry
+        vspCases (dictionary list): List containing cases from a single mesh
+        num_shards (int): Number of shards
+        runShard (function): Called as runShard(shardCases, shardGeom, threads), solves a shard
+        threads (int): Total cores available to this mesh level
+        slice (bool): True to also merge slicer output
+        executor (Executor): concurrent.futures executor to run shards on (defaults to a thread pool)
+        costs (float list): Predicted cost of every case to balance shards by (see binCases()), None to
+            split cases into contiguous shards of equal size
+
+    Returns:
+        None, writes out merged solver output
+    """
+    if costs is None:
+        shardIndices = splitCases(len(vspCases), num_shards)
+        shardCosts = [len(indices) for indices in shardIndices]
+    else:
+        shardIndices = binCases(costs, num_shards)
+        shardCosts = [sum(costs[case_i] for case_i in indices) for indices in shardIndices]
+    shardThreads = allocateCores(shardCosts, threads)
+    baseName = os.path.basename(geomData)
+    shardGeoms = [copyGeometry(geomData, os.path.join(os.path.dirname(geomData), "shards", f"{baseName}_{shard_i}"))
+                  for shard_i in range(len(shardIndices))]
+
+    ownExecutor = executor is None
+    if ownExecutor:
+        executor = ThreadPoolExecutor(max_workers=len(shardIndices))
+
+    runShard = profiling.inherit(runShard) # Shard stages keep this level's tags
+    try:
+        futures = [executor.submit(runShard, [vspCases[case_i] for case_i in indices], shardGeom, shardThread)
+                   for indices, shardGeom, shardThread in zip(shardIndices, shardGeoms, shardThreads)]
+        for future in futures:
+            future.result()
+    finally:
+        if ownExecutor:
+            executor.shutdown()
+
+    mergePolarFiles(shardGeoms, shardIndices, geomData)
+    if slice:
+        mergeSliceFiles(shardGeoms, shardIndices, geomData)
@@ -0,0 +1,167 @@
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+SLICE_COLUMNS = ["arclen", "x", "y", "z", "dCp"] # Point fields in Quest-post row order
+SLICE_LEAF = '"leaf": {"abscissa_names": ["arclen", "x", "y", "z"], "ordinate_names": ["dCp"], "ordinate_types": [0], "data": ['
+SLICE_ROW = "[{}, [{}, {}, {}, {}], [{}]]" # One point, str() of a float is its repr, same as json.dumps
+DEFAULT_SERIALIZER = "stream" # Backend used when none is given, writes the same bytes as json.dumps()
+
+
+#############################################
+##              SLICE PAYLOADS             ##
+#############################################
+
+def sliceCaseTree(sliceCase, label="VSPAero"):
+    """Builds Quest-post JSON data for the slices of a single case
+
+    Same data as sliceJsonDict(sliceCase.toLegacy()), built straight from the
+    slice columns without the per-point dictionaries.
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+        label (str): Label of the case
+
+    Returns:
+        Dictionary containing a child for every slice
+    """
+    columns = [sliceCase.points[name].tolist() for name in SLICE_COLUMNS]
+    children = []
+
+    for start, end in zip(sliceCase.offsets[:-1].tolist(), sliceCase.offsets[1:].tolist()):
+        arclen, x, y, z, dCp = (column[start:end] for column in columns)
+        children.append({"label": f"cut y:{y[0]}",
+                         "leaf": {
+                            "abscissa_names": ["arclen", "x", "y", "z"],
+                            "ordinate_names": ["dCp"],
+                            "ordinate_types": [0],
+                            "data": [[k, [point[0], point[1], point[2], point[3]], [point[4]]]
+                                     for k, point in enumerate(zip(arclen, x, y, z, dCp))]
+                         }
+                        })
+
+    return {"label": label, "children": children}
+
+def sliceCaseChunks(sliceCase, label="VSPAero"):
+    """Streams the JSON text of a single case one slice at a time
+
+    Rows are formatted straight from the slice column buffers, no nested lists
+    are built. The text is byte for byte what json.dumps(sliceCaseTree(sliceCase))
+    writes, as long as every value is finite.
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+        label (str): Label of the case
+
+    Yields:
+        Pieces of JSON text, in order
+    """
+    yield '{"label": ' + json.dumps(label) + ', "children": ['
+
+    for slice_i in range(len(sliceCase)):
+        points = sliceCase.slice(slice_i)
+        columns = [memoryview(np.ascontiguousarray(points[name])) for name in SLICE_COLUMNS]
+
+        yield (", " if slice_i > 0 else "") + '{"label": ' + json.dumps(f"cut y:{columns[2][0]}") + ", " + SLICE_LEAF
+        yield ", ".join(map(SLICE_ROW.format, range(len(points)), *columns))
+        yield "]}}"
+
+    yield "]}"
+
+
+#############################################
+##            SERIALIZER BACKENDS          ##
+#############################################
+
+def encodeStdlib(data):
+    """Encodes data with the standard library json module
+
+    Args:
+        data: JSON serializable data
+
+    Returns:
+        UTF-8 bytes, same text json.dumps() writes
+    """
+    return json.dumps(data).encode()
+
+def encodeOrjson(data):
+    """Encodes data with orjson
+
+    Args:
+        data: JSON serializable data (NumPy arrays allowed)
+
+    Returns:
+        UTF-8 bytes, compact JSON text (NaN and Infinity are written as null)
+    """
+    return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+
+def encodeSliceStdlib(sliceCase):
+    """Encodes the slices of a single case with the standard library json module
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+
+    Returns:
+        UTF-8 bytes
+    """
+    return encodeStdlib(sliceCaseTree(sliceCase))
+
+def encodeSliceStream(sliceCase):
+    """Encodes the slices of a single case with sliceCaseChunks()
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+
+    Returns:
+        UTF-8 bytes, identical to encodeSliceStdlib()
+    """
+    if not all(np.isfinite(sliceCase.points[name]).all() for name in SLICE_COLUMNS):
+        return encodeSliceStdlib(sliceCase) # json.dumps spells out NaN and Infinity, str() does not
+
+    return "".join(sliceCaseChunks(sliceCase)).encode()
+
+def encodeSliceOrjson(sliceCase):
+    """Encodes the slices of a single case with orjson
+
+    Args:
+        sliceCase (SliceCase): Slice data of a single case
+
+    Returns:
+        UTF-8 bytes, compact JSON text (NaN and Infinity are written as null)
+    """
+    return encodeOrjson(sliceCaseTree(sliceCase))
+
+SERIALIZERS = {"json": {"data": encodeStdlib, "slice": encodeSliceStdlib},
+               "stream": {"data": encodeStdlib, "slice": encodeSliceStream},
+               "orjson": {"data": encodeOrjson, "slice": encodeSliceOrjson}} # Backend name -> encoders
+
+def getSerializer(backend=None):
+    """Looks up the encoders of a serializer backend
+
+    Args:
+        backend (str): "json" (stdlib), "stream" (stdlib compatible slice encoder) or
+            "orjson" (compact output, needs orjson), None for DEFAULT_SERIALIZER
+
+    Returns:
+        Dictionary containing "data" (any JSON serializable data) and "slice" (SliceCase)
+        encoders, each returning UTF-8 bytes
+    """
+    if backend is None:
+        backend = DEFAULT_SERIALIZER
+
+    if backend not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer {backend}, expected one of {', '.join(SERIALIZERS)}")
+
+    if backend == "orjson" and orjson is None:
+        raise ValueError("Serializer orjson needs the orjson package (pip install orjson)")
+
+    return SERIALIZERS[backend]
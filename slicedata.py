@@ -0,0 +1,411 @@
+import numpy as np
+
+from fastparse import iterSliceCasesMapped
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+POINT_DTYPE = np.dtype([('x', np.float64), ('y', np.float64), ('z', np.float64),
+                        ('dCp', np.float64), ('arclen', np.float64)]) # One slice point
+
+
+#############################################
+##            SLICE CASE ARRAYS            ##
+#############################################
+
+class SliceCase:
+    """Slice points of a single case
+
+    All slices are stored back to back in one structured array (see POINT_DTYPE),
+    slice i is points[offsets[i]:offsets[i + 1]].
+    """
+
+    __slots__ = ('points', 'offsets')
+
+    def __init__(self, points, offsets):
+        """
+        Args:
+            points (ndarray): Structured array of slice points
+            offsets (int ndarray): Start index of every slice, followed by the total point count
+        """
+        self.points = points
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def slice(self, slice_i):
+        """Returns points of a single slice
+
+        Args:
+            slice_i (int): Slice index
+
+        Returns:
+            Structured array view of slice points
+        """
+        return self.points[self.offsets[slice_i]:self.offsets[slice_i + 1]]
+
+    def toLegacy(self):
+        """Converts to the dictionary format of parseSliceData()
+
+        Returns:
+            2D list containing a dictionary (x, y, z, dCp, arclen) for every point of every slice
+        """
+        names = POINT_DTYPE.names
+        columns = [self.points[name].tolist() for name in names]
+        rows = [dict(zip(names, values)) for values in zip(*columns)]
+
+        return [rows[start:end] for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist())]
+
+    def toDict(self):
+        """Converts to a JSON serializable dictionary of columns
+
+        Returns:
+            Dictionary containing a list for every point field and the slice offsets
+        """
+        columns = {name: self.points[name].tolist() for name in POINT_DTYPE.names}
+        columns['offsets'] = self.offsets.tolist()
+
+        return columns
+
+    @staticmethod
+    def fromDict(columns):
+        """Builds a SliceCase from the output of toDict()
+
+        Args:
+            columns (dict): Dictionary containing a list for every point field and the slice offsets
+
+        Returns:
+            SliceCase
+        """
+        points = np.empty(len(columns['x']), dtype=POINT_DTYPE)
+        for name in POINT_DTYPE.names:
+            points[name] = columns[name]
+
+        return SliceCase(points, np.array(columns['offsets'], dtype=np.int64))
+
+
+#############################################
+##               PARSE SLICES              ##
+#############################################
+
+def iterSliceCases(filePath):
+    """Streams raw slice points from .slc file one case at a time
+
+    Only the lines of the current case are held in memory. A case ends at the
+    first BLOCK header that belongs to a different case number. The first point
+    after each BLOCK header is skipped. Reads line by line, streamSliceArrays()
+    uses the memory mapped fastparse.iterSliceCasesMapped() instead.
+
+    Args:
+        filePath (str): Path to .slc file
+
+    Yields:
+        Tuple containing case number and an (N, 4) array of x, y, z, dCp values, in file order
+    """
+    case_num = None
+    case_lines = []
+
+    with open(filePath) as file:
+        for line in file:
+            line = line.rstrip()
+
+            if len(line) == 0:
+                continue
+
+            if line[0] == 'B':
+                block_case = int(next(file).split()[1])
+                next(file, "") # Column header
+                next(file, "") # First point of every block is skipped, as parseSliceData() always has
+
+                if block_case != case_num:
+                    if case_num is not None:
+                        yield case_num, toPointArray(case_lines)
+                    case_num = block_case
+                    case_lines = []
+            else:
+                case_lines.append(line)
+
+    if case_num is not None:
+        yield case_num, toPointArray(case_lines)
+
+def toPointArray(lines):
+    """Converts .slc point lines into an array
+
+    Args:
+        lines (str list): Lines containing x, y, z, dCp values
+
+    Returns:
+        (N, 4) array of x, y, z, dCp values
+    """
+    return np.array(" ".join(lines).split(), dtype=np.float64).reshape(-1, 4)
+
+def buildSliceCase(raw_points):
+    """Splits raw points into slices, sorts them by edge and computes arc length
+
+    Args:
+        raw_points (ndarray): (N, 4) array of x, y, z, dCp values in .slc file order
+
+    Returns:
+        SliceCase
+    """
+    num_points = len(raw_points)
+    x, y, z = raw_points[:, 0], raw_points[:, 1], raw_points[:, 2]
+
+    # A new slice starts wherever y changes
+    offsets = np.concatenate(([0], np.flatnonzero(y[1:] != y[:-1]) + 1, [num_points]))
+    slice_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    order = edgeSortOrder(x, z, slice_ids)
+
+    points = np.empty(num_points, dtype=POINT_DTYPE)
+    for column, name in enumerate(['x', 'y', 'z', 'dCp']):
+        points[name] = raw_points[order, column]
+
+    points['arclen'] = arcLength(points['x'], offsets)
+
+    return SliceCase(points, offsets)
+
+def streamSliceArrays(filePath):
+    """Parses slicer output from .slc file into arrays, one case at a time
+
+    Args:
+        filePath (str): Path to .slc file
+
+    Yields:
+        SliceCase for each case, in file order
+    """
+    for case_num, raw_points in iterSliceCasesMapped(filePath):
+        yield buildSliceCase(raw_points)
+
+def parseSliceArrays(filePath):
+    """Parses slicer output from .slc file into arrays
+
+    Args:
+        filePath (str): Path to .slc file
+
+    Returns:
+        List containing a SliceCase for each case
+    """
+    return list(streamSliceArrays(filePath))
+
+
+#############################################
+##          EDGE SORT / ARC LENGTH         ##
+#############################################
+
+def edgeSortOrder(x, z, slice_ids):
+    """Vectorized edgeSort() over every slice of a case
+
+    Within each slice, upper edge points (z >= 0) come first by increasing x,
+    followed by lower edge points (z < 0) by decreasing x. Ties keep file order.
+
+    Args:
+        x (ndarray): x values
+        z (ndarray): z values
+        slice_ids (int ndarray): Slice index of every point
+
+    Returns:
+        Index array that sorts the points
+    """
+    lower = z < 0
+    return np.lexsort((np.where(lower, -x, x), lower, slice_ids))
+
+def arcLength(x, offsets):
+    """Vectorized normalized arc length (cumulative |dx|) of every slice
+
+    Slices are laid out as rows of a zero padded matrix so the cumulative sum
+    runs in the same order as the point by point loop and gives identical values.
+
+    Args:
+        x (ndarray): x values of edge sorted points
+        offsets (int ndarray): Slice offsets
+
+    Returns:
+        Array containing arc length of every point, from 0 to 1 within each slice
+    """
+    lengths = np.diff(offsets)
+    if len(lengths) == 0:
+        return np.zeros(0)
+
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    cols = np.arange(len(x)) - offsets[rows]
+
+    steps = np.zeros((len(lengths), lengths.max()))
+    steps[rows[cols > 0], cols[cols > 0]] = np.abs(np.diff(x))[(cols > 0)[1:]]
+
+    curr_len = np.cumsum(steps, axis=1)
+    total_len = curr_len[np.arange(len(lengths)), lengths - 1]
+
+    arclen = curr_len[rows, cols]
+    return np.divide(arclen, total_len[rows], out=np.zeros_like(arclen), where=total_len[rows] != 0)
+
+
+#############################################
+##        CROSS-MESH INTERPOLATION         ##
+#############################################
+
+def pchipInterp(xq, xp, fp):
+    """Monotone piecewise cubic (Fritsch-Carlson) interpolation
+
+    Args:
+        xq (ndarray): Points to evaluate at
+        xp (ndarray): Increasing sample points
+        fp (ndarray): Sample values, last axis matches xp (leading axes are batched)
+
+    Returns:
+        Interpolated values with shape fp.shape[:-1] + xq.shape, clamped to the end values outside xp
+    """
+    if len(xp) < 3:
+        return linearInterp(xq, xp, fp)
+
+    h = np.diff(xp)
+    delta = np.diff(fp, axis=-1) / h
+
+    # Interior slopes: weighted harmonic mean of neighbouring secants, 0 at extrema
+    w1 = 2 * h[1:] + h[:-1]
+    w2 = h[1:] + 2 * h[:-1]
+    same_sign = delta[..., :-1] * delta[..., 1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interior = (w1 + w2) / (w1 / delta[..., :-1] + w2 / delta[..., 1:])
+    interior = np.where(same_sign, interior, 0.0)
+
+    # End slopes: one sided three point estimate, kept shape preserving
+    def endSlope(h0, h1, d0, d1):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        slope = np.where(np.sign(slope) != np.sign(d0), 0.0, slope)
+        return np.where((np.sign(d0) != np.sign(d1)) & (np.abs(slope) > np.abs(3 * d0)), 3 * d0, slope)
+
+    start = endSlope(h[0], h[1], delta[..., 0], delta[..., 1])
+    end = endSlope(h[-1], h[-2], delta[..., -1], delta[..., -2])
+    slopes = np.concatenate((start[..., None], interior, end[..., None]), axis=-1)
+
+    xq = np.clip(xq, xp[0], xp[-1])
+    k = np.clip(np.searchsorted(xp, xq, side='right') - 1, 0, len(xp) - 2)
+    t = (xq - xp[k]) / h[k]
+
+    h00 = (1 + 2 * t) * (1 - t) ** 2
+    h10 = t * (1 - t) ** 2
+    h01 = t ** 2 * (3 - 2 * t)
+    h11 = t ** 2 * (t - 1)
+
+    return (h00 * fp[..., k] + h10 * h[k] * slopes[..., k]
+            + h01 * fp[..., k + 1] + h11 * h[k] * slopes[..., k + 1])
+
+def linearInterp(xq, xp, fp):
+    """Piecewise linear interpolation, batched over leading axes of fp
+
+    Args:
+        xq (ndarray): Points to evaluate at
+        xp (ndarray): Increasing sample points
+        fp (ndarray): Sample values, last axis matches xp
+
+    Returns:
+        Interpolated values with shape fp.shape[:-1] + xq.shape, clamped to the end values outside xp
+    """
+    if len(xp) == 1:
+        return np.repeat(fp[..., :1], len(xq), axis=-1)
+
+    k = np.clip(np.searchsorted(xp, xq, side='right') - 1, 0, len(xp) - 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip((xq - xp[k]) / (xp[k + 1] - xp[k]), 0.0, 1.0)
+    t = np.nan_to_num(t)
+
+    return fp[..., k] * (1 - t) + fp[..., k + 1] * t
+
+INTERP_MODES = {"linear": linearInterp, "cubic": pchipInterp} # Interpolation modes for z and dCp
+
+def surfaceSamples(x, z, upper):
+    """Picks one surface of a slice and orders it by increasing x
+
+    Duplicate x values are dropped (first one kept) so sample points are strictly increasing.
+
+    Args:
+        x (ndarray): x values of edge sorted slice, leading axes are cases
+        z (ndarray): z values of edge sorted slice
+        upper (bool): True for upper surface (z >= 0), False for lower surface (z < 0)
+
+    Returns:
+        Tuple containing index array into the slice and the matching increasing x values
+        (the whole slice is used if the surface has no points)
+    """
+    on_surface = np.flatnonzero(z >= 0 if upper else z < 0)
+    if len(on_surface) == 0:
+        on_surface = np.arange(len(x))
+
+    xs, first = np.unique(x[on_surface], return_index=True)
+    return on_surface[first], xs
+
+def interpolateLevel(sliceCases, reference, mode="linear"):
+    """Interpolates every case of a mesh onto the stations of the finest mesh
+
+    Each coarse slice is split into its upper and lower surface, and z and dCp
+    are interpolated in x onto the reference stations of the same surface. The
+    reference x and arc length are copied over. Cases that share the same slice
+    geometry (the usual case for a single mesh) are interpolated in one batch,
+    so surface samples are picked once per geometry instead of once per case.
+
+    Args:
+        sliceCases (SliceCase list): Cases from a single mesh
+        reference (SliceCase): Case from the finest mesh whose points are the target stations
+        mode (str): "linear" or "cubic" (monotone piecewise cubic)
+
+    Returns:
+        List containing an interpolated SliceCase for each case
+    """
+    interp = INTERP_MODES[mode]
+
+    if len(sliceCases) == 0:
+        return []
+
+    for sliceCase in sliceCases:
+        if len(sliceCase) != len(reference):
+            raise ValueError(f"Slice count mismatch: mesh has {len(sliceCase)} slices, finest mesh has {len(reference)}")
+
+    groups = {} # Slice geometry -> cases that share it
+    for case_i, sliceCase in enumerate(sliceCases):
+        key = (sliceCase.offsets.tobytes(), sliceCase.points['x'].tobytes(), sliceCase.points['z'].tobytes())
+        groups.setdefault(key, []).append(case_i)
+
+    out_points = np.empty((len(sliceCases), len(reference.points)), dtype=POINT_DTYPE)
+    out_points['x'] = reference.points['x']
+    out_points['arclen'] = reference.points['arclen']
+
+    for group in groups.values():
+        template = sliceCases[group[0]]
+
+        for slice_i in range(len(reference)):
+            start, end = reference.offsets[slice_i], reference.offsets[slice_i + 1]
+            stations = reference.slice(slice_i)
+            coarse = template.slice(slice_i)
+            values = np.stack([np.stack([sliceCases[case_i].slice(slice_i)['z'] for case_i in group]),
+                               np.stack([sliceCases[case_i].slice(slice_i)['dCp'] for case_i in group])])
+
+            out_points['y'][group, start:end] = coarse['y'][0]
+
+            for upper in (True, False):
+                targets = np.flatnonzero(stations['z'] >= 0 if upper else stations['z'] < 0)
+                if len(targets) == 0:
+                    continue
+
+                samples, xs = surfaceSamples(coarse['x'], coarse['z'], upper)
+                result = interp(stations['x'][targets], xs, values[..., samples])
+
+                out_points['z'][np.ix_(group, start + targets)] = result[0]
+                out_points['dCp'][np.ix_(group, start + targets)] = result[1]
+
+    return [SliceCase(out_points[case_i], reference.offsets.copy()) for case_i in range(len(sliceCases))]
+
+def interpolateCase(sliceCase, reference, mode="linear"):
+    """Interpolates a single case onto the stations of the finest mesh (see interpolateLevel())
+
+    Args:
+        sliceCase (SliceCase): Case to interpolate
+        reference (SliceCase): Case from the finest mesh whose points are the target stations
+        mode (str): "linear" or "cubic" (monotone piecewise cubic)
+
+    Returns:
+        Interpolated SliceCase
+    """
+    return interpolateLevel([sliceCase], reference, mode)[0]
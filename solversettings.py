@@ -0,0 +1,218 @@
+import os
+import json
+import threading
+
+import numpy as np
+
+from planner import sweepPoints
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+CALIBRATION_CASES = 8 # Cases of a level solved at every candidate setting by a calibration
+DEFAULT_CALIBRATION_PATH = "./aeroquest.calibration.json" # Settings picked by calibration for every mesh
+
+_store = None # Store used by the solver functions, see configure()
+_storeLock = threading.Lock()
+
+
+#############################################
+##             LEVEL SETTINGS              ##
+#############################################
+
+def levelSettings(profile, level):
+    """Looks up the solver settings of a grid level
+
+    Args:
+        profile (dict list): Solver parameters of each grid level, finest first
+        level (int): Grid level, 0 for the finest
+
+    Returns:
+        Dictionary of solver parameters, levels past the end of profile use its last entry
+    """
+    if not profile:
+        return {}
+
+    return dict(profile[min(level, len(profile) - 1)])
+
+def resolveProfile(profile, profiles, paramNames):
+    """Looks up the solver settings of every grid level
+
+    Args:
+        profile (str or dict list): Name of one of profiles, path to a json file listing the solver
+            parameters of each grid level, or that list (finest first)
+        profiles (dict): Profile name -> solver parameters of each grid level, finest first
+        paramNames (str list): Parameters written to the .vspaero file
+
+    Returns:
+        List of dictionaries of solver parameters (values as strings), raises ValueError on an
+        unknown profile or parameter
+    """
+    if isinstance(profile, str):
+        if profile in profiles:
+            profile = profiles[profile]
+        elif os.path.isfile(profile):
+            with open(profile) as file:
+                profile = json.load(file)
+        else:
+            raise ValueError(f"Unknown solver profile {profile}, expected one of {', '.join(profiles)} or a json file")
+
+    for settings in profile:
+        checkSettings(settings, paramNames)
+
+    return [{param: str(value) for param, value in settings.items()} for settings in profile]
+
+def checkSettings(settings, paramNames):
+    """Checks that solver settings only set known solver parameters
+
+    Args:
+        settings (dict): Solver parameters
+        paramNames (str list): Parameters written to the .vspaero file
+
+    Returns:
+        None, raises ValueError on an unknown parameter
+    """
+    unknown = set(settings) - set(paramNames)
+    if unknown:
+        raise ValueError(f"Unknown solver parameter(s) {', '.join(sorted(unknown))}")
+
+
+#############################################
+##               CALIBRATION               ##
+#############################################
+
+def sampleCases(params, count=CALIBRATION_CASES):
+    """Picks cases spread over the flight conditions of a level
+
+    The first case is the one nearest the lowest corner, each next one is the
+    case farthest from those already picked (see planner.sweepPoints()).
+
+    Args:
+        params (dict list): Resolved solver parameters of every case
+        count (int): Number of cases to pick
+
+    Returns:
+        Sorted list of case indices
+    """
+    points = sweepPoints(params)
+    if len(points) <= count:
+        return list(range(len(points)))
+
+    picked = [int(np.argmin(points.sum(axis=1)))]
+    distance = np.sqrt(((points - points[picked[0]]) ** 2).sum(axis=1))
+
+    while len(picked) < count:
+        picked.append(int(np.argmax(distance)))
+        distance = np.minimum(distance, np.sqrt(((points - points[picked[-1]]) ** 2).sum(axis=1)))
+
+    return sorted(picked)
+
+def coefficientChange(reference, trial):
+    """Measures how far coefficients move from a reference solve
+
+    Args:
+        reference (dict list): Parsed coefficients of every sample case at the reference settings
+        trial (dict list): Same cases at the settings being tried
+
+    Returns:
+        Largest change of any coefficient, relative to its range over the reference cases
+        (its largest magnitude when it does not vary, 1 when it is zero everywhere)
+    """
+    names = list(reference[0].keys())
+    ref = np.array([[float(data[name]) for name in names] for data in reference])
+    new = np.array([[float(data[name]) for name in names] for data in trial])
+
+    scales = np.ptp(ref, axis=0)
+    scales = np.where(scales > 0, scales, np.abs(ref).max(axis=0))
+    scales = np.where(scales > 0, scales, 1)
+
+    return float((np.abs(new - ref) / scales).max())
+
+def pickSettings(trials, threshold):
+    """Picks the cheapest settings whose coefficients stay within threshold of the reference
+
+    Args:
+        trials (dict list): One entry per candidate with its "settings", solve "seconds" and coefficient "change"
+        threshold (float): Largest accepted change (see coefficientChange())
+
+    Returns:
+        Settings of the cheapest accepted candidate, None if no candidate is accepted
+    """
+    accepted = [trial for trial in trials if trial["change"] <= threshold]
+    if not accepted:
+        return None
+
+    return min(accepted, key = lambda trial: trial["seconds"])["settings"]
+
+class CalibrationStore:
+    """Settings picked by calibration, kept across runs so a mesh is calibrated once
+
+    Entries are keyed by mesh and by everything the calibration depended on
+    (reference settings, candidates, threshold and sample cases).
+    """
+
+    def __init__(self, storePath=DEFAULT_CALIBRATION_PATH):
+        """
+        Args:
+            storePath (str): Path to store file (None to keep it in memory only)
+        """
+        self.storePath = storePath
+        self.entries = {}
+        self._lock = threading.Lock()
+
+        if storePath is not None and os.path.isfile(storePath):
+            with open(storePath) as file:
+                self.entries = json.load(file)
+
+    def get(self, key):
+        """Returns the calibration recorded under key, None if there is none"""
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, entry):
+        """Records a calibration
+
+        Args:
+            key (str): Calibration key
+            entry (dict): Picked settings and the trials they were picked from
+
+        Returns:
+            None, writes out store
+        """
+        with self._lock:
+            self.entries[key] = entry
+
+            if self.storePath is not None:
+                tmpPath = f"{self.storePath}.tmp"
+                with open(tmpPath, 'w') as file:
+                    json.dump(self.entries, file, indent=1)
+                os.replace(tmpPath, self.storePath)
+
+
+#############################################
+##               SHARED STORE              ##
+#############################################
+
+def configure(storePath=DEFAULT_CALIBRATION_PATH):
+    """Replaces the calibration store used by the solver functions
+
+    Args:
+        storePath (str): Path to store file (None to keep it in memory only)
+
+    Returns:
+        CalibrationStore
+    """
+    global _store
+    with _storeLock:
+        _store = CalibrationStore(storePath)
+        return _store
+
+def getStore():
+    """Returns the calibration store used by the solver functions, loaded from DEFAULT_CALIBRATION_PATH on first use"""
+    global _store
+    with _storeLock:
+        if _store is None:
+            _store = CalibrationStore()
+
+        return _store
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from database import QuestDatabase
+from scheduler import allocateCores, availableCores, estimatePanelCount
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+STUDY_OPTIONS = {"levels": None, "slice": False, "mirror": False, "surrogate": None, "interp": "linear", "shards": 1,
+                 "calibrate": None, "solverprofile": None} # Manifest study options and their defaults
+
+
+#############################################
+##              STUDY MANIFEST             ##
+#############################################
+
+class Study:
+    """One Aeroquest run of a study manifest: a database solved on a set of meshes"""
+
+    def __init__(self, name, database, meshes, slice=False, mirror=False, surrogate=None, interp="linear", shards=1,
+                 calibrate=None, solverprofile=None):
+        """
+        Args:
+            name (str): Study name, its bundle is written to a directory of this name
+            database (str): Path to Quest-prep database
+            meshes (str list): Paths to geometry files, finest first
+            slice (bool): True to output slice data
+            mirror (bool): True to solve cases that only differ in the sign of Beta once
+            surrogate (float): Surrogate tolerance (see Aeroquest.solveMeshSurrogate()), None to solve every case
+            interp (str): Interpolation of slice data onto finest mesh stations, "linear" or "cubic"
+            shards (int): Number of solver processes each mesh is split across (None to pick from observed scaling)
+            calibrate (float): Coefficient change threshold coarse level solver settings are calibrated to
+                (see Aeroquest.calibrateSolverSettings()), None for the settings of solverprofile
+            solverprofile (str or dict list): Solver settings of each grid level (see Aeroquest.levelSolverSettings()),
+                None for DEFAULT_PARAMS on every level
+        """
+        self.name = name
+        self.database = database
+        self.meshes = meshes
+        self.slice = slice
+        self.mirror = mirror
+        self.surrogate = surrogate
+        self.interp = interp
+        self.shards = shards
+        self.calibrate = calibrate
+        self.solverprofile = solverprofile
+
+    def cost(self):
+        """Estimates the work of the study
+
+        Returns:
+            Sum over mesh levels of case count times panel count
+        """
+        levels = QuestDatabase.fromFile(self.database, "").levels(len(self.meshes))[::-1] # Finest mesh first
+
+        return sum(len(level) * estimatePanelCount(mesh) for level, mesh in zip(levels, self.meshes))
+
+def selectMeshes(meshes, num_levels):
+    """Picks mesh levels out of a geometry set, always keeping the finest and coarsest
+
+    Args:
+        meshes (str list): Paths to geometry files, finest first
+        num_levels (int): Number of meshes to run
+
+    Returns:
+        List of paths to geometry files, finest first (e.g. fine and coarse for 2 of 3)
+    """
+    if not 1 <= num_levels <= len(meshes):
+        raise ValueError(f"Cannot run {num_levels} mesh levels from a set of {len(meshes)} meshes")
+    if num_levels == 1:
+        return meshes[:1]
+
+    return [meshes[round(i * (len(meshes) - 1) / (num_levels - 1))] for i in range(num_levels)]
+
+def loadManifest(manifestPath, geometrySets=None):
+    """Reads a study manifest
+
+    The manifest is a json file with a list of studies and, optionally, named
+    geometry sets (added to geometrySets). Each study names a database and a
+    geometry set (or lists its meshes), and may set any of STUDY_OPTIONS:
+
+        {"geometries": {"thin": ["./TestCase.Thick/Fine/wing", "./TestCase.Thick/Med/wing", "./TestCase.Thick/Coarse/wing"]},
+         "studies": [{"name": "sparse_thin", "database": "./databasefiles/sparse_noAbs_4level_database",
+                      "geometry": "thin", "levels": 3, "slice": true}]}
+
+    Args:
+        manifestPath (str): Path to manifest file
+        geometrySets (dict): Geometry set name -> paths to geometry files, finest first
+
+    Returns:
+        List of Study, in manifest order
+    """
+    with open(manifestPath) as file:
+        manifest = json.load(file)
+
+    geometries = {**(geometrySets or {}), **manifest.get("geometries", {})}
+    studies = []
+
+    for entry in manifest["studies"]:
+        unknown = set(entry) - set(STUDY_OPTIONS) - {"name", "database", "geometry"}
+        if unknown:
+            raise ValueError(f"Unknown option(s) {', '.join(sorted(unknown))} in study {entry.get('name')}")
+
+        geometry = entry["geometry"]
+        if isinstance(geometry, str):
+            if geometry not in geometries:
+                raise ValueError(f"Unknown geometry set {geometry} in study {entry['name']}")
+            geometry = geometries[geometry]
+
+        options = {**STUDY_OPTIONS, **{option: entry[option] for option in STUDY_OPTIONS if option in entry}}
+        options["shards"] = None if options["shards"] == "auto" else options["shards"]
+        meshes = selectMeshes(geometry, options.pop("levels") or len(geometry))
+        studies.append(Study(entry["name"], entry["database"], meshes, **options))
+
+    names = [study.name for study in studies]
+    if len(set(names)) != len(names):
+        raise ValueError("Study names must be unique")
+
+    return studies
+
+
+#############################################
+##            STUDY SCHEDULING             ##
+#############################################
+
+def groupStudies(studies):
+    """Groups studies that share a mesh
+
+    Args:
+        studies (Study list): Studies, in manifest order
+
+    Returns:
+        2D list containing the studies of each group, in manifest order
+    """
+    groups = [] # (mesh paths, studies)
+
+    for study in studies:
+        meshes = {os.path.normpath(mesh) for mesh in study.meshes}
+        overlapping = [group for group in groups if group[0] & meshes]
+
+        merged = (meshes.union(*[group[0] for group in overlapping]), [])
+        for group in overlapping:
+            merged[1].extend(group[1])
+            groups.remove(group)
+        merged[1].append(study)
+
+        groups.append(merged)
+
+    order = {id(study): i for i, study in enumerate(studies)}
+    groups = [sorted(group[1], key = lambda study: order[id(study)]) for group in groups]
+
+    return sorted(groups, key = lambda group: order[id(group[0])])
+
+def scheduleStudies(studies, runStudy, total_cores=None):
+    """Runs studies under a shared core budget
+
+    Studies that share a mesh run one after another, in manifest order: solver
+    files are written next to the geometry, and the later studies pick up the
+    cached solves of the earlier ones. Groups of studies with no mesh in common
+    run at the same time, with cores split in proportion to their estimated cost.
+    When there are more groups than cores, the most expensive groups start first.
+
+    Args:
+        studies (Study list): Studies, in manifest order
+        runStudy (function): Called as runStudy(study, cores), runs a study
+        total_cores (int): Cores to split across groups (defaults to all available)
+
+    Returns:
+        Dictionary containing wall time in seconds and cores of each study, by name
+    """
+    if total_cores is None:
+        total_cores = availableCores()
+
+    groups = groupStudies(studies)
+    costs = [sum(study.cost() for study in group) for group in groups]
+    cores = allocateCores(costs, total_cores)
+
+    for group, group_cores in zip(groups, cores):
+        print(f"Scheduling {', '.join(study.name for study in group)}: {group_cores} cores")
+
+    timings = {}
+
+    def runGroup(group_i):
+        for study in groups[group_i]:
+            print(f"Starting study {study.name}")
+            start = time.time()
+            runStudy(study, cores[group_i])
+            timings[study.name] = {"wall": time.time() - start, "cores": cores[group_i]}
+            print(f"Finished study {study.name} in {timings[study.name]['wall']:.1f} s")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(groups), total_cores))) as pool:
+        futures = [pool.submit(runGroup, group_i) for group_i in sorted(range(len(groups)), key = lambda group_i: -costs[group_i])]
+        for future in futures:
+            future.result()
+
+    return timings
@@ -0,0 +1,216 @@
+import numpy as np
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+SURROGATE_BATCH = 256 # Query points fitted together by LocalSurrogate
+RIDGE = 1e-10 # Regularization of the local least squares fits (keeps constant parameters solvable)
+
+
+#############################################
+##             NESTED GRID LEVELS          ##
+#############################################
+
+def divisions(values, limit):
+    """Counts how many times each value divides by two, up to limit (zero divides limit times)"""
+    counts = np.zeros(len(values), dtype=int)
+    for power in range(1, limit + 1):
+        counts += values % 2 ** power == 0
+
+    return counts
+
+def ruleLevels(num_abscissas):
+    """Assigns nested rule levels to the sorted abscissas of one parameter
+
+    The rule is told apart by its size. 2^m + 1 abscissas nest as Clenshaw-Curtis:
+    the middle abscissa, then both ends, then every level halves the spacing.
+    2^m - 1 abscissas nest as Gauss-Patterson: every level's abscissas sit at the
+    odd positions of the next finer level's, and the ends only come in last.
+
+    Args:
+        num_abscissas (int): Number of distinct values of the parameter
+
+    Returns:
+        int array with the level of each abscissa, in sorted order, raises ValueError
+        if no nested rule has num_abscissas abscissas
+    """
+    positions = np.arange(num_abscissas)
+    if num_abscissas <= 2:
+        return np.zeros(num_abscissas, dtype=int)
+
+    depth = (num_abscissas - 1).bit_length() - 1
+    if num_abscissas == 2 ** depth + 1: # Clenshaw-Curtis
+        levels = depth - divisions(positions, depth - 1)
+        levels[num_abscissas // 2] = 0
+        return levels
+
+    depth = (num_abscissas + 1).bit_length() - 1
+    if num_abscissas == 2 ** depth - 1: # Gauss-Patterson
+        return depth - 1 - divisions(positions + 1, depth - 1)
+
+    raise ValueError(f"{num_abscissas} abscissas are not a nested Clenshaw-Curtis (2^m + 1) or Gauss-Patterson (2^m - 1) rule")
+
+def abscissaLevels(counts):
+    """Assigns nested grid levels to the sorted abscissas of one parameter
+
+    In a sparse grid the abscissas of coarser rule levels are shared by more
+    points, so levels are ranked by how many points each abscissa has. A full
+    tensor grid gives every abscissa the same count, its levels come from the
+    size of the rule (see ruleLevels()).
+
+    Args:
+        counts (ndarray): Number of grid points at each abscissa, in sorted order
+
+    Returns:
+        int array with the level of each abscissa, in sorted order
+    """
+    if np.all(counts == counts[0]):
+        return ruleLevels(len(counts))
+
+    ranks = np.unique(counts)[::-1]
+    return np.searchsorted(-ranks, -counts)
+
+def gridLevels(params, names=None):
+    """Assigns nested grid levels to the points of a quadrature grid
+
+    A point belongs to the coarsest level whose grid contains it, so every
+    level's points are a subset of the finer levels' (a sparse grid's points are
+    found among the low levels of the dense grid on the same rule). Levels are
+    taken from the points themselves (see abscissaLevels()), the database's level
+    column numbers meshes, not quadrature levels.
+
+    Args:
+        params (ndarray): (N, P) array of parameter values, one row per point
+        names (str list): Parameter names, used in errors
+
+    Returns:
+        int array with the level of each point, raises ValueError if the abscissas of
+        a parameter are not a nested rule
+    """
+    levels = np.zeros(len(params), dtype=int)
+
+    for column_i, column in enumerate(params.T):
+        abscissas, positions, counts = np.unique(column, return_inverse=True, return_counts=True)
+        try:
+            levels = np.maximum(levels, abscissaLevels(counts)[positions])
+        except ValueError as error:
+            raise ValueError(f"Parameter {names[column_i] if names else column_i}: {error}") from None
+
+    return levels
+
+
+#############################################
+##             LOCAL SURROGATE             ##
+#############################################
+
+class LocalSurrogate:
+    """Locally weighted linear fit through solved points
+
+    Each query is fit from its nearest solved points (parameters scaled to the
+    unit box), weighted by inverse squared distance. Errors are estimated from
+    leave-one-out fits at the solved points.
+    """
+
+    def __init__(self, params, values, neighbours=None):
+        """
+        Args:
+            params (ndarray): (N, P) array of parameter values of the solved points
+            values (ndarray): (N, M) array of outputs at the solved points
+            neighbours (int): Points used per fit, None for 2 * (P + 1)
+        """
+        self.lower = params.min(axis=0)
+        self.span = params.max(axis=0) - self.lower
+        self.span[self.span == 0] = 1
+        self.points = self.scale(params)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.neighbours = min(neighbours or 2 * (params.shape[1] + 1), len(params))
+        self.scales = np.ptp(self.values, axis=0)
+        self.scales[self.scales == 0] = 1
+        self._looErrors = None
+
+    def scale(self, params):
+        """Maps parameter values onto the unit box of the solved points"""
+        return (np.asarray(params, dtype=np.float64) - self.lower) / self.span
+
+    def _nearest(self, queries, exclude=None):
+        # exclude gives, for each query, a solved point left out of its fit
+        distances = ((queries[:, None, :] - self.points[None, :, :]) ** 2).sum(axis=2)
+        if exclude is not None:
+            distances[np.arange(len(queries)), exclude] = np.inf
+
+        k = self.neighbours - 1 if exclude is not None else self.neighbours
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        return nearest, np.take_along_axis(distances, nearest, axis=1)
+
+    def _fit(self, queries, exclude=None):
+        nearest, distances = self._nearest(queries, exclude)
+        weights = 1 / (distances + 1e-12)
+
+        offsets = self.points[nearest] - queries[:, None, :]
+        design = np.concatenate([np.ones(nearest.shape + (1,)), offsets], axis=2)
+        weighted = design * weights[:, :, None]
+
+        normal = weighted.transpose(0, 2, 1) @ design + RIDGE * np.eye(design.shape[2])
+        rhs = weighted.transpose(0, 2, 1) @ self.values[nearest]
+
+        return np.linalg.solve(normal, rhs)[:, 0, :] # Intercept is the value at the query
+
+    def predict(self, params):
+        """Predicts outputs at new points
+
+        Args:
+            params (ndarray): (Q, P) array of parameter values
+
+        Returns:
+            (Q, M) array of predicted outputs
+        """
+        queries = self.scale(params)
+
+        return np.concatenate([self._fit(queries[start:start + SURROGATE_BATCH])
+                               for start in range(0, len(queries), SURROGATE_BATCH)] + [np.empty((0, self.values.shape[1]))])
+
+    def looErrors(self):
+        """Leave-one-out errors at the solved points
+
+        Returns:
+            (N, M) array of |prediction - solved value| with each point left out of its own fit
+        """
+        if self._looErrors is None:
+            rows = np.arange(len(self.points))
+            predictions = np.concatenate([self._fit(self.points[start:start + SURROGATE_BATCH], rows[start:start + SURROGATE_BATCH])
+                                          for start in range(0, len(rows), SURROGATE_BATCH)]) if self.neighbours > 1 else self.values
+            self._looErrors = np.abs(predictions - self.values)
+
+        return self._looErrors
+
+    def estimateErrors(self, params):
+        """Estimates the relative error of predict() at new points
+
+        The estimate is the distance weighted mean of the leave-one-out errors of
+        the nearest solved points, relative to the range of each output.
+
+        Args:
+            params (ndarray): (Q, P) array of parameter values
+
+        Returns:
+            Array of the largest relative error estimate over the outputs, one per point
+        """
+        errors = self.looErrors() / self.scales
+        nearest, distances = self._nearest(self.scale(params))
+        weights = 1 / (distances + 1e-12)
+
+        estimates = (errors[nearest] * weights[:, :, None]).sum(axis=1) / weights.sum(axis=1)[:, None]
+
+        return estimates.max(axis=1)
+
+    def looSummary(self):
+        """Summarizes the leave-one-out errors relative to the range of each output
+
+        Returns:
+            Tuple containing RMS and maximum relative error over every output
+        """
+        errors = self.looErrors() / self.scales
+
+        return float(np.sqrt((errors ** 2).mean())), float(errors.max())
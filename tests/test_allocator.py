@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import allocator
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DEFAULT_CASE = {"Mach": "0.3", "WakeIters": "3", "GMRESReductionFactor": "0.001"} # Parameters of a case at DEFAULT_PARAMS settings
+STARTUP = 2.0 # Seconds the simulated solver takes to start
+PER_CASE = 0.5 # Single thread seconds the simulated solver takes per case
+
+
+#############################################
+##                 HELPERS                 ##
+#############################################
+
+@pytest.fixture
+def geometry(tmp_path):
+    """Writes a mesh header and returns the path to the geometry"""
+    geomData = str(tmp_path / "wing")
+    with open(f"{geomData}.tri", 'w') as file:
+        file.write("500 1000\n")
+
+    return geomData
+
+
+#############################################
+##                  TESTS                  ##
+#############################################
+
+def test_collinear_features_get_no_weight(geometry):
+    history = allocator.ScalingHistory(None)
+    for cases in [4, 8, 12, 16, 20, 24, 28, 32]:
+        history.record("parse", geometry, 1, [DEFAULT_CASE] * cases, STARTUP + PER_CASE * cases)
+
+    model = history.model("parse", geometry)
+    assert model.startup == pytest.approx(STARTUP)
+    assert model.weights.tolist() == pytest.approx([PER_CASE, 0.0, 0.0, 0.0])
+    assert model.predict([DEFAULT_CASE] * 10) == pytest.approx(STARTUP + PER_CASE * 10)
+
+def test_save_writes_once_and_keeps_other_runs(geometry, tmp_path):
+    historyPath = str(tmp_path / "scaling.json")
+    first = allocator.ScalingHistory(historyPath)
+    second = allocator.ScalingHistory(historyPath)
+
+    first.record("parse", geometry, 1, [DEFAULT_CASE], 1.0)
+    second.record("parse", geometry, 1, [DEFAULT_CASE] * 2, 2.0)
+    assert not os.path.exists(historyPath)
+
+    first.save()
+    second.save()
+    with open(historyPath) as file:
+        runs = [run for mesh in json.load(file).values() for run in mesh["stages"]["parse"]]
+    assert sorted(run[1] for run in runs) == [1, 2]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
@@ -0,0 +1,107 @@
+import os
+import sys
+import contextlib
+
+import numpy as np
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+import Aeroquest
+import allocator
+import solversettings
+from archive import Archive
+from bench_pipeline import FAKES, createWorkspace
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+DATABASE = "./databasefiles/sparse_noAbs_4level_database" # Database the runs are built from
+COEFFICIENTS = ["CL", "CDTot", "CMy"] # Coefficients whose statistics are compared
+THRESHOLD = 0.01 # -calibrate threshold of the calibrated run
+TOLERANCE = 2 * THRESHOLD # Largest change of a statistic, as a fraction of the coefficient's range on the finest level
+
+
+#############################################
+##                 HELPERS                 ##
+#############################################
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Sets up a run directory with the fake solver, restoring Aeroquest's globals afterwards
+
+    Returns:
+        List containing path to every mesh, finest first
+    """
+    for name in ["databasePath", "vspAeroPath", "slicerPath", "questLauncherPath", "mainDir"]:
+        monkeypatch.setattr(Aeroquest, name, getattr(Aeroquest, name))
+    monkeypatch.setattr(allocator, "_history", allocator.ScalingHistory(None))
+    monkeypatch.setattr(solversettings, "_store", solversettings.CalibrationStore(None))
+
+    meshPaths = createWorkspace(str(tmp_path), DATABASE, 1, 4)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PATH", FAKES + os.pathsep + os.environ.get("PATH", ""))
+
+    return meshPaths
+
+def runStatistics(meshPaths, **options):
+    """Runs Aeroquest and collects the statistics Quest-post works from
+
+    Args:
+        meshPaths (str list): Path to every mesh, finest first
+        **options: Passed on to Aeroquest.aeroquest()
+
+    Returns:
+        Dictionary of (level, coefficient) -> mean and standard deviation of the coefficient and of its
+        change from the next finer level (cases matched by realization and point)
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        Aeroquest.aeroquest(meshPaths, len(meshPaths), **options)
+
+    archive = Archive(Aeroquest.archivePath)
+    statistics = {}
+    finer = None
+    for level in archive.levels():
+        keys = zip(archive.column(level, "realization").tolist(), archive.column(level, "point").tolist())
+        values = {key: data for key, data in zip(keys, archive.coefficients(level))}
+        for name in COEFFICIENTS:
+            column = np.array([data[name] for data in values.values()])
+            statistics[level, name] = [column.mean(), column.std()]
+            if finer is not None:
+                change = np.array([data[name] - finer[key][name] for key, data in values.items()])
+                statistics[level, name] += [change.mean(), change.std()]
+        finer = values
+
+    return statistics
+
+
+#############################################
+##                  TESTS                  ##
+#############################################
+
+def test_default_profile_keeps_default_params():
+    profile = solversettings.resolveProfile(Aeroquest.DEFAULT_SOLVER_PROFILE, Aeroquest.SOLVER_PROFILES, Aeroquest.DEFAULT_PARAMS.keys())
+    assert all(solversettings.levelSettings(profile, level) == {} for level in range(4))
+
+def test_unknown_profile_fails():
+    with pytest.raises(ValueError):
+        solversettings.resolveProfile("missing", Aeroquest.SOLVER_PROFILES, Aeroquest.DEFAULT_PARAMS.keys())
+
+def test_default_run_writes_default_params(workspace):
+    runStatistics(workspace)
+    for meshPath in workspace:
+        with open(f"{meshPath}.vspaero") as file:
+            lines = file.read()
+        for param in ["GMRESReductionFactor", "WakeIters"]:
+            assert f"{param} = {Aeroquest.DEFAULT_PARAMS[param]}" in lines, meshPath
+
+def test_calibrated_statistics_match_default(workspace):
+    default = runStatistics(workspace)
+    calibrated = runStatistics(workspace, calibrate=THRESHOLD)
+
+    for (level, name), values in default.items():
+        spread = np.ptp([data[name] for data in Archive(Aeroquest.archivePath).coefficients(0)])
+        for value, calibratedValue in zip(values, calibrated[level, name]):
+            assert abs(calibratedValue - value) <= TOLERANCE * spread, (level, name, values, calibrated[level, name])
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import py_compile
+import subprocess
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#############################################
+##            GLOBAL VARIABLES             ##
+#############################################
+
+CLI = os.path.join(REPO, "cli.py")
+QUICK_COMMANDS = [["help"], ["-h"], ["delete"], ["-d"]] # Commands that must not load the solver pipeline
+HEAVY_MODULES = ["numpy", "asyncio", "concurrent.futures", "zipfile", "hashlib", "json", "runner", "scheduler", "database",
+                 "slicedata", "serializer", "allocator", "archive", "study", "cache", "checkpoint", "profiling"] # Modules a quick command or a plain import must not load
+REPEAT = 15 # Timed runs of a command and of the bare interpreter, interleaved (best of each is compared)
+MARGIN = 0.025 # Seconds a quick command may take over starting the interpreter, well above run to run noise
+
+
+#############################################
+##                 HELPERS                 ##
+#############################################
+
+def loadedModules(code, cwd):
+    """Lists the heavy modules a snippet of Python loads
+
+    Args:
+        code (str): Python code, run with the repo on sys.path
+        cwd (str): Working directory
+
+    Returns:
+        List of HEAVY_MODULES loaded by the code
+    """
+    check = (f"import sys; sys.path.insert(0, {REPO!r}); sys.argv = [sys.argv[0]]\n{code}\n"
+             f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", check], cwd=cwd, capture_output=True, text=True, check=True)
+
+    return result.stdout.split()
+
+def startupOverhead(command, cwd):
+    """Times a command against a bare interpreter
+
+    The two are run alternately, so both see the same machine load, and the best
+    of REPEAT runs of each is compared. Aeroquest.py is compiled first, as it is
+    after its first import.
+
+    Args:
+        command (str list): Arguments to cli.py
+        cwd (str): Working directory
+
+    Returns:
+        Seconds the command takes over starting the interpreter
+    """
+    py_compile.compile(os.path.join(REPO, "Aeroquest.py"))
+    best = {"bare": float("inf"), "command": float("inf")}
+
+    for run in range(REPEAT):
+        for name, args in [("bare", [sys.executable, "-c", "pass"]), ("command", [sys.executable, CLI] + command)]:
+            start = time.perf_counter()
+            subprocess.run(args, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+            best[name] = min(best[name], time.perf_counter() - start)
+
+    return best["command"] - best["bare"]
+
+
+#############################################
+##                  TESTS                  ##
+#############################################
+
+def test_import_loads_no_pipeline(tmp_path):
+    assert loadedModules("import Aeroquest", tmp_path) == []
+
+@pytest.mark.parametrize("command", QUICK_COMMANDS)
+def test_quick_command_loads_no_pipeline(command, tmp_path):
+    assert loadedModules(f"import contextlib, cli\nwith contextlib.redirect_stdout(None): cli.main({command!r})", tmp_path) == []
+
+@pytest.mark.parametrize("command", QUICK_COMMANDS)
+def test_quick_command_starts_fast(command, tmp_path):
+    overhead = startupOverhead(command, tmp_path)
+    assert overhead <= MARGIN, f"cli.py {' '.join(command)} took {overhead * 1e3:.1f} ms over the bare interpreter"